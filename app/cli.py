@@ -0,0 +1,367 @@
+import argparse
+import csv
+import datetime
+import io
+import json
+import re
+import sys
+import uuid
+from contextlib import nullcontext
+from dataclasses import dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, TextIO, get_args
+from urllib.parse import urlparse
+
+from app.core.config import get_settings
+from app.core.logging_config import setup_logger
+from app.integration.domain_index import DomainIndex, InvalidIndexFileError
+from app.models.models import DEFAULT_REDIRECT_STATUS
+from app.repositories.url_repository import as_db_timestamp, get_short_code_allocator
+from app.schemas.schema import RedirectStatus
+from app.utils.database_connection import DatabaseConnection
+from app.utils.short_codes import ShortCodeAllocator
+from app.utils.url_digest import url_digest
+
+"""
+Bulk import and export of the `urls` table.
+
+    python -m app.cli import links.csv --format csv
+    python -m app.cli export dump.jsonl --format jsonl
+    python -m app.cli backfill-digests
+
+Imports are read and written in fixed-size chunks: each chunk is filtered
+against the blacklist, streamed into a temporary staging table with `COPY` and
+moved into `urls` with one `INSERT ... SELECT ... ON CONFLICT DO NOTHING`.
+Exports read through a server-side cursor. Memory use is bounded by the chunk
+size either way.
+
+Rows that carry a `shortened_url` (e.g. from an export) keep it, along with
+their clicks and timestamps, so an export followed by an import preserves every
+link. A kept code that the target already uses for another URL, or a URL the
+target already has under another code, is reported as a conflict and not
+imported. The code block sequence is advanced past the kept codes so new links
+never reuse them; import into a database with the same SHORT_CODE_SECRET and
+SHORT_CODE_MIN_LENGTH as the source. Rows without a code get a new one.
+
+`backfill-digests` fills `original_url_digest` on rows from before the column
+existed (see scripts/create_urls.sql). It has to run here rather than in SQL:
+the digest is of the normalized URL (app/utils/url_digest.py), and a row given
+any other digest never matches new links for the same URL.
+"""
+
+logger = setup_logger(__name__)
+settings = get_settings()
+
+EXPORT_COLUMNS = ("shortened_url", "original_url", "clicks", "created", "updated", "valid_until", "redirect_status")
+_REDIRECT_STATUSES = frozenset(get_args(RedirectStatus))
+_SHORT_CODE = re.compile(r"[0-9A-Za-z_-]{1,50}")
+# Conflicts are logged individually up to this many per chunk
+_MAX_LOGGED_CONFLICTS = 10
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    invalid: int = 0
+    blacklisted: int = 0
+    conflicts: int = 0
+    inserted: int = 0
+    # Highest sequence id among kept codes, to move the block sequence past
+    highest_kept_id: Optional[int] = None
+
+    @property
+    def skipped(self) -> int:
+        """Rows that were valid but already present in `urls`."""
+        return self.read - self.invalid - self.blacklisted - self.conflicts - self.inserted
+
+
+@dataclass
+class BackfillStats:
+    updated: int = 0
+    # Digests shared by several rows; the unique constraint can't be added until they are merged
+    duplicates: int = 0
+
+
+def read_rows(source: TextIO, fmt: str) -> Iterator[dict]:
+    """Yield dicts with `original_url` and optional `valid_until` from CSV or JSONL."""
+    if fmt == "csv":
+        yield from csv.DictReader(source)
+        return
+    for line in source:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _parse_timestamp(value) -> Optional[datetime.datetime]:
+    if not value:
+        return None
+    return as_db_timestamp(datetime.datetime.fromisoformat(value))
+
+
+def _parse_clicks(value) -> int:
+    if value is None or value == "":
+        return 0
+    clicks = int(value)
+    if clicks < 0:
+        raise ValueError("clicks must not be negative")
+    return clicks
+
+
+def _parse_redirect_status(value) -> int:
+    """Accept what the create API accepts; files without the column get the default."""
+    if value is None or value == "":
+        return DEFAULT_REDIRECT_STATUS
+    redirect_status = int(value)
+    if redirect_status not in _REDIRECT_STATUSES:
+        raise ValueError(f"unsupported redirect status {redirect_status}")
+    return redirect_status
+
+
+def _csv_timestamp(value: Optional[datetime.datetime]) -> str:
+    return value.isoformat() if value else ""
+
+
+def prepare_chunk(rows: Iterable[dict], blacklist: Optional[DomainIndex], allocator: ShortCodeAllocator,
+                  reserve, stats: ImportStats) -> io.StringIO:
+    """
+    Validate a chunk and render the rows to load as CSV for `COPY`.
+
+    Rows without an http(s) URL, with a malformed `shortened_url`, with
+    unparsable clicks or timestamps or with a redirect status the API would
+    reject are counted as invalid; rows whose domain is
+    blacklisted are counted and dropped. Rows with a `shortened_url` keep it,
+    the others are given a code from `allocator`.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        stats.read += 1
+        original_url = (row.get("original_url") or "").strip()
+        parsed = urlparse(original_url)
+        shortened_url = (row.get("shortened_url") or "").strip()
+        try:
+            valid_until = _parse_timestamp(row.get("valid_until"))
+            created = _parse_timestamp(row.get("created"))
+            updated = _parse_timestamp(row.get("updated"))
+            clicks = _parse_clicks(row.get("clicks"))
+            redirect_status = _parse_redirect_status(row.get("redirect_status"))
+        except (TypeError, ValueError):
+            stats.invalid += 1
+            continue
+        if parsed.scheme not in {"http", "https"} or not parsed.netloc:
+            stats.invalid += 1
+            continue
+        if shortened_url and not _SHORT_CODE.fullmatch(shortened_url):
+            stats.invalid += 1
+            continue
+        if blacklist is not None and blacklist.match(parsed.netloc):
+            stats.blacklisted += 1
+            continue
+        if shortened_url:
+            kept_id = allocator.codec.decode(shortened_url)
+            if kept_id is not None and (stats.highest_kept_id is None or kept_id > stats.highest_kept_id):
+                stats.highest_kept_id = kept_id
+        writer.writerow([
+            uuid.uuid4(),
+            original_url,
+            "\\x" + url_digest(original_url).hex(),
+            shortened_url or allocator.allocate(reserve),
+            bool(shortened_url),
+            clicks,
+            _csv_timestamp(created),
+            _csv_timestamp(updated),
+            _csv_timestamp(valid_until),
+            redirect_status,
+        ])
+    buffer.seek(0)
+    return buffer
+
+
+def load_blacklist() -> Optional[DomainIndex]:
+    try:
+        return DomainIndex.open(Path(settings.BLACKLIST_INDEX_PATH))
+    except (OSError, InvalidIndexFileError):
+        pass
+    backup = Path(settings.BLACKLIST_BACKUP_PATH)
+    if backup.exists():
+        return DomainIndex.from_text(backup.read_text())
+    logger.warning("No blacklist available; importing without domain checks")
+    return None
+
+
+def _chunks(rows: Iterator[dict], size: int) -> Iterator[list[dict]]:
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_urls(source: TextIO, fmt: str, chunk_size: int,
+                db: Optional[DatabaseConnection] = None) -> ImportStats:
+    stats = ImportStats()
+    blacklist = load_blacklist()
+    allocator = get_short_code_allocator()
+    db = db if db is not None else DatabaseConnection()
+
+    with db:
+        cursor = db.get_cursor()
+
+        def reserve() -> int:
+            cursor.execute("SELECT nextval('urls_short_code_block_seq') - 1")
+            return cursor.fetchone()[0]
+
+        cursor.execute(
+            "CREATE TEMPORARY TABLE IF NOT EXISTS urls_import "
+            "(id uuid, original_url text, original_url_digest bytea, shortened_url text, keep_code boolean, "
+            "clicks integer, created timestamp, updated timestamp, valid_until timestamp, redirect_status smallint) "
+            "ON COMMIT DELETE ROWS"
+        )
+        for chunk in _chunks(read_rows(source, fmt), chunk_size):
+            buffer = prepare_chunk(chunk, blacklist, allocator, reserve, stats)
+            cursor.copy_expert("COPY urls_import FROM STDIN WITH (FORMAT csv, NULL '')", buffer)
+            # A kept code must keep pointing at its URL: drop rows whose code or URL is already taken otherwise
+            cursor.execute(
+                "DELETE FROM urls_import s USING urls u WHERE s.keep_code AND ("
+                "(u.shortened_url = s.shortened_url AND u.original_url_digest <> s.original_url_digest) OR "
+                "(u.original_url_digest = s.original_url_digest AND u.shortened_url <> s.shortened_url)) "
+                "RETURNING s.shortened_url, s.original_url"
+            )
+            conflicts = cursor.fetchall()
+            stats.conflicts += len(conflicts)
+            for shortened_url, original_url in conflicts[:_MAX_LOGGED_CONFLICTS]:
+                logger.warning(f"Not importing {shortened_url} -> {original_url}: code or URL already taken")
+            cursor.execute(
+                "INSERT INTO urls (id, original_url, original_url_digest, shortened_url, clicks, "
+                "created, updated, valid_until, redirect_status) "
+                "SELECT id, original_url, original_url_digest, shortened_url, clicks, "
+                "COALESCE(created, now()), COALESCE(updated, now()), valid_until, redirect_status FROM urls_import "
+                "ON CONFLICT DO NOTHING"
+            )
+            stats.inserted += max(cursor.rowcount, 0)
+            db.connection.commit()
+            logger.info(f"Imported {stats.inserted} of {stats.read} rows read so far")
+        if stats.highest_kept_id is not None:
+            # Reserve every block a kept code came from, so the allocator never hands those codes out again
+            cursor.execute(
+                "SELECT setval('urls_short_code_block_seq', "
+                "GREATEST((SELECT last_value FROM urls_short_code_block_seq), %s))",
+                (stats.highest_kept_id // allocator.block_size + 1,),
+            )
+            db.connection.commit()
+        # The connection goes back to the pool, so don't leave the staging table behind
+        cursor.execute("DROP TABLE IF EXISTS urls_import")
+    return stats
+
+
+def export_urls(target: TextIO, fmt: str, chunk_size: int, db: Optional[DatabaseConnection] = None) -> int:
+    exported = 0
+    db = db if db is not None else DatabaseConnection()
+    with db:
+        cursor = db.connection.cursor(name="urls_export")
+        cursor.itersize = chunk_size
+        cursor.execute(f"SELECT {', '.join(EXPORT_COLUMNS)} FROM urls ORDER BY created")
+        writer = csv.writer(target) if fmt == "csv" else None
+        if writer:
+            writer.writerow(EXPORT_COLUMNS)
+        for row in cursor:
+            if writer:
+                writer.writerow([value.isoformat() if isinstance(value, datetime.datetime) else value
+                                 for value in row])
+            else:
+                target.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), default=str) + "\n")
+            exported += 1
+        cursor.close()
+    return exported
+
+
+def backfill_digests(chunk_size: int, recompute: bool = False,
+                     db: Optional[DatabaseConnection] = None) -> BackfillStats:
+    """
+    Set `original_url_digest` with `url_digest`, walking `urls` by id in chunks.
+
+    Only rows without a digest are touched unless `recompute` is set, which
+    rewrites every row (for tables backfilled with a different digest).
+    """
+    stats = BackfillStats()
+    db = db if db is not None else DatabaseConnection()
+    with db:
+        cursor = db.get_cursor()
+        cursor.execute(
+            "CREATE TEMPORARY TABLE IF NOT EXISTS urls_digests (id uuid, original_url_digest bytea) "
+            "ON COMMIT DELETE ROWS"
+        )
+        last_id = None
+        while True:
+            cursor.execute(
+                "SELECT id, original_url FROM urls "
+                "WHERE (%(last_id)s::uuid IS NULL OR id > %(last_id)s::uuid) "
+                "AND (%(recompute)s OR original_url_digest IS NULL) ORDER BY id LIMIT %(limit)s",
+                {"last_id": last_id, "recompute": recompute, "limit": chunk_size},
+            )
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row_id, original_url in rows:
+                writer.writerow([row_id, "\\x" + url_digest(original_url).hex()])
+            buffer.seek(0)
+            cursor.copy_expert("COPY urls_digests FROM STDIN WITH (FORMAT csv)", buffer)
+            cursor.execute(
+                "UPDATE urls u SET original_url_digest = d.original_url_digest FROM urls_digests d WHERE u.id = d.id"
+            )
+            stats.updated += max(cursor.rowcount, 0)
+            db.connection.commit()
+            last_id = str(rows[-1][0])
+            logger.info(f"Backfilled {stats.updated} digests so far")
+
+        cursor.execute(
+            "SELECT array_agg(original_url) FROM urls WHERE original_url_digest IS NOT NULL "
+            "GROUP BY original_url_digest HAVING count(*) > 1"
+        )
+        duplicates = cursor.fetchall()
+        stats.duplicates = len(duplicates)
+        for (urls,) in duplicates[:_MAX_LOGGED_CONFLICTS]:
+            logger.warning(f"Same URL stored more than once: {', '.join(urls)}")
+        cursor.execute("DROP TABLE IF EXISTS urls_digests")
+    return stats
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Bulk import/export of shortened URLs.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for command, help_text in (("import", "Load URLs from a file"), ("export", "Dump URLs to a file")):
+        subparser = subparsers.add_parser(command, help=help_text)
+        subparser.add_argument("path", help="File to read or write; '-' for stdin/stdout")
+        subparser.add_argument("--format", choices=("csv", "jsonl"), default="csv")
+        subparser.add_argument("--chunk-size", type=int, default=5000)
+    subparser = subparsers.add_parser("backfill-digests", help="Compute original_url_digest for existing rows")
+    subparser.add_argument("--all", dest="recompute", action="store_true",
+                           help="Recompute every row, not only those without a digest")
+    subparser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    if args.command == "backfill-digests":
+        stats = backfill_digests(args.chunk_size, args.recompute)
+        print(f"updated={stats.updated} duplicates={stats.duplicates}", file=sys.stderr)
+        if stats.duplicates:
+            print("Merge or delete the duplicate rows before adding the unique constraint", file=sys.stderr)
+            sys.exit(1)
+    elif args.command == "import":
+        source = nullcontext(sys.stdin) if args.path == "-" else open(args.path, newline="", encoding="utf-8")
+        with source as f:
+            stats = import_urls(f, args.format, args.chunk_size)
+        print(f"read={stats.read} inserted={stats.inserted} skipped={stats.skipped} "
+              f"conflicts={stats.conflicts} blacklisted={stats.blacklisted} invalid={stats.invalid}",
+              file=sys.stderr)
+    else:
+        target = nullcontext(sys.stdout) if args.path == "-" else open(args.path, "w", newline="", encoding="utf-8")
+        with target as f:
+            exported = export_urls(f, args.format, args.chunk_size)
+        print(f"exported={exported}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,304 @@
 import inspect
+import sys
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
-from typing import Dict, List, Any, Callable
-from datetime import datetime, timedelta
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+from app.core.logging_config import setup_logger
+
+try:
+    from redis import RedisError
+except ImportError:  # pragma: no cover - redis is optional
+    RedisError = OSError
 
 """
 This module provides caching functionality for the application.
 """
 
-# Simple in-memory cache implementation
-cache: Dict[str, Dict[str, Any]] = {}
+logger = setup_logger(__name__)
+
+_MISSING = object()
+
+
+class CacheEntry:
+    __slots__ = ("value", "expires_at", "size")
+
+    def __init__(self, value: Any, expires_at: float, size: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+
 
+def _default_sizeof(key: Hashable, value: Any) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(value)
 
-def timed_cache(seconds: int = 300):
+
+class TTLCache:
+    """
+    Bounded in-memory cache with per-entry expiry and LRU eviction.
+
+    Entries are evicted least-recently-used first once either `max_entries` or
+    `max_bytes` (as measured by `sizeof`) is exceeded. Expired entries are
+    dropped when they are read and, opportunistically, when new entries are
+    written.
+    """
+
+    def __init__(self, max_entries: int = 10_000, max_bytes: Optional[int] = None,
+                 default_ttl: float = 300, sizeof: Callable[[Hashable, Any], int] = _default_sizeof):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.sizeof = sizeof
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            if entry.expires_at <= time.time():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None,
+            expires_at: Optional[float] = None) -> None:
+        """
+        Store a value.
+
+        Args:
+            key (Hashable): Cache key
+            value (Any): Value to store
+            ttl (Optional[float]): Lifetime in seconds; defaults to `default_ttl`
+            expires_at (Optional[float]): Absolute epoch time after which the value
+                is no longer valid. The effective expiry is the earlier of the two.
+        """
+        now = time.time()
+        deadline = now + (self.default_ttl if ttl is None else ttl)
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+        if deadline <= now:
+            self.delete(key)
+            return
+
+        size = self.sizeof(key, value)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(value, deadline, size)
+            self._bytes += size
+            self._evict(now)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def _evict(self, now: float) -> None:
+        # The oldest entry is usually also the first to expire, so drop expired
+        # entries from the LRU end before evicting live ones.
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if entry.expires_at > now:
+                break
+            self._remove(key)
+            self.expirations += 1
+
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+
+class TwoTierCache:
+    """
+    In-process `TTLCache` (L1) in front of a shared Redis cache (L2).
+
+    L2 is shared by all workers and survives restarts. L1 entries never outlive
+    the L2 entry they were read from, and the L1 TTL is kept short so entries
+    invalidated in another worker age out quickly.
+
+    Any Redis failure is logged and treated as a miss, and Redis is skipped for
+    `retry_seconds` so an outage does not add a socket timeout to every request.
+    With no `client` the cache runs on L1 alone.
+
+    L1 hits never await; `client` is an asyncio Redis client.
+    """
+
+    def __init__(self, local: TTLCache, client: Optional[Any], prefix: str, default_ttl: float,
+                 encode: Callable[[Any], bytes], decode: Callable[[bytes], Any],
+                 retry_seconds: float = 30):
+        self.local = local
+        self.client = client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.encode = encode
+        self.decode = decode
+        self.retry_seconds = retry_seconds
+        self._down_until = 0.0
+        self.l2_hits = 0
+        self.l2_misses = 0
+        self.l2_errors = 0
+
+    def __len__(self) -> int:
+        return len(self.local)
+
+    @property
+    def available(self) -> bool:
+        return self.client is not None and time.time() >= self._down_until
+
+    async def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        return (await self.get_many([key])).get(key, default)
+
+    async def get_many(self, keys: Iterable[Hashable]) -> dict:
+        """
+        Look up several keys, reading all L1 misses from Redis in one pipeline.
+
+        Returns:
+            dict: Found keys mapped to their values; missing keys are omitted
+        """
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key, _MISSING)
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        if not missing or not self.available:
+            return found
+
+        try:
+            async with self.client.pipeline(transaction=False) as pipe:
+                for key in missing:
+                    pipe.get(self._redis_key(key))
+                    pipe.pttl(self._redis_key(key))
+                replies = await pipe.execute()
+        except RedisError as e:
+            self._mark_down(e)
+            return found
+
+        now = time.time()
+        for index, key in enumerate(missing):
+            raw, pttl = replies[2 * index], replies[2 * index + 1]
+            if raw is None:
+                self.l2_misses += 1
+                continue
+            self.l2_hits += 1
+            value = self.decode(raw)
+            expires_at = now + pttl / 1000 if pttl is not None and pttl > 0 else None
+            self.local.set(key, value, expires_at=expires_at)
+            found[key] = value
+        return found
+
+    async def set(self, key: Hashable, value: Any, ttl: Optional[float] = None,
+                  expires_at: Optional[float] = None) -> None:
+        self.local.set(key, value, expires_at=expires_at)
+        if not self.available:
+            return
+
+        lifetime = self.default_ttl if ttl is None else ttl
+        if expires_at is not None:
+            lifetime = min(lifetime, expires_at - time.time())
+        try:
+            if lifetime <= 0:
+                await self.client.delete(self._redis_key(key))
+            else:
+                await self.client.set(self._redis_key(key), self.encode(value), px=max(1, int(lifetime * 1000)))
+        except RedisError as e:
+            self._mark_down(e)
+
+    async def delete(self, key: Hashable) -> None:
+        self.local.delete(key)
+        if not self.available:
+            return
+        try:
+            await self.client.delete(self._redis_key(key))
+        except RedisError as e:
+            self._mark_down(e)
+
+    def clear(self) -> None:
+        """Clear the local tier only; the shared tier is left to expire."""
+        self.local.clear()
+
+    def stats(self) -> dict:
+        return {
+            **self.local.stats(),
+            "l2_available": self.available,
+            "l2_hits": self.l2_hits,
+            "l2_misses": self.l2_misses,
+            "l2_errors": self.l2_errors,
+        }
+
+    def _redis_key(self, key: Hashable) -> str:
+        return f"{self.prefix}{key}"
+
+    def _mark_down(self, error: Exception) -> None:
+        self.l2_errors += 1
+        self._down_until = time.time() + self.retry_seconds
+        logger.warning(f"Redis cache unavailable, using local cache only for {self.retry_seconds}s: {error}")
+
+
+def default_cache_key(func: Callable, args: tuple, kwargs: dict) -> Hashable:
+    return (func.__module__, func.__qualname__, args, frozenset(kwargs.items()))
+
+
+def timed_cache(seconds: int = 300, key: Optional[Callable[..., Hashable]] = None,
+                max_entries: int = 1024, cache: Optional[TTLCache] = None):
     """
     Decorator to cache function results for a specified time period.
 
     Args:
         seconds (int): Cache expiration time in seconds
+        key (Optional[Callable]): Builds the cache key from the call's arguments;
+            defaults to the function's qualified name plus its hashable arguments
+        max_entries (int): Upper bound on cached results before LRU eviction
+        cache (Optional[TTLCache]): Cache to store results in; a private one is
+            created if not given
 
     Returns:
         Callable: Decorated function with caching capability
@@ -24,39 +306,44 @@ def timed_cache(seconds: int = 300):
 
     def decorator(func: Callable):
         is_async = inspect.iscoroutinefunction(func)
+        store = cache if cache is not None else TTLCache(max_entries=max_entries, default_ttl=seconds)
+
+        def cache_key(args, kwargs) -> Optional[Hashable]:
+            k = key(*args, **kwargs) if key else default_cache_key(func, args, kwargs)
+            try:
+                hash(k)
+            except TypeError:
+                return None
+            return k
 
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
-            cache_key = f"{func.__name__}:{args}:{kwargs}"
-
-            if cache_key in cache:
-                cached = cache[cache_key]
-                if datetime.now() < cached["expiry"]:
-                    return cached["data"]
+            k = cache_key(args, kwargs)
+            if k is not None:
+                cached = store.get(k, _MISSING)
+                if cached is not _MISSING:
+                    return cached
 
             result = await func(*args, **kwargs)
-            cache[cache_key] = {
-                "data": result,
-                "expiry": datetime.now() + timedelta(seconds=seconds),
-            }
+            if k is not None:
+                store.set(k, result, ttl=seconds)
             return result
 
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
-            cache_key = f"{func.__name__}:{args}:{kwargs}"
-
-            if cache_key in cache:
-                cached = cache[cache_key]
-                if datetime.now() < cached["expiry"]:
-                    return cached["data"]
+            k = cache_key(args, kwargs)
+            if k is not None:
+                cached = store.get(k, _MISSING)
+                if cached is not _MISSING:
+                    return cached
 
             result = func(*args, **kwargs)
-            cache[cache_key] = {
-                "data": result,
-                "expiry": datetime.now() + timedelta(seconds=seconds),
-            }
+            if k is not None:
+                store.set(k, result, ttl=seconds)
             return result
 
-        return async_wrapper if is_async else sync_wrapper
+        wrapper = async_wrapper if is_async else sync_wrapper
+        wrapper.cache = store
+        return wrapper
 
-    return decorator
\ No newline at end of file
+    return decorator
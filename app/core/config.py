@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Literal, Optional
 from functools import lru_cache
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import SecretStr, Field
@@ -29,6 +30,99 @@ class Settings(BaseSettings):
     BASE_URL: str = Field(default_factory=lambda: _load_secret("base_url", "BASE_URL") or "http://localhost:8000")
     REDIS_URL: str = Field(default_factory=lambda: _load_secret("redis_url", "REDIS_URL") or "redis://localhost:6379")
 
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 5
+    DB_POOL_PRE_PING: bool = True
+    DB_POOL_RECYCLE: int = 1800
+    DB_STATEMENT_TIMEOUT_MS: int = 5000
+
+    # Codes are derived from a sequence; none of these may change once codes are issued.
+    SHORT_CODE_MIN_LENGTH: int = 7
+    SHORT_CODE_BLOCK_SIZE: int = 100
+    SHORT_CODE_SECRET: str = Field(default_factory=lambda: _load_secret("short_code_secret", "SHORT_CODE_SECRET"))
+    # Dev/test only: allow an empty secret, which issues sequential, enumerable codes
+    SHORT_CODE_ALLOW_SEQUENTIAL: bool = False
+
+    BLACKLIST_URL: str = "https://hole.cert.pl/domains/v2/domains.txt"
+    BLACKLIST_BACKUP_PATH: str = "data/blacklist.txt"
+    BLACKLIST_INDEX_PATH: str = "data/blacklist.idx"
+    BLACKLIST_REFRESH_SECONDS: float = 3600
+    BLACKLIST_FETCH_TIMEOUT: float = 30
+
+    REDIRECT_CACHE_MAX_ENTRIES: int = 100_000
+    REDIRECT_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    REDIRECT_CACHE_TTL_SECONDS: float = 300
+    # Short L1 TTL bounds how long another worker can serve an invalidated entry.
+    REDIRECT_CACHE_L1_TTL_SECONDS: float = 30
+    # Cap on Cache-Control max-age for permanent (301/308) redirects
+    REDIRECT_MAX_AGE_SECONDS: int = 86400
+
+    # Most-clicked links loaded into the in-process redirect cache before a worker takes traffic
+    CACHE_WARM_TOP_N: int = 10_000
+    # Startup waits at most this long; a warm-up that fails or times out keeps /v1/ready at 503
+    CACHE_WARM_TIMEOUT_SECONDS: float = 30
+    CACHE_WARM_RETRY_SECONDS: float = 30
+
+    CLICK_FLUSH_SECONDS: float = 5
+
+    # Click analytics (app/service/click_events.py); events beyond the buffer size are dropped
+    CLICK_EVENTS_BUFFER_SIZE: int = 100_000
+    CLICK_EVENTS_BATCH_SIZE: int = 1000
+    CLICK_EVENTS_FLUSH_SECONDS: float = 1
+    CLICK_ROLLUP_SECONDS: float = 60
+    CLICK_ROLLUP_BATCH_SIZE: int = 10_000
+    CLICK_ROLLUP_MAX_BATCHES: int = 100
+    CLICK_STATS_CACHE_TTL_SECONDS: float = 30
+    CLICK_STATS_CACHE_MAX_ENTRIES: int = 10_000
+    # POST /urls/{code}/beacon, for clicks served from browser or edge caches
+    CLICK_BEACON_ENABLED: bool = False
+    # Lowest sample rate a beacon may claim, i.e. at most 1/rate clicks per beacon
+    CLICK_BEACON_MIN_SAMPLE_RATE: float = 0.01
+
+    # Bloom filter of live short codes plus a cache of recent misses (app/service/short_code_filter.py)
+    SHORT_CODE_FILTER_ERROR_RATE: float = 0.01
+    SHORT_CODE_FILTER_MIN_CAPACITY: int = 100_000
+    SHORT_CODE_FILTER_REBUILD_SECONDS: float = 3600
+    NEGATIVE_CACHE_MAX_ENTRIES: int = 100_000
+    NEGATIVE_CACHE_TTL_SECONDS: float = 60
+
+    URL_REAPER_INTERVAL_SECONDS: float = 60
+    # Rows deleted per statement; small batches keep row locks short
+    URL_REAPER_BATCH_SIZE: int = 500
+    URL_REAPER_MAX_BATCHES: int = 100
+
+    # Production server (python -m app.server); 0 workers means one per available CPU
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    # Import the app once in the supervisor so workers share its memory copy-on-write
+    SERVER_PRELOAD: bool = True
+    SERVER_BACKLOG: int = 2048
+    # Longer than the load balancer's idle timeout, so the balancer closes idle connections first
+    SERVER_KEEPALIVE_SECONDS: int = 75
+    # Time to finish in-flight requests after SIGTERM, before buffered clicks are flushed
+    SERVER_GRACEFUL_SHUTDOWN_SECONDS: int = 30
+    # Requests in flight per worker before answering 503; None means unlimited
+    SERVER_LIMIT_CONCURRENCY: Optional[int] = None
+    SERVER_ACCESS_LOG: bool = False
+    SERVER_PROXY_HEADERS: bool = True
+    SERVER_FORWARDED_ALLOW_IPS: str = "127.0.0.1"
+    # Consecutive failed starts of one worker before the server stops and exits non-zero
+    SERVER_MAX_FAILED_STARTS: int = 5
+    # Where workers publish metric snapshots for /v1/metrics; None means a fresh temporary directory
+    SERVER_METRICS_DIR: Optional[str] = None
+    SERVER_METRICS_SNAPSHOT_SECONDS: float = 5
+
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: Literal["auto", "color", "plain", "json"] = "auto"
+    # Max INFO/DEBUG records per second per logger-name prefix; per-request lines live under these
+    LOG_RATE_LIMITS: dict[str, float] = {"app.service": 10, "app.repositories": 10}
+
+    REDIS_ENABLED: bool = True
+    REDIS_SOCKET_TIMEOUT: float = 0.1
+    REDIS_RETRY_SECONDS: float = 30
+
     model_config = SettingsConfigDict(env_file=env_file)
 
 @lru_cache()
@@ -1,24 +1,130 @@
+import atexit
+import datetime
+import json
 import logging
+import queue
 import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
 import colorlog
 
+from app.core import metrics
+from app.core.config import get_settings
+
+"""
+Process-wide logging setup.
+
+Loggers only put records on an in-memory queue; a `QueueListener` thread formats
+them and writes them to stdout, so request handlers never block on terminal or
+pipe I/O. The setup runs once, however many modules call `setup_logger`.
+
+Settings:
+    LOG_LEVEL: Root level (default INFO)
+    LOG_FORMAT: `auto` (colors on a TTY, plain otherwise), `color`, `plain` or `json`
+    LOG_RATE_LIMITS: Per-logger caps on INFO-and-below records per second, keyed
+        by logger name prefix, e.g. `{"app.service": 20}`. Warnings and errors
+        are never dropped.
+"""
+
+LOG_FORMAT = '[%(asctime)s] [%(levelname)s] - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+_lock = threading.Lock()
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+_rate_limit: Optional["RateLimitFilter"] = None
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """Writes to whatever `sys.stdout` is at emit time, so redirection keeps working."""
+
+    @property
+    def stream(self):
+        return sys.stdout
 
-def setup_logger():
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class RateLimitFilter(logging.Filter):
     """
-    Set up a logger for the entire project with a consistent format and output,
-    including colorized output for different log levels.
+    Token bucket per logger-name prefix for INFO-and-below records.
+
+    A logger matches the longest configured prefix of its dotted name. Dropped
+    records are counted in `suppressed`, per prefix.
     """
-    logger = logging.getLogger()  # Root logger
-    logger.setLevel(logging.INFO)  # Set root logger to DEBUG to capture all levels
 
-    stream_handler = logging.StreamHandler(sys.stdout)
-    stream_handler.setLevel(logging.INFO)  # Set the logging level for the stream handler
+    def __init__(self, limits: dict[str, float]):
+        super().__init__()
+        self.limits = dict(limits)
+        self._prefixes = sorted(self.limits, key=len, reverse=True)
+        self._buckets: dict[str, list[float]] = {}
+        self._resolved: dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+        self.suppressed: dict[str, int] = {}
+
+    def _prefix_for(self, name: str) -> Optional[str]:
+        try:
+            return self._resolved[name]
+        except KeyError:
+            match = next(
+                (prefix for prefix in self._prefixes if name == prefix or name.startswith(prefix + ".")), None
+            )
+            self._resolved[name] = match
+            return match
 
-    log_format = '%(log_color)s[%(asctime)s] [%(levelname)s] - %(message)s'
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        prefix = self._prefix_for(record.name)
+        if prefix is None:
+            return True
+        rate = self.limits[prefix]
+        now = time.monotonic()
+        with self._lock:
+            # [tokens, last refill]; the bucket holds at most one second's worth
+            bucket = self._buckets.setdefault(prefix, [rate, now])
+            bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True
+            self.suppressed[prefix] = self.suppressed.get(prefix, 0) + 1
+            return False
 
-    formatter = colorlog.ColoredFormatter(
-        log_format,
-        datefmt='%Y-%m-%d %H:%M:%S',
+
+def build_formatter(fmt: str) -> logging.Formatter:
+    if fmt == "auto":
+        isatty = getattr(sys.stdout, "isatty", None)
+        fmt = "color" if isatty is not None and isatty() else "plain"
+    if fmt == "json":
+        return JsonFormatter()
+    if fmt == "plain":
+        return logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+    return colorlog.ColoredFormatter(
+        '%(log_color)s' + LOG_FORMAT,
+        datefmt=DATE_FORMAT,
         reset=True,
         log_colors={
             'DEBUG': 'blue',  # Debug logs in blue
@@ -29,8 +135,67 @@ def setup_logger():
         }
     )
 
-    stream_handler.setFormatter(formatter)
 
-    logger.addHandler(stream_handler)
+def configure_logging(level: str = "INFO", fmt: str = "auto",
+                      rate_limits: Optional[dict[str, float]] = None) -> None:
+    """
+    (Re)configure the root logger with a single queue handler.
+
+    Safe to call repeatedly: the previous listener is drained and replaced, and
+    the root logger never ends up with more than one of our handlers.
+    """
+    global _queue_handler, _listener, _rate_limit
+    with _lock:
+        root = logging.getLogger()
+        if _listener is not None:
+            _listener.stop()
+        if _queue_handler is not None and _queue_handler in root.handlers:
+            root.removeHandler(_queue_handler)
+
+        output = _StdoutHandler()
+        output.setFormatter(build_formatter(fmt))
+        records: queue.SimpleQueue = queue.SimpleQueue()
+        _queue_handler = QueueHandler(records)
+        _rate_limit = RateLimitFilter(rate_limits) if rate_limits else None
+        if _rate_limit is not None:
+            _queue_handler.addFilter(_rate_limit)
+        _listener = QueueListener(records, output, respect_handler_level=True)
+        _listener.start()
+
+        root.setLevel(level)
+        root.addHandler(_queue_handler)
+
+
+def flush_logging() -> None:
+    """Block until every queued record has been written."""
+    with _lock:
+        if _listener is not None:
+            # stop() drains the queue and joins the thread; start a fresh one after
+            _listener.stop()
+            _listener.start()
+
+
+def _stop_listener() -> None:
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+
+
+def setup_logger(name: Optional[str] = None) -> logging.Logger:
+    """
+    Return the logger for `name` (the root logger if omitted), configuring
+    process-wide logging from settings on first use.
+    """
+    if _queue_handler is None or _queue_handler not in logging.getLogger().handlers:
+        settings = get_settings()
+        configure_logging(settings.LOG_LEVEL, settings.LOG_FORMAT, settings.LOG_RATE_LIMITS)
+    return logging.getLogger(name)
+
+
+atexit.register(_stop_listener)
 
-    return logger
+metrics.counter_func(
+    "log_records_suppressed_total", "INFO and DEBUG records dropped by LOG_RATE_LIMITS",
+    lambda: {(prefix,): count for prefix, count in _rate_limit.suppressed.items()} if _rate_limit else {},
+    ("logger",),
+)
@@ -0,0 +1,319 @@
+import asyncio
+import json
+import math
+import os
+import threading
+from bisect import bisect_left
+from pathlib import Path
+from typing import Callable, Iterable, Optional, Union
+
+"""
+In-process metrics with a cheap recording path.
+
+Counters and histograms keep one shard (a plain dict) per thread, so recording
+is a dict update on memory no other thread writes to and never takes a lock.
+Shards are summed only when the metrics are collected. `render` writes the
+registry in the Prometheus text exposition format.
+
+With several worker processes (app/server.py) each registry only sees its own
+process, and a scrape lands on an arbitrary worker. After `enable_multiprocess`
+each worker writes a JSON snapshot of its registry to a shared directory, and
+`render_all` renders every worker's latest snapshot with a `worker` label, so
+each series stays monotonic no matter which worker answers the scrape.
+"""
+
+LabelValues = tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Sharded:
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: list[dict] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = {}
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def _snapshot(self) -> list[dict]:
+        with self._lock:
+            shards = list(self._shards)
+        return [dict(shard) for shard in shards]
+
+
+class Counter(_Sharded):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def inc(self, labels: LabelValues = (), amount: float = 1) -> None:
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0) + amount
+
+    def collect(self) -> dict[LabelValues, float]:
+        totals: dict[LabelValues, float] = {}
+        for shard in self._snapshot():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0) + value
+        return totals
+
+
+class Histogram(_Sharded):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__()
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: LabelValues = ()) -> None:
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # Per-bucket (non-cumulative) counts, then +Inf bucket, sum, count
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def collect(self) -> dict[LabelValues, list]:
+        totals: dict[LabelValues, list] = {}
+        for shard in self._snapshot():
+            for labels, state in shard.items():
+                current = totals.get(labels)
+                if current is None:
+                    totals[labels] = list(state)
+                else:
+                    for index, value in enumerate(state):
+                        current[index] += value
+        return totals
+
+
+class Gauge:
+    """A value read from `func` at collection time."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str,
+                 func: Callable[[], Union[float, dict[LabelValues, float]]],
+                 labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.func = func
+
+    def collect(self) -> dict[LabelValues, float]:
+        value = self.func()
+        return value if isinstance(value, dict) else {(): value}
+
+
+class CounterFunc(Gauge):
+    """A running total read from `func` at collection time, for counts kept elsewhere."""
+    kind = "counter"
+
+
+Metric = Union[Counter, Histogram, Gauge]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def metrics(self) -> list[Metric]:
+        with self._lock:
+            return list(self._metrics.values())
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Iterable[str] = (),
+              buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def gauge(name: str, documentation: str, func: Callable[[], Union[float, dict[LabelValues, float]]],
+          labelnames: Iterable[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, func, labelnames))
+
+
+def counter_func(name: str, documentation: str, func: Callable[[], Union[float, dict[LabelValues, float]]],
+                 labelnames: Iterable[str] = ()) -> CounterFunc:
+    return REGISTRY.register(CounterFunc(name, documentation, func, labelnames))
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value, quotes: bool = True) -> str:
+    text = str(value).replace("\\", "\\\\").replace("\n", "\\n")
+    return text.replace('"', '\\"') if quotes else text
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value) -> str:
+    if value is None:
+        return "NaN"
+    value = float(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _render_metric(metric: Metric, lines: list[str]) -> None:
+    samples = metric.collect()
+    lines.append(f"# HELP {metric.name} {_escape(metric.documentation, quotes=False)}")
+    lines.append(f"# TYPE {metric.name} {metric.kind}")
+    for labels, value in sorted(samples.items(), key=lambda item: tuple(map(str, item[0]))):
+        if metric.kind != "histogram":
+            lines.append(f"{metric.name}{_format_labels(metric.labelnames, labels)} {_format_value(value)}")
+            continue
+        cumulative = 0
+        for bound, count in zip((*metric.buckets, math.inf), value):
+            cumulative += count
+            le = f'le="{_format_value(bound)}"'
+            lines.append(f"{metric.name}_bucket{_format_labels(metric.labelnames, labels, le)} {cumulative}")
+        label_text = _format_labels(metric.labelnames, labels)
+        lines.append(f"{metric.name}_sum{label_text} {_format_value(value[-2])}")
+        lines.append(f"{metric.name}_count{label_text} {value[-1]}")
+
+
+def render(registry: Registry = REGISTRY) -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    lines: list[str] = []
+    for metric in sorted(registry.metrics(), key=lambda m: m.name):
+        try:
+            _render_metric(metric, lines)
+        except Exception as e:
+            # One broken gauge callback must not take the whole scrape down
+            lines.append(f"# {metric.name} unavailable: {_escape(e, quotes=False)}")
+    return "\n".join(lines) + "\n"
+
+
+class _SnapshotFamily:
+    """A metric family read back from worker snapshots; renders like a live metric with a `worker` label."""
+
+    def __init__(self, name: str, documentation: str, kind: str, labelnames: Iterable[str],
+                 buckets: Iterable[float]):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = (*labelnames, "worker")
+        self.buckets = tuple(buckets)
+        self.samples: dict[LabelValues, Union[float, list]] = {}
+
+    def collect(self) -> dict[LabelValues, Union[float, list]]:
+        return self.samples
+
+
+def snapshot(registry: Registry = REGISTRY) -> dict:
+    """Collect every metric into a JSON-serializable dict keyed by metric name."""
+    families = {}
+    for metric in registry.metrics():
+        try:
+            samples = metric.collect()
+        except Exception:
+            continue
+        families[metric.name] = {
+            "help": metric.documentation,
+            "type": metric.kind,
+            "labelnames": list(metric.labelnames),
+            "buckets": list(getattr(metric, "buckets", ())),
+            "samples": [[list(labels), value] for labels, value in samples.items()],
+        }
+    return families
+
+
+def render_snapshots(snapshots: dict[str, dict]) -> str:
+    """Render snapshots keyed by worker name, one family per metric across all workers."""
+    families: dict[str, _SnapshotFamily] = {}
+    for worker, families_by_name in sorted(snapshots.items()):
+        for name, family in families_by_name.items():
+            merged = families.get(name)
+            if merged is None:
+                merged = families[name] = _SnapshotFamily(
+                    name, family["help"], family["type"], family["labelnames"], family["buckets"]
+                )
+            for labels, value in family["samples"]:
+                merged.samples[(*labels, worker)] = value
+    lines: list[str] = []
+    for name in sorted(families):
+        _render_metric(families[name], lines)
+    return "\n".join(lines) + "\n"
+
+
+_snapshot_dir: Optional[Path] = None
+_worker: Optional[str] = None
+
+
+def enable_multiprocess(directory: Path, worker: str) -> None:
+    """Publish this process's metrics to `directory` as worker `worker` (call in each worker)."""
+    global _snapshot_dir, _worker
+    _snapshot_dir, _worker = directory, worker
+
+
+def multiprocess_enabled() -> bool:
+    return _snapshot_dir is not None
+
+
+def write_snapshot(registry: Registry = REGISTRY) -> None:
+    if _snapshot_dir is None:
+        return
+    path = _snapshot_dir / f"{_worker}.json"
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(snapshot(registry)))
+    os.replace(tmp_path, path)
+
+
+async def write_snapshot_async() -> None:
+    await asyncio.to_thread(write_snapshot)
+
+
+def render_all(registry: Registry = REGISTRY) -> str:
+    """`render`, or with `enable_multiprocess` every worker's metrics, this one's fresh."""
+    if _snapshot_dir is None:
+        return render(registry)
+    write_snapshot(registry)
+    snapshots = {}
+    for path in _snapshot_dir.glob("*.json"):
+        try:
+            snapshots[path.stem] = json.loads(path.read_text())
+        except (OSError, ValueError):
+            # A worker mid-replace or a stray file; its series return on the next scrape
+            continue
+    return render_snapshots(snapshots)
@@ -0,0 +1,26 @@
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.config import get_settings
+from app.db.pool import engine_options
+from app.db.sql_database import build_database_url
+
+ASYNC_DATABASE_URL = build_database_url("postgresql+asyncpg")
+
+# Async engine used by the request path; the sync engine in sql_database
+# remains for scripts and tooling.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(get_settings(), "async", is_async=True))
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+async def get_async_db():
+    """
+    Dependency function to get an async database session.
+
+    Yields:
+        AsyncSession: Database session to execute queries
+
+    Notes:
+        Session is closed automatically after request is complete
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,94 @@
+import time
+import weakref
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core import metrics
+from app.core.config import Settings
+
+"""
+Connection pool configuration and instrumentation shared by the sync and async engines.
+"""
+
+POOL_CHECKOUT_WAIT = metrics.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled database connection",
+    ("pool",),
+)
+POOL_CHECKOUT_TIMEOUTS = metrics.counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up after DB_POOL_TIMEOUT",
+    ("pool",),
+)
+
+_pools: "weakref.WeakValueDictionary[str, QueuePool]" = weakref.WeakValueDictionary()
+
+
+class _TimedPoolMixin:
+    metrics_name = "default"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _pools[self.metrics_name] = self
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.inc((self.metrics_name,))
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start, (self.metrics_name,))
+
+
+def timed_pool_class(name: str, is_async: bool = False) -> type:
+    base = AsyncAdaptedQueuePool if is_async else QueuePool
+    return type(f"Timed{base.__name__}", (_TimedPoolMixin, base), {"metrics_name": name})
+
+
+def pool_stats() -> dict[str, dict]:
+    stats = {}
+    for name, pool in list(_pools.items()):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        checked_out = pool.checkedout()
+        stats[name] = {
+            "size": pool.size(),
+            "checked_out": checked_out,
+            "overflow": pool.overflow(),
+            "saturation": checked_out / capacity if capacity else 0.0,
+        }
+    return stats
+
+
+def _pool_gauge(field: str):
+    return lambda: {(name,): values[field] for name, values in pool_stats().items()}
+
+
+metrics.gauge("db_pool_checked_out", "Connections currently checked out", _pool_gauge("checked_out"), ("pool",))
+metrics.gauge("db_pool_size", "Configured pool size", _pool_gauge("size"), ("pool",))
+metrics.gauge("db_pool_saturation", "Checked-out connections / (pool size + max overflow)",
+              _pool_gauge("saturation"), ("pool",))
+
+
+def engine_options(settings: Settings, name: str, is_async: bool = False) -> dict:
+    """
+    Keyword arguments for `create_engine` / `create_async_engine` built from `Settings`.
+
+    The server-side `statement_timeout` is set per connection so a runaway query
+    releases its pooled connection instead of holding it indefinitely.
+    """
+    if is_async:
+        connect_args = {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+    else:
+        connect_args = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return {
+        "poolclass": timed_pool_class(name, is_async),
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "connect_args": connect_args,
+    }
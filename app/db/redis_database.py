@@ -0,0 +1,31 @@
+from functools import lru_cache
+from typing import Optional
+
+from app.core.config import get_settings
+from app.core.logging_config import setup_logger
+
+try:
+    from redis import asyncio as redis
+except ImportError:  # pragma: no cover - redis is optional
+    redis = None
+
+logger = setup_logger(__name__)
+
+
+@lru_cache()
+def get_redis() -> Optional["redis.Redis"]:
+    """
+    Shared asyncio Redis client for the process, or None if Redis is disabled.
+
+    Connections are made lazily, so this never fails when Redis is down; callers
+    are expected to handle `redis.RedisError` on each command.
+    """
+    settings = get_settings()
+    if redis is None or not settings.REDIS_ENABLED:
+        logger.info("Redis disabled; running with in-process caches only")
+        return None
+    return redis.Redis.from_url(
+        settings.REDIS_URL,
+        socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    )
@@ -2,19 +2,25 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from app.core.config import get_settings
+from app.db.pool import engine_options
 
 settings = get_settings()
 
-DATABASE_URL = (
-    f"postgresql://{settings.USER}:"
-    f"{settings.PASSWORD.get_secret_value()}@"
-    f"{settings.HOST}:"
-    f"{settings.PORT}/"
-    f"{settings.DBNAME}"
-)
+
+def build_database_url(driver: str = "postgresql") -> str:
+    return (
+        f"{driver}://{settings.USER}:"
+        f"{settings.PASSWORD.get_secret_value()}@"
+        f"{settings.HOST}:"
+        f"{settings.PORT}/"
+        f"{settings.DBNAME}"
+    )
+
+
+DATABASE_URL = build_database_url()
 
 # Create SQLAlchemy engine
-engine = create_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **engine_options(settings, "sync"))
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
@@ -34,4 +40,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -1,8 +1,20 @@
-import aiohttp
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
+
+import aiohttp
+from app.core import metrics
+from app.core.config import get_settings
 from app.core.logging_config import setup_logger
+from app.integration.domain_index import DomainIndex, InvalidIndexFileError
+from app.utils.periodic_task import PeriodicTask
 
-logger = setup_logger()
+logger = setup_logger(__name__)
 
 CERT_URL = "https://hole.cert.pl/domains/v2/domains.txt"
 LOCAL_BACKUP = Path("data/blacklist.txt")
@@ -10,6 +22,15 @@ LOCAL_BACKUP = Path("data/blacklist.txt")
 class BlacklistUnavailableError(Exception):
     """Raised when the blacklist cannot be fetched or loaded."""
 
+
+def parse_domains(text: str) -> frozenset[str]:
+    return frozenset(
+        line.strip().lower()
+        for line in text.splitlines()
+        if line and not line.startswith("#")
+    )
+
+
 async def fetch_blacklist() -> set[str]:
     try:
         timeout = aiohttp.ClientTimeout(total=5)
@@ -17,11 +38,7 @@ async def fetch_blacklist() -> set[str]:
             async with session.get(CERT_URL) as response:
                 if response.status == 200:
                     text = await response.text()
-                    domains = {
-                        line.strip().lower()
-                        for line in text.splitlines()
-                        if line and not line.startswith("#")
-                    }
+                    domains = set(parse_domains(text))
                     LOCAL_BACKUP.write_text(text)
                     logger.info(f"Fetched {len(domains)} domains from CERT URL")
                     return domains
@@ -32,13 +49,258 @@ async def fetch_blacklist() -> set[str]:
 
     if LOCAL_BACKUP.exists():
         logger.info("Loading blacklist from local backup")
-        text = LOCAL_BACKUP.read_text()
-        return {
-            line.strip().lower()
-            for line in text.splitlines()
-            if line and not line.startswith("#")
-        }
+        return set(parse_domains(LOCAL_BACKUP.read_text()))
 
     logger.error("No backup available; cannot validate domains")
     raise BlacklistUnavailableError("Unable to fetch or load blacklist")
 
+
+def _replace_file(path: Path, text: str) -> None:
+    """Write `path` through a per-process temp file (workers may write at the same time) and rename it into place."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "w") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except OSError:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+
+@dataclass(frozen=True)
+class BlacklistSnapshot:
+    """Immutable view of the blacklist; replaced as a whole on every refresh."""
+    domains: DomainIndex
+    source: str
+    loaded_at: float
+
+
+@dataclass(frozen=True)
+class Validators:
+    """What the remote server said about the list in the index file, kept next to it across restarts."""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    # When the list was downloaded
+    fetched_at: Optional[float] = None
+
+
+class BlacklistService:
+    """
+    Process-wide blacklist held in memory.
+
+    The list is loaded once at startup and then refreshed in the background using
+    conditional requests, so request handlers only ever do an index lookup against
+    the current snapshot.
+
+    The snapshot is a read-only mapping of the compiled index file, so all workers
+    on a host share one page-cache copy. Startup prefers the compiled file, then the
+    text backup (compiled on the fly), then the remote list. A refresh compiles a new
+    file and renames it into place; other workers notice the newer file and remap it.
+
+    Conditional requests only ever send the ETag and Last-Modified the remote server
+    returned for the list in the index file. They are stored in a sidecar file
+    (`<index>.json`); an index without one, such as a bundled or locally compiled
+    list, is re-downloaded unconditionally.
+    """
+
+    def __init__(self, url: str = CERT_URL, backup_path: Optional[Path] = None,
+                 index_path: Optional[Path] = None, refresh_seconds: float = 3600,
+                 fetch_timeout: float = 30):
+        self.url = url
+        self.backup_path = backup_path if backup_path is not None else LOCAL_BACKUP
+        self.index_path = index_path if index_path is not None else self.backup_path.with_suffix(".idx")
+        self.validators_path = self.index_path.with_name(f"{self.index_path.name}.json")
+        self.fetch_timeout = fetch_timeout
+        self._snapshot: Optional[BlacklistSnapshot] = None
+        self._validators = Validators()
+        # When the remote server last sent the list or confirmed it unchanged
+        self._confirmed_at: Optional[float] = None
+        self._last_checked: Optional[float] = None
+        self._load_lock = asyncio.Lock()
+        self._initial_refresh: Optional[asyncio.Task] = None
+        self._refresher = PeriodicTask("blacklist-refresh", refresh_seconds, self.refresh)
+
+    @property
+    def snapshot(self) -> Optional[BlacklistSnapshot]:
+        return self._snapshot
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def match(self, value: str) -> Optional[str]:
+        """
+        Return the blacklisted domain covering a URL, netloc or hostname, if any.
+
+        Subdomains of a listed domain match; ports and userinfo are ignored.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            raise BlacklistUnavailableError("Blacklist has not been loaded")
+        return snapshot.domains.match(value)
+
+    def contains(self, value: str) -> bool:
+        return self.match(value) is not None
+
+    def stats(self) -> dict:
+        snapshot = self._snapshot
+        now = time.time()
+        return {
+            "loaded": snapshot is not None,
+            "size": len(snapshot.domains) if snapshot else 0,
+            "index_bytes": snapshot.domains.nbytes if snapshot else 0,
+            "source": snapshot.source if snapshot else None,
+            "age_seconds": round(now - self._confirmed_at, 3) if snapshot and self._confirmed_at else None,
+            "last_checked_seconds_ago": round(now - self._last_checked, 3) if self._last_checked else None,
+        }
+
+    async def start(self) -> None:
+        """Load the initial snapshot and schedule background refreshes."""
+        try:
+            await self.ensure_loaded()
+        except BlacklistUnavailableError:
+            logger.error("Blacklist unavailable at startup; domain checks will fail until a refresh succeeds")
+        self._refresher.start()
+
+    async def stop(self) -> None:
+        if self._initial_refresh is not None and not self._initial_refresh.done():
+            self._initial_refresh.cancel()
+        await self._refresher.stop()
+
+    async def ensure_loaded(self) -> None:
+        if self._snapshot is not None:
+            return
+        async with self._load_lock:
+            if self._snapshot is not None:
+                return
+            if await asyncio.to_thread(self._load_local):
+                # Local copies may be stale; pick up the live list in the background.
+                self._initial_refresh = asyncio.create_task(self.refresh())
+                return
+            if not await self.refresh():
+                raise BlacklistUnavailableError("Unable to fetch or load blacklist")
+
+    async def refresh(self) -> bool:
+        """
+        Conditionally re-download the blacklist and swap in a new snapshot.
+
+        Returns:
+            bool: True if the current snapshot is up to date with the remote list
+        """
+        await asyncio.to_thread(self._remap_if_newer)
+
+        headers = {}
+        if self._snapshot is not None and self._validators.etag:
+            headers["If-None-Match"] = self._validators.etag
+        if self._snapshot is not None and self._validators.last_modified:
+            headers["If-Modified-Since"] = self._validators.last_modified
+
+        try:
+            timeout = aiohttp.ClientTimeout(total=self.fetch_timeout)
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(self.url, headers=headers) as response:
+                    self._last_checked = time.time()
+                    if response.status == 304 and headers:
+                        logger.debug("Blacklist not modified since last fetch")
+                        self._confirmed_at = self._last_checked
+                        return True
+                    if response.status != 200:
+                        logger.warning(f"Remote fetch failed with status {response.status}")
+                        return False
+                    text = await response.text()
+                    validators = Validators(response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                                            self._last_checked)
+        except Exception as e:
+            logger.error(f"Unable to refresh blacklist: {e}")
+            return False
+
+        domains = await asyncio.to_thread(self._compile, text, validators)
+        self._snapshot = BlacklistSnapshot(domains=domains, source=self.url, loaded_at=time.time())
+        self._validators, self._confirmed_at = validators, validators.fetched_at
+        await asyncio.to_thread(self._write_backup, text)
+        logger.info(f"Refreshed blacklist with {len(domains)} domains")
+        return True
+
+    def _load_local(self) -> bool:
+        """Load the compiled index, compiling it from the text backup if needed."""
+        if not self.index_path.exists() and self.backup_path.exists():
+            logger.info("Compiling blacklist index from local backup")
+            self._compile(self.backup_path.read_text())
+        return self._map_index()
+
+    def _compile(self, text: str, validators: Optional[Validators] = None) -> DomainIndex:
+        """Write the index file, with `validators` as its sidecar; without them the sidecar is removed."""
+        index = DomainIndex.from_text(text)
+        try:
+            # Never leave validators next to an index they do not describe
+            self.validators_path.unlink(missing_ok=True)
+            index.write(self.index_path)
+        except OSError as e:
+            logger.warning(f"Unable to write compiled blacklist index: {e}")
+            return index
+        if validators is not None:
+            try:
+                _replace_file(self.validators_path, json.dumps(vars(validators)))
+            except OSError as e:
+                logger.warning(f"Unable to write blacklist validators: {e}")
+        return DomainIndex.open(self.index_path)
+
+    def _read_validators(self) -> Validators:
+        try:
+            return Validators(**json.loads(self.validators_path.read_text()))
+        except FileNotFoundError:
+            return Validators()
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable blacklist validators: {e}")
+            return Validators()
+
+    def _map_index(self) -> bool:
+        try:
+            loaded_at = self.index_path.stat().st_mtime
+            domains = DomainIndex.open(self.index_path)
+        except (OSError, InvalidIndexFileError) as e:
+            logger.warning(f"Unable to map compiled blacklist index: {e}")
+            return False
+        self._snapshot = BlacklistSnapshot(domains=domains, source=str(self.index_path), loaded_at=loaded_at)
+        self._validators = self._read_validators()
+        self._confirmed_at = self._validators.fetched_at
+        logger.info(f"Mapped {len(domains)} blacklisted domains from {self.index_path}")
+        return True
+
+    def _remap_if_newer(self) -> None:
+        """Pick up an index file that another worker has renamed into place."""
+        try:
+            mtime = self.index_path.stat().st_mtime
+        except OSError:
+            return
+        if self._snapshot is None or mtime > self._snapshot.loaded_at:
+            self._map_index()
+
+    def _write_backup(self, text: str) -> None:
+        try:
+            _replace_file(self.backup_path, text)
+        except OSError as e:
+            logger.warning(f"Unable to write blacklist backup: {e}")
+
+
+@lru_cache()
+def get_blacklist_service() -> BlacklistService:
+    settings = get_settings()
+    return BlacklistService(
+        url=settings.BLACKLIST_URL,
+        backup_path=Path(settings.BLACKLIST_BACKUP_PATH),
+        index_path=Path(settings.BLACKLIST_INDEX_PATH),
+        refresh_seconds=settings.BLACKLIST_REFRESH_SECONDS,
+        fetch_timeout=settings.BLACKLIST_FETCH_TIMEOUT,
+    )
+
+
+metrics.gauge("blacklist_domains", "Domains in the loaded blacklist",
+              lambda: get_blacklist_service().stats()["size"])
+metrics.gauge("blacklist_index_bytes", "Memory used by the blacklist hashes",
+              lambda: get_blacklist_service().stats()["index_bytes"])
+metrics.gauge("blacklist_age_seconds",
+              "Seconds since the remote server last sent the blacklist or confirmed it unchanged; NaN if it never has",
+              lambda: get_blacklist_service().stats()["age_seconds"])
@@ -0,0 +1,188 @@
+import argparse
+import hashlib
+import mmap
+import os
+import re
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, Optional, Sequence
+from urllib.parse import urlsplit
+
+"""
+Compact, suffix-aware index of blacklisted domains.
+
+Each domain is stored as a 64-bit hash in a sorted `array('Q')`, which costs
+8 bytes per entry instead of the ~70+ bytes of a `str` object plus its set slot.
+A lookup hashes the host and each of its parent suffixes and binary-searches
+for them, so `login.bad.com` is matched by a `bad.com` entry.
+
+The same sorted hashes can be compiled to a small binary file and memory-mapped
+read-only, so every worker process shares a single page-cache copy:
+
+    python -m app.integration.domain_index data/blacklist.txt data/blacklist.idx
+"""
+
+INDEX_MAGIC = b"URLBLIX1"
+# magic, entry count; followed by `count` little-endian uint64 hashes in ascending order
+_HEADER = struct.Struct("<8sQ")
+
+_PLAIN_HOST = re.compile(r"[a-z0-9._-]+")
+
+
+def normalize_host(value: str) -> Optional[str]:
+    """
+    Reduce a URL, netloc or bare hostname to a lowercase ASCII (IDNA) hostname.
+
+    Userinfo, port and a trailing dot are dropped. Returns None if no host
+    can be extracted.
+    """
+    value = value.strip().lower()
+    if _PLAIN_HOST.fullmatch(value):
+        # Fast path for list entries and most hosts: already ASCII, no port/userinfo.
+        return value.rstrip(".") or None
+    if "//" not in value:
+        value = "//" + value
+    try:
+        host = urlsplit(value).hostname
+    except ValueError:
+        return None
+    if not host:
+        return None
+    host = host.rstrip(".")
+    try:
+        host = host.encode("idna").decode("ascii")
+    except UnicodeError:
+        pass
+    return host.lower() or None
+
+
+def domain_hash(domain: str) -> int:
+    return int.from_bytes(hashlib.blake2b(domain.encode(), digest_size=8).digest(), "big")
+
+
+def iter_suffixes(host: str) -> Iterable[str]:
+    """Yield `host` and each of its parent domains, most specific first."""
+    yield host
+    index = host.find(".")
+    while index != -1:
+        host = host[index + 1:]
+        yield host
+        index = host.find(".")
+
+
+class InvalidIndexFileError(Exception):
+    """Raised when a compiled index file is truncated or has an unknown format."""
+
+
+class DomainIndex:
+    __slots__ = ("_hashes", "_mmap")
+
+    def __init__(self, hashes: Sequence[int], mapping: Optional[mmap.mmap] = None):
+        """
+        Args:
+            hashes (Sequence[int]): Sorted, de-duplicated 64-bit domain hashes
+                (an `array('Q')` or a `memoryview` over a mapped index file)
+            mapping (Optional[mmap.mmap]): Backing mapping kept alive with the index
+        """
+        self._hashes = hashes
+        self._mmap = mapping
+
+    @classmethod
+    def open(cls, path: Path) -> "DomainIndex":
+        """Memory-map a compiled index file read-only."""
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                raise InvalidIndexFileError(f"{path} is too small to be a domain index")
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, count = _HEADER.unpack_from(mapping)
+        if magic != INDEX_MAGIC or size != _HEADER.size + count * 8:
+            mapping.close()
+            raise InvalidIndexFileError(f"{path} is not a valid domain index")
+
+        if sys.byteorder == "little":
+            return cls(memoryview(mapping)[_HEADER.size:].cast("Q"), mapping)
+
+        hashes = array("Q", mapping[_HEADER.size:])
+        hashes.byteswap()
+        mapping.close()
+        return cls(hashes)
+
+    def write(self, path: Path) -> None:
+        """
+        Write the index in its compiled form.
+
+        The file is written next to `path` and renamed into place, so readers
+        that map `path` only ever see a complete file.
+        """
+        hashes = array("Q", self._hashes)
+        if sys.byteorder != "little":
+            hashes.byteswap()
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER.pack(INDEX_MAGIC, len(hashes)))
+            hashes.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_domains(cls, domains: Iterable[str]) -> "DomainIndex":
+        hashes = {domain_hash(host) for host in map(normalize_host, domains) if host}
+        return cls(array("Q", sorted(hashes)))
+
+    @classmethod
+    def from_text(cls, text: str) -> "DomainIndex":
+        return cls.from_domains(
+            line for line in text.splitlines()
+            if line.strip() and not line.startswith("#")
+        )
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, value: str) -> bool:
+        return self.match(value) is not None
+
+    @property
+    def nbytes(self) -> int:
+        return self._hashes.itemsize * len(self._hashes)
+
+    def _contains_hash(self, value: int) -> bool:
+        hashes = self._hashes
+        index = bisect_left(hashes, value)
+        return index < len(hashes) and hashes[index] == value
+
+    def match(self, value: str) -> Optional[str]:
+        """
+        Find the blacklisted entry covering a URL, netloc or hostname.
+
+        Returns:
+            Optional[str]: The matching host or parent domain, or None
+        """
+        host = normalize_host(value)
+        if host is None:
+            return None
+        for suffix in iter_suffixes(host):
+            if self._contains_hash(domain_hash(suffix)):
+                return suffix
+        return None
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Compile a domain list into a memory-mappable index.")
+    parser.add_argument("source", type=Path, help="Text file with one domain per line")
+    parser.add_argument("target", type=Path, help="Compiled index file to write")
+    args = parser.parse_args(argv)
+
+    index = DomainIndex.from_text(args.source.read_text())
+    index.write(args.target)
+    print(f"Compiled {len(index)} domains into {args.target}")
+
+
+if __name__ == "__main__":
+    main()
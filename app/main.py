@@ -1,22 +1,68 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.core import metrics
 from app.core.config import get_settings
 from app.core.logging_config import setup_logger
+from app.core.metrics_middleware import MetricsMiddleware
+from app.integration.blacklist import get_blacklist_service
+from app.service.cache_warmer import get_cache_warmer
+from app.service.click_aggregator import get_click_aggregator
+from app.service.click_events import get_click_events
+from app.service.short_code_filter import get_short_code_filter
+from app.service.url_reaper import get_url_reaper
 from app.routes import urls_router
-from starlette.responses import JSONResponse
+from app.routes.redirect_fast_path import RedirectFastPath
+from app.utils.periodic_task import PeriodicTask
+from starlette.responses import JSONResponse, Response
 from starlette import status
 
-logger = setup_logger()
+logger = setup_logger(__name__)
 settings = get_settings()
 
 
+@asynccontextmanager
+async def lifespan(application: FastAPI):
+    blacklist = get_blacklist_service()
+    clicks = get_click_aggregator()
+    click_events = get_click_events()
+    reaper = get_url_reaper()
+    # Fails here, before serving, if SHORT_CODE_SECRET is missing
+    known_codes = get_short_code_filter()
+    warmer = get_cache_warmer()
+    # Only under the pre-fork server (app/server.py), which gives each worker a snapshot slot
+    metrics_snapshots = PeriodicTask("metrics-snapshot", settings.SERVER_METRICS_SNAPSHOT_SECONDS,
+                                     metrics.write_snapshot_async)
+    if metrics.multiprocess_enabled():
+        metrics_snapshots.start()
+    await blacklist.start()
+    known_codes.start()
+    clicks.start()
+    click_events.start()
+    reaper.start()
+    # Before yield: this worker accepts no connections until its caches are warm
+    await warmer.start()
+    try:
+        yield
+    finally:
+        await warmer.stop()
+        await reaper.stop()
+        await known_codes.stop()
+        await click_events.stop()
+        await clicks.stop()
+        await blacklist.stop()
+        await metrics_snapshots.stop()
+
+
 def create_app():
     application = FastAPI(
         title="URL Shortener API",
         version="0.0.1",
         docs_url="/docs" if settings.ENV else None,
         redoc_url="/redoc" if settings.ENV else None,
-        openapi_url="/openapi.json" if settings.ENV else None
+        openapi_url="/openapi.json" if settings.ENV else None,
+        lifespan=lifespan
     )
 
     origins = [
@@ -40,7 +86,25 @@ def create_app():
     def health_check():
         return JSONResponse(content={"status": "ok"}, status_code=status.HTTP_200_OK)
 
+    @application.get("/v1/ready")
+    def readiness_check():
+        """503 until this worker's cache warm-up has succeeded; /v1/health is liveness only."""
+        warmer = get_cache_warmer()
+        if warmer.state == "failed":
+            return JSONResponse(content={"status": "failed", "error": warmer.error},
+                                status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+        if not warmer.ready:
+            return JSONResponse(content={"status": "warming"}, status_code=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return JSONResponse(content={"status": "ready", "warmed": warmer.warmed}, status_code=status.HTTP_200_OK)
+
+    @application.get("/v1/metrics", include_in_schema=False)
+    def metrics_endpoint():
+        return Response(content=metrics.render_all(), media_type=metrics.CONTENT_TYPE)
+
     application.include_router(urls_router.router)
+    # Ahead of CORS, routing and dependency injection; only MetricsMiddleware wraps it
+    application.add_middleware(RedirectFastPath)
+    application.add_middleware(MetricsMiddleware)
 
     return application
 
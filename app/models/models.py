@@ -1,17 +1,88 @@
 import uuid
 
-from sqlalchemy import Column, Integer, String, DateTime, UUID
+from sqlalchemy import (
+    BigInteger, Column, Identity, Index, Integer, LargeBinary, PrimaryKeyConstraint, SmallInteger, String, Text, DateTime,
+    UUID, Sequence
+)
 from sqlalchemy.sql import func
 from app.db.sql_database import Base
+from app.utils.url_digest import DIGEST_SIZE, url_digest
+
+# Each value reserves a block of SHORT_CODE_BLOCK_SIZE short code ids (see app/utils/short_codes.py)
+short_code_block_seq = Sequence("urls_short_code_block_seq", start=1, metadata=Base.metadata)
+
+DEFAULT_REDIRECT_STATUS = 302
+# Permanent redirects are cached by browsers and CDNs (see app/service/url_service.py)
+PERMANENT_REDIRECT_STATUSES = frozenset({301, 308})
+
+
+def _original_url_digest(context) -> bytes:
+    return url_digest(context.get_current_parameters()["original_url"])
 
 
 class Urls(Base):
     __tablename__ = "urls"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    original_url = Column(String(150), unique=True, nullable=False)
+    original_url = Column(Text, nullable=False)
+    # Dedup key: unique index on a fixed-width digest instead of the URL text
+    original_url_digest = Column(LargeBinary(DIGEST_SIZE), unique=True, nullable=False, default=_original_url_digest)
     shortened_url = Column(String(50), unique=True, nullable=False, index=True)
     clicks = Column(Integer, default=0, nullable=False)
     created = Column(DateTime, default=func.now())
     updated = Column(DateTime, default=func.now(), onupdate=func.now())
     valid_until = Column(DateTime, nullable=True)
+    redirect_status = Column(SmallInteger, default=DEFAULT_REDIRECT_STATUS, nullable=False)
+
+    __table_args__ = (
+        # Keeps the expiry sweep (app/service/url_reaper.py) an index range scan
+        Index("idx_urls_valid_until", valid_until, postgresql_where=valid_until.isnot(None)),
+    )
+
+
+class ClickEvents(Base):
+    """Raw clicks, appended in batches and consumed by the hourly rollup (app/service/click_events.py)."""
+    __tablename__ = "click_events"
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    shortened_url = Column(String(50), nullable=False)
+    occurred = Column(DateTime, nullable=False)
+    referrer = Column(Text, nullable=True)
+    agent_class = Column(String(16), nullable=False)
+    # Clicks the event stands for; a sampled beacon at rate r counts 1/r
+    weight = Column(Integer, nullable=False, default=1)
+
+
+class ClickRollupsHourly(Base):
+    __tablename__ = "click_rollups_hourly"
+
+    shortened_url = Column(String(50), nullable=False)
+    hour = Column(DateTime, nullable=False)
+    clicks = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        # INCLUDE makes the stats time series an index-only scan of the primary key, with no second index
+        PrimaryKeyConstraint(shortened_url, hour, name="click_rollups_hourly_pkey", postgresql_include=["clicks"]),
+    )
+
+
+class ClickReferrersDaily(Base):
+    __tablename__ = "click_referrers_daily"
+
+    shortened_url = Column(String(50), nullable=False)
+    day = Column(DateTime, nullable=False)
+    # Referrer host; '' for clicks without a Referer header
+    referrer = Column(Text, nullable=False)
+    clicks = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        PrimaryKeyConstraint(shortened_url, day, referrer, name="click_referrers_daily_pkey",
+                             postgresql_include=["clicks"]),
+    )
+
+
+class ClickTotals(Base):
+    __tablename__ = "click_totals"
+
+    shortened_url = Column(String(50), primary_key=True)
+    clicks = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,175 @@
+import datetime
+from typing import AsyncIterator, Iterable, Optional
+
+from sqlalchemy import Row, bindparam, func, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from app.core.logging_config import setup_logger
+from app.models.models import DEFAULT_REDIRECT_STATUS, Urls
+from app.repositories.url_repository import (
+    as_db_timestamp, build_block_high_water, build_block_reservation, build_click_increment, build_expired_purge,
+    build_oldest_expired, build_upsert, get_short_code_allocator, is_live, new_url_row
+)
+from app.utils.short_codes import ShortCodeAllocator
+from app.utils.url_digest import url_digest
+
+logger = setup_logger(__name__)
+
+# Built once so the compiled form (and asyncpg's prepared statement) is reused
+REDIRECT_LOOKUP = (
+    select(Urls.original_url, Urls.valid_until, Urls.redirect_status)
+    .where(
+        Urls.shortened_url == bindparam("code"),
+        or_(Urls.valid_until == None, Urls.valid_until > bindparam("now")),
+    )
+    .limit(1)
+)
+
+# Live links by click count, for warming the redirect cache at startup. A top-N sort
+# of urls once per worker start; `clicks` is deliberately not indexed, since every
+# click flush updates it and an index would rule out HOT updates.
+MOST_CLICKED = (
+    select(Urls.shortened_url, Urls.original_url, Urls.valid_until, Urls.redirect_status)
+    .where(
+        or_(Urls.valid_until == None, Urls.valid_until > bindparam("now")),
+    )
+    .order_by(Urls.clicks.desc())
+    .limit(bindparam("limit"))
+)
+
+
+class AsyncUrlsRepository:
+    """Async counterpart of `UrlsRepository` used by the request path."""
+
+    def __init__(self, db: AsyncSession, allocator: Optional[ShortCodeAllocator] = None):
+        self.db = db
+        self.allocator = allocator if allocator is not None else get_short_code_allocator()
+
+    async def get_by_short(self, shortened_url: str) -> Optional[Urls]:
+        logger.debug(f"Fetching URL by shortened: {shortened_url}")
+        result = await self.db.execute(
+            select(Urls).where(Urls.shortened_url == shortened_url, is_live()).limit(1)
+        )
+        return result.scalars().first()
+
+    async def create_url(self, original_url: str, valid_until: Optional[datetime.datetime] = None,
+                         redirect_status: int = DEFAULT_REDIRECT_STATUS) -> Urls:
+        """Create a shortened URL, or return the live one for the same URL, in one statement."""
+        logger.info(f"Attempting to create or reuse shortened URL for: {original_url}")
+
+        shortened_url = await self._next_short_code()
+        try:
+            url_obj = (await self.db.scalars(
+                build_upsert([new_url_row(original_url, shortened_url, valid_until, redirect_status=redirect_status)])
+            )).one()
+            await self.db.commit()
+        except IntegrityError as e:
+            await self.db.rollback()
+            logger.error(f"Failed to create shortened URL: {e}")
+            raise
+
+        if url_obj.shortened_url == shortened_url:
+            logger.info(f"Created new shortened URL with code: {shortened_url}")
+        else:
+            logger.info(f"Found existing valid URL. Returning with short code: {url_obj.shortened_url}")
+        return url_obj
+
+    async def create_many(
+            self, items: Iterable[tuple[str, Optional[datetime.datetime], int]]) -> dict[str, tuple[Urls, bool]]:
+        """
+        Create or reuse shortened URLs for many originals in one upsert statement.
+
+        Args:
+            items: (original_url, valid_until, redirect_status) triples; the first
+                one wins for duplicates
+
+        Returns:
+            dict[str, tuple[Urls, bool]]: Row and whether it was created, keyed by
+            original URL. URLs that normalize to the same digest share one row.
+        """
+        requested: dict[str, bytes] = {}
+        rows: dict[bytes, dict] = {}
+        for original_url, valid_until, redirect_status in items:
+            if original_url in requested:
+                continue
+            digest = requested[original_url] = url_digest(original_url)
+            if digest not in rows:
+                rows[digest] = new_url_row(
+                    original_url, await self._next_short_code(), valid_until, digest, redirect_status
+                )
+        if not rows:
+            return {}
+
+        returned = (await self.db.scalars(build_upsert(list(rows.values())))).all()
+        await self.db.commit()
+
+        found = {}
+        for url_obj in returned:
+            proposed = rows[url_obj.original_url_digest]["shortened_url"]
+            found[url_obj.original_url_digest] = (url_obj, url_obj.shortened_url == proposed)
+        created_count = sum(1 for _, was_created in found.values() if was_created)
+        logger.info(f"Batch shortened {len(requested)} URLs, created {created_count}")
+        return {original_url: found[digest] for original_url, digest in requested.items() if digest in found}
+
+    async def bulk_increment_clicks(self, counts: dict[str, int]) -> int:
+        if not counts:
+            return 0
+        result = await self.db.execute(build_click_increment(counts))
+        await self.db.commit()
+        logger.debug(f"Flushed clicks for {len(counts)} short codes")
+        return result.rowcount
+
+    async def purge_expired(self, before: datetime.datetime, limit: int) -> int:
+        """Delete up to `limit` rows that expired before `before` and commit."""
+        result = await self.db.execute(build_expired_purge(before, limit))
+        await self.db.commit()
+        return result.rowcount
+
+    async def oldest_expired(self, before: datetime.datetime) -> Optional[datetime.datetime]:
+        return (await self.db.execute(build_oldest_expired(before))).scalar_one()
+
+    async def count_live(self) -> int:
+        return (await self.db.execute(select(func.count()).select_from(Urls).where(is_live()))).scalar_one()
+
+    async def most_clicked(self, limit: int) -> list[Row]:
+        """The `limit` most-clicked live links, as rows `CachedUrl.from_model` can read."""
+        now = as_db_timestamp(datetime.datetime.now(datetime.timezone.utc))
+        return list(await self.db.execute(MOST_CLICKED, {"now": now, "limit": limit}))
+
+    async def iter_live_codes(self, chunk_size: int = 10_000) -> AsyncIterator[str]:
+        """Stream the short codes of all live rows through a server-side cursor."""
+        result = await self.db.stream_scalars(
+            select(Urls.shortened_url).where(is_live()).execution_options(yield_per=chunk_size)
+        )
+        async for shortened_url in result:
+            yield shortened_url
+
+    async def block_high_water(self) -> int:
+        return (await self.db.execute(build_block_high_water())).scalar_one()
+
+    async def reserve_code_block(self) -> int:
+        block = (await self.db.execute(build_block_reservation())).scalar_one()
+        logger.debug(f"Reserved short code block {block}")
+        return block
+
+    async def _next_short_code(self) -> str:
+        return await self.allocator.allocate_async(self.reserve_code_block)
+
+
+class RedirectLookup:
+    """
+    Session-free redirect lookup for the ASGI fast path.
+
+    Runs `REDIRECT_LOOKUP` on a bare autocommit connection and returns the row,
+    which has the `original_url`, `valid_until` and `redirect_status` attributes
+    `CachedUrl.from_model` reads, without creating a session or an ORM object.
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine.execution_options(isolation_level="AUTOCOMMIT")
+
+    async def get_by_short(self, shortened_url: str) -> Optional[Row]:
+        now = as_db_timestamp(datetime.datetime.now(datetime.timezone.utc))
+        async with self.engine.connect() as conn:
+            result = await conn.execute(REDIRECT_LOOKUP, {"code": shortened_url, "now": now})
+            return result.first()
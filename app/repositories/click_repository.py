@@ -0,0 +1,108 @@
+import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import Select, bindparam, delete, func, literal_column, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logging_config import setup_logger
+from app.models.models import ClickEvents, ClickReferrersDaily, ClickRollupsHourly, ClickTotals
+
+logger = setup_logger(__name__)
+
+
+TOTAL_CLICKS = select(ClickTotals.clicks).where(ClickTotals.shortened_url == bindparam("code"))
+
+HOURLY_CLICKS = (
+    select(ClickRollupsHourly.hour, ClickRollupsHourly.clicks)
+    .where(ClickRollupsHourly.shortened_url == bindparam("code"), ClickRollupsHourly.hour >= bindparam("since"))
+    .order_by(ClickRollupsHourly.hour)
+)
+
+_referrer_clicks = func.sum(ClickReferrersDaily.clicks).label("clicks")
+TOP_REFERRERS = (
+    select(ClickReferrersDaily.referrer, _referrer_clicks)
+    .where(ClickReferrersDaily.shortened_url == bindparam("code"), ClickReferrersDaily.day >= bindparam("since"))
+    .group_by(ClickReferrersDaily.referrer)
+    .order_by(_referrer_clicks.desc(), ClickReferrersDaily.referrer)
+    .limit(bindparam("top"))
+)
+
+
+def _add_counts(table, keys: list, values: list, weight):
+    """`INSERT ... SELECT` of (keys..., sum of weights) that adds to existing counters."""
+    counts = select(*values, func.sum(weight)).group_by(*values)
+    upsert = insert(table).from_select([column.name for column in keys] + ["clicks"], counts)
+    return upsert.on_conflict_do_update(index_elements=keys, set_={"clicks": table.clicks + upsert.excluded.clicks})
+
+
+def build_rollup(limit: int) -> Select:
+    """
+    Build one statement that moves up to `limit` of the oldest click events into
+    the hourly, daily-referrer and total counters and returns how many events it moved.
+    Each event adds its `weight` to the counters.
+
+    The events are deleted with `FOR UPDATE SKIP LOCKED` and their counts added
+    in the same statement, so workers rolling up concurrently never count an
+    event twice and a failed rollup leaves the events in place.
+    """
+    batch = (
+        select(ClickEvents.id)
+        .order_by(ClickEvents.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    moved = (
+        delete(ClickEvents)
+        .where(ClickEvents.id.in_(batch))
+        .returning(ClickEvents.shortened_url, ClickEvents.occurred, ClickEvents.referrer, ClickEvents.weight)
+        .cte("moved")
+    )
+    # Literals, not bind parameters, so each GROUP BY expression matches its select list
+    hour = func.date_trunc(literal_column("'hour'"), moved.c.occurred)
+    day = func.date_trunc(literal_column("'day'"), moved.c.occurred)
+    referrer = func.coalesce(moved.c.referrer, literal_column("''"))
+    hourly = _add_counts(ClickRollupsHourly, [ClickRollupsHourly.shortened_url, ClickRollupsHourly.hour],
+                         [moved.c.shortened_url, hour], moved.c.weight)
+    referrers = _add_counts(
+        ClickReferrersDaily,
+        [ClickReferrersDaily.shortened_url, ClickReferrersDaily.day, ClickReferrersDaily.referrer],
+        [moved.c.shortened_url, day, referrer],
+        moved.c.weight,
+    )
+    totals = _add_counts(ClickTotals, [ClickTotals.shortened_url], [moved.c.shortened_url], moved.c.weight)
+    return (
+        select(func.count()).select_from(moved)
+        .add_cte(hourly.cte("hourly"), referrers.cte("referrers"), totals.cte("totals"))
+    )
+
+
+class AsyncClickRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def insert_events(self, rows: Iterable[dict]) -> int:
+        rows = list(rows)
+        if not rows:
+            return 0
+        await self.db.execute(insert(ClickEvents), rows)
+        await self.db.commit()
+        return len(rows)
+
+    async def roll_up(self, limit: int) -> int:
+        moved = (await self.db.execute(build_rollup(limit))).scalar_one()
+        await self.db.commit()
+        logger.debug(f"Rolled up {moved} click events")
+        return moved
+
+    async def total_clicks(self, shortened_url: str) -> int:
+        return (await self.db.execute(TOTAL_CLICKS, {"code": shortened_url})).scalar() or 0
+
+    async def hourly_clicks(self, shortened_url: str, since: datetime.datetime) -> list[tuple[datetime.datetime, int]]:
+        result = await self.db.execute(HOURLY_CLICKS, {"code": shortened_url, "since": since})
+        return [(hour, clicks) for hour, clicks in result]
+
+    async def top_referrers(self, shortened_url: str, since: datetime.datetime,
+                            top: int) -> list[tuple[Optional[str], int]]:
+        result = await self.db.execute(TOP_REFERRERS, {"code": shortened_url, "since": since, "top": top})
+        return [(referrer or None, clicks) for referrer, clicks in result]
@@ -1,17 +1,22 @@
-import random
-import string
-import time
 import datetime
+import uuid
+from functools import lru_cache
 from typing import Optional
 
-from sqlalchemy import or_
+from sqlalchemy import (
+    Delete, Insert, Integer, Select, String, TextClause, Update, and_, case, column, delete, func, or_, select, text,
+    update, values
+)
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from app.core.logging_config import setup_logger
 from app.core.config import get_settings
-from app.models.models import Urls
+from app.models.models import DEFAULT_REDIRECT_STATUS, Urls, short_code_block_seq
+from app.utils.short_codes import ShortCodeAllocator, ShortCodeCodec
+from app.utils.url_digest import url_digest
 
-logger = setup_logger()
+logger = setup_logger(__name__)
 settings = get_settings()
 
 def is_url_expired(url_obj: Urls) -> bool:
@@ -20,82 +25,185 @@ def is_url_expired(url_obj: Urls) -> bool:
     return expired
 
 
+def as_db_timestamp(value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    """Convert to the naive UTC form stored in `timestamp without time zone` columns."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def is_live():
+    """Filter clause matching rows that have not expired yet."""
+    return or_(
+        Urls.valid_until == None,
+        Urls.valid_until > as_db_timestamp(datetime.datetime.now(datetime.timezone.utc))
+    )
+
+
+def new_url_row(original_url: str, shortened_url: str, valid_until: Optional[datetime.datetime],
+                digest: Optional[bytes] = None, redirect_status: int = DEFAULT_REDIRECT_STATUS) -> dict:
+    return {
+        "id": uuid.uuid4(),
+        "original_url": original_url,
+        "original_url_digest": digest if digest is not None else url_digest(original_url),
+        "shortened_url": shortened_url,
+        "clicks": 0,
+        "valid_until": as_db_timestamp(valid_until),
+        "redirect_status": redirect_status,
+    }
+
+
+def build_upsert(rows: list[dict]) -> Insert:
+    """
+    Build one `INSERT ... ON CONFLICT (original_url_digest) DO UPDATE ... RETURNING`.
+
+    A conflicting live row is returned unchanged. A conflicting expired row is
+    taken over by the new entry: it gets the new short code, `valid_until`,
+    redirect status and a reset click count. Either way every input row yields exactly one returned row,
+    and a returned `shortened_url` equal to the one proposed means the entry was
+    created (or revived) by this statement.
+
+    `rows` must not contain two rows with the same digest.
+    """
+    statement = insert(Urls).values(sorted(rows, key=lambda row: row["original_url_digest"]))
+    new = statement.excluded
+    expired = and_(
+        Urls.valid_until != None,
+        Urls.valid_until <= as_db_timestamp(datetime.datetime.now(datetime.timezone.utc))
+    )
+
+    def revive(current, replacement):
+        return case((expired, replacement), else_=current)
+
+    return (
+        statement
+        .on_conflict_do_update(
+            index_elements=[Urls.original_url_digest],
+            set_={
+                "original_url": revive(Urls.original_url, new.original_url),
+                "shortened_url": revive(Urls.shortened_url, new.shortened_url),
+                "clicks": revive(Urls.clicks, 0),
+                "valid_until": revive(Urls.valid_until, new.valid_until),
+                "redirect_status": revive(Urls.redirect_status, new.redirect_status),
+                "created": revive(Urls.created, func.now()),
+                "updated": revive(Urls.updated, func.now()),
+            },
+        )
+        .returning(Urls)
+        .execution_options(populate_existing=True)
+    )
+
+
+def build_click_increment(counts: dict[str, int]) -> Update:
+    """Build one `UPDATE ... FROM (VALUES ...)` adding `counts` to each row's clicks."""
+    # Sorted so concurrent flushes lock rows in the same order
+    increments = values(
+        column("shortened_url", String), column("clicks", Integer), name="increments"
+    ).data(sorted(counts.items()))
+    return (
+        update(Urls)
+        .where(Urls.shortened_url == increments.c.shortened_url)
+        .values(clicks=Urls.clicks + increments.c.clicks, updated=func.now())
+    )
+
+
+def build_expired_purge(before: datetime.datetime, limit: int) -> Delete:
+    """
+    Build a `DELETE` of at most `limit` rows that expired before `before`.
+
+    Rows are picked oldest-first with `FOR UPDATE SKIP LOCKED`, so a batch never
+    waits on rows another transaction (or another worker's reaper) holds.
+    """
+    victims = (
+        select(Urls.id)
+        .where(Urls.valid_until < before)
+        .order_by(Urls.valid_until)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return delete(Urls).where(Urls.id.in_(victims)).execution_options(synchronize_session=False)
+
+
+def build_oldest_expired(before: datetime.datetime) -> Select:
+    return select(func.min(Urls.valid_until)).where(Urls.valid_until < before)
+
+
+def build_block_reservation() -> Select:
+    """Select the next short code block number (0-based) from the database sequence."""
+    return select(short_code_block_seq.next_value() - 1)
+
+
+def build_block_high_water() -> TextClause:
+    """Select the sequence's last value, i.e. how many blocks have been reserved (blocks are 0-based)."""
+    return text(f"SELECT last_value FROM {short_code_block_seq.name}")
+
+
+@lru_cache()
+def get_short_code_allocator() -> ShortCodeAllocator:
+    if not settings.SHORT_CODE_SECRET and not settings.SHORT_CODE_ALLOW_SEQUENTIAL:
+        # A secret cannot be added once codes are issued, so refuse to start without one
+        raise ValueError("SHORT_CODE_SECRET is empty; set it before issuing codes "
+                         "(or SHORT_CODE_ALLOW_SEQUENTIAL=true for development)")
+    return ShortCodeAllocator(
+        ShortCodeCodec(settings.SHORT_CODE_MIN_LENGTH, settings.SHORT_CODE_SECRET),
+        block_size=settings.SHORT_CODE_BLOCK_SIZE,
+    )
+
 
 class UrlsRepository:
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, allocator: Optional[ShortCodeAllocator] = None):
         self.db = db
+        self.allocator = allocator if allocator is not None else get_short_code_allocator()
 
     def get_by_short(self, shortened_url: str) -> Optional[Urls]:
         logger.debug(f"Fetching URL by shortened: {shortened_url}")
         return self.db.query(Urls).filter(
             Urls.shortened_url == shortened_url,
-            or_(
-                Urls.valid_until == None,
-                Urls.valid_until > datetime.datetime.now(datetime.timezone.utc)
-            )
+            is_live()
         ).first()
 
     def create_url(self, original_url: str, valid_until: Optional[datetime.datetime] = None) -> Urls:
+        """Create a shortened URL, or return the live one for the same URL, in one statement."""
         logger.info(f"Attempting to create or reuse shortened URL for: {original_url}")
 
-        existing_url = self._get_by_original(original_url)
-        if existing_url:
-            logger.info(f"Found existing valid URL. Returning with short code: {existing_url.shortened_url}")
-            return existing_url
-
-        shortened_url = self._generate_unique_short()
-        url_obj = Urls(
-            original_url=original_url,
-            shortened_url=shortened_url,
-            valid_until=valid_until
-        )
-
+        shortened_url = self._next_short_code()
         try:
-            self.db.add(url_obj)
+            url_obj = self.db.scalars(build_upsert([new_url_row(original_url, shortened_url, valid_until)])).one()
             self.db.commit()
-            self.db.refresh(url_obj)
-            logger.info(f"Created new shortened URL with code: {shortened_url}")
-            return url_obj
         except IntegrityError as e:
             self.db.rollback()
-            if 'urls_original_url_key' in str(e.orig):
-                logger.warning("URL already exists. Fetching and returning the existing entry.")
-                return self._get_by_original(original_url)
             logger.error(f"Failed to create shortened URL: {e}")
             raise
 
-    def increment_clicks(self, url_obj: Urls) -> Urls:
-        url_obj.clicks += 1
-        url_obj.updated = datetime.datetime.now(datetime.timezone.utc)
-        self.db.commit()
-        self.db.refresh(url_obj)
-        logger.debug(f"Incremented clicks for {url_obj.shortened_url}. Total now: {url_obj.clicks}")
+        if url_obj.shortened_url == shortened_url:
+            logger.info(f"Created new shortened URL with code: {shortened_url}")
+        else:
+            logger.info(f"Found existing valid URL. Returning with short code: {url_obj.shortened_url}")
         return url_obj
 
-    def _generate_unique_short(self, length=6) -> str:
-        logger.debug("Generating unique shortened URL")
-        max_attempts = 10
+    def bulk_increment_clicks(self, counts: dict[str, int]) -> int:
+        """
+        Apply buffered click counts in one `UPDATE ... FROM (VALUES ...)` statement.
+
+        Args:
+            counts (dict[str, int]): Clicks to add, keyed by short code
 
-        for _ in range(max_attempts):
-            random_chars = ''.join(random.choices(string.ascii_uppercase + string.digits, k=length))
-            if not self.get_by_short(random_chars):
-                logger.debug(f"Generated unique short code: {random_chars}")
-                return random_chars
+        Returns:
+            int: Number of rows updated
+        """
+        if not counts:
+            return 0
+        result = self.db.execute(build_click_increment(counts))
+        self.db.commit()
+        logger.debug(f"Flushed clicks for {len(counts)} short codes")
+        return result.rowcount
 
-        timestamp = str(int(time.time()))[-4:]
-        random_fallback = ''.join(random.choices(string.ascii_letters + string.digits, k=length - 4))
-        fallback_code = timestamp + random_fallback
-        logger.warning(f"Fallback to timestamp-based code: {fallback_code}")
-        return fallback_code
+    def reserve_code_block(self) -> int:
+        block = self.db.execute(build_block_reservation()).scalar_one()
+        logger.debug(f"Reserved short code block {block}")
+        return block
 
-    def _get_by_original(self, original_url: str) -> Optional[Urls]:
-        logger.debug(f"Fetching URL by original: {original_url}")
-        return self.db.query(Urls).filter(
-            Urls.original_url == original_url,
-            or_(
-                Urls.valid_until == None,
-                Urls.valid_until > datetime.datetime.now(datetime.timezone.utc)
-            )
-        ).first()
+    def _next_short_code(self) -> str:
+        return self.allocator.allocate(self.reserve_code_block)
 
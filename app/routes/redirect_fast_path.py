@@ -0,0 +1,96 @@
+import json
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import quote
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import get_settings
+from app.core.logging_config import setup_logger
+from app.db.async_sql_database import async_engine
+from app.repositories.async_url_repository import RedirectLookup
+from app.service.async_url_service import AsyncUrlsService
+
+"""
+Serves `GET`/`HEAD /{short_code}` before FastAPI's routing and dependency injection.
+Only `GET` counts as a click; link checkers and unfurlers send `HEAD` all the time.
+
+A redirect is resolved through the redirect cache and, on a miss that the short
+code filter lets through, one precompiled Core `SELECT original_url, valid_until, redirect_status`
+on a pooled connection, and the redirect is written straight to the ASGI `send` channel. Every
+other request, and any single-segment path the FastAPI app routes itself
+(`/docs`, `/redoc`, `/openapi.json`, ...), is passed through untouched.
+"""
+
+logger = setup_logger(__name__)
+
+_NOT_FOUND_BODY = json.dumps({"detail": "Shortened URL not found or expired"}).encode()
+_LOCATION_SAFE = ":/%#?=@[]!$&'()*+,;"
+
+
+@lru_cache()
+def get_redirect_service() -> AsyncUrlsService:
+    return AsyncUrlsService(RedirectLookup(async_engine))
+
+
+class RedirectFastPath:
+    def __init__(self, app: ASGIApp, service: Optional[AsyncUrlsService] = None,
+                 max_age: Optional[float] = None):
+        self.app = app
+        self._service = service
+        self.max_age = max_age if max_age is not None else get_settings().REDIRECT_MAX_AGE_SECONDS
+        self._reserved = None
+        self._route = None
+
+    @property
+    def service(self) -> AsyncUrlsService:
+        if self._service is None:
+            self._service = get_redirect_service()
+        return self._service
+
+    def _is_reserved(self, scope: Scope, segment: str) -> bool:
+        if self._reserved is None:
+            routes = [route for route in getattr(scope.get("app"), "routes", ()) if hasattr(route, "path")]
+            self._reserved = frozenset(
+                route.path.strip("/") for route in routes
+                if "{" not in route.path and route.path.count("/") == 1
+            )
+            # The app's own redirect route, reported as the matched route (e.g. in request metrics)
+            self._route = next(
+                (route for route in routes if route.path.startswith("/{") and route.path.count("/") == 1), None
+            )
+        return segment in self._reserved
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            return await self.app(scope, receive, send)
+        code = scope["path"][1:]
+        if not code or "/" in code or self._is_reserved(scope, code):
+            return await self.app(scope, receive, send)
+
+        if self._route is not None:
+            scope["route"] = self._route
+        if scope["method"] == "HEAD":
+            url = await self.service.find(code)
+        else:
+            referrer = user_agent = None
+            for name, value in scope["headers"]:
+                if name == b"referer":
+                    referrer = value
+                elif name == b"user-agent":
+                    user_agent = value
+            url = await self.service.resolve_url(code, referrer, user_agent)
+        if url is None:
+            await self._send(send, scope, 404, [(b"content-type", b"application/json")], _NOT_FOUND_BODY)
+        else:
+            headers = [(b"location", quote(url.original_url, safe=_LOCATION_SAFE).encode("latin-1"))]
+            cache_control = url.cache_control(self.max_age)
+            if cache_control is not None:
+                headers.append((b"cache-control", cache_control.encode()))
+            await self._send(send, scope, url.redirect_status, headers, b"")
+
+    @staticmethod
+    async def _send(send: Send, scope: Scope, status: int, headers: list, body: bytes) -> None:
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
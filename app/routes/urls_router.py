@@ -1,28 +1,38 @@
 from urllib.parse import urlparse
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.responses import RedirectResponse
-from app.integration.blacklist import fetch_blacklist, BlacklistUnavailableError
-from app.core.cache import timed_cache
-from app.db.sql_database import get_db
-from app.repositories.url_repository import UrlsRepository
-from app.service.url_service import UrlsService
-from app.schemas.schema import UrlsResponse, UrlsCreateRequest
+from app.integration.blacklist import BlacklistService, BlacklistUnavailableError, get_blacklist_service
+from app.db.async_sql_database import get_async_db
+from app.repositories.async_url_repository import AsyncUrlsRepository
+from app.repositories.click_repository import AsyncClickRepository
+from app.service.async_url_service import AsyncUrlsService
+from app.service.click_stats import ClickStatsService
+from app.schemas.schema import (
+    MAX_STATS_HOURS, UrlsResponse, UrlsCreateRequest, UrlsBatchCreateRequest, UrlsBatchItemResult,
+    UrlsBatchResponse, UrlStatsResponse
+)
+from app.core.config import get_settings
 from app.core.logging_config import setup_logger
 
-logger = setup_logger()
+logger = setup_logger(__name__)
+settings = get_settings()
 
 router = APIRouter(tags=["Urls"])
 
-def get_service(db: Session = Depends(get_db)) -> UrlsService:
-    return UrlsService(UrlsRepository(db))
+def get_service(db: AsyncSession = Depends(get_async_db)) -> AsyncUrlsService:
+    return AsyncUrlsService(AsyncUrlsRepository(db))
+
+def get_stats_service(db: AsyncSession = Depends(get_async_db)) -> ClickStatsService:
+    return ClickStatsService(AsyncClickRepository(db), AsyncUrlsService(AsyncUrlsRepository(db)))
 
 @router.post("/urls",
              response_model=UrlsResponse,
              status_code=status.HTTP_201_CREATED)
 async def shorten_url(
         payload: UrlsCreateRequest,
-        service: UrlsService = Depends(get_service)):
+        service: AsyncUrlsService = Depends(get_service),
+        blacklist: BlacklistService = Depends(get_blacklist_service)):
 
     parsed_url = urlparse(payload.original_url)
 
@@ -33,7 +43,8 @@ async def shorten_url(
         )
 
     try:
-        blacklist = await fetch_blacklist()
+        await blacklist.ensure_loaded()
+        domain = blacklist.match(parsed_url.netloc)
     except BlacklistUnavailableError:
         logger.error("Cannot validate domain: blacklist unavailable.")
         raise HTTPException(
@@ -41,17 +52,17 @@ async def shorten_url(
             detail="Unable to validate domain against blacklist at this time. Please try again later."
         )
 
-    domain = parsed_url.netloc.lower()
-    if domain in blacklist:
+    if domain is not None:
         logger.info(f"Rejected blacklisted domain: {domain}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"The domain '{domain}' is blacklisted."
         )
 
-    parsed = service.shorten_url(
+    parsed = await service.shorten_url(
         original_url=payload.original_url,
-        valid_until=payload.valid_until
+        valid_until=payload.valid_until,
+        redirect_status=payload.redirect_status
     )
 
     if parsed is None:
@@ -63,24 +74,107 @@ async def shorten_url(
 
     return UrlsResponse.model_validate(parsed)
 
+@router.post("/urls/batch",
+             response_model=UrlsBatchResponse,
+             status_code=status.HTTP_200_OK)
+async def shorten_urls_batch(
+        payload: UrlsBatchCreateRequest,
+        service: AsyncUrlsService = Depends(get_service),
+        blacklist: BlacklistService = Depends(get_blacklist_service)):
+
+    try:
+        await blacklist.ensure_loaded()
+        rejected = {
+            index: blacklist.match(urlparse(item.original_url).netloc)
+            for index, item in enumerate(payload.items)
+        }
+    except BlacklistUnavailableError:
+        logger.error("Cannot validate domains: blacklist unavailable.")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Unable to validate domain against blacklist at this time. Please try again later."
+        )
+
+    accepted = [
+        (item.original_url, item.valid_until, item.redirect_status)
+        for index, item in enumerate(payload.items)
+        if rejected[index] is None
+    ]
+    created = await service.shorten_many(accepted)
+
+    results = []
+    reported = set()
+    for index, item in enumerate(payload.items):
+        result = UrlsBatchItemResult(index=index, original_url=item.original_url, status="rejected")
+        if rejected[index] is not None:
+            result.detail = f"The domain '{rejected[index]}' is blacklisted."
+        elif item.original_url in created:
+            url_obj, was_created = created[item.original_url]
+            result.status = "created" if was_created and url_obj.id not in reported else "existing"
+            reported.add(url_obj.id)
+            result.url = UrlsResponse.model_validate(url_obj)
+        else:
+            result.status = "conflict"
+            result.detail = "A shortened URL for this link already exists but could not be returned."
+        results.append(result)
+
+    logger.info(f"Batch request with {len(payload.items)} items, {len(accepted)} accepted")
+    return UrlsBatchResponse(results=results)
+
+@router.get("/urls/{short_code}/stats",
+            response_model=UrlStatsResponse,
+            summary="Click statistics for a short code",
+            description="Total clicks, clicks per hour and top referring hosts, from pre-aggregated rollups. "
+                        "Results are cached briefly and trail live traffic by about a minute.")
+async def url_stats(
+        short_code: str,
+        hours: int = Query(24, ge=1, le=MAX_STATS_HOURS, description="Hours of history in the time series"),
+        top: int = Query(10, ge=1, le=100, description="Number of referrers to return"),
+        stats_service: ClickStatsService = Depends(get_stats_service)):
+    stats = await stats_service.get_stats(short_code, hours, top)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Shortened URL not found")
+    return UrlStatsResponse.model_validate(stats)
+
+@router.post("/urls/{short_code}/beacon",
+             status_code=status.HTTP_204_NO_CONTENT,
+             summary="Report clicks served from a cache",
+             description="Counts clicks on a permanent redirect that a browser or CDN served from its cache. "
+                         "Callers may report only a sample of clicks and pass the sample rate; each beacon "
+                         "then counts as 1/rate clicks. Disabled unless CLICK_BEACON_ENABLED is set.")
+async def click_beacon(
+        short_code: str,
+        request: Request,
+        rate: float = Query(1.0, gt=0, le=1, description="Fraction of clicks the caller reports"),
+        service: AsyncUrlsService = Depends(get_service)):
+    if not settings.CLICK_BEACON_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    count = round(1 / max(rate, settings.CLICK_BEACON_MIN_SAMPLE_RATE))
+    if not await service.record_beacon(short_code, count, request.headers.get("referer"),
+                                       request.headers.get("user-agent")):
+        raise HTTPException(status_code=404, detail="Shortened URL not found or expired")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
 @router.get(
     "/{short_code:str}",
-    status_code=307,
+    status_code=302,
     response_class=RedirectResponse,
-    responses={307: {"description": "Redirects to the original URL"}},
+    responses={302: {"description": "Redirects to the original URL with the link's redirect status "
+                                    "(301, 302, 307 or 308)"}},
     summary="Redirect to the original URL",
     description="Redirects a short code to its destination URL if it exists and is valid.",
 )
-@timed_cache(seconds=300)
-def redirect_short_url(short_code: str, service: UrlsService = Depends(get_service)):
+async def redirect_short_url(short_code: str, request: Request, service: AsyncUrlsService = Depends(get_service)):
     if short_code == "favicon.ico":  # optional: filters out browser noise
         raise HTTPException(status_code=404, detail="Not Found")
 
-    url = service.resolve_url(short_code)
+    url = await service.resolve_url(short_code, request.headers.get("referer"), request.headers.get("user-agent"))
     if not url:
         logger.warning(f"Shortened URL not found or expired: {short_code}")
         raise HTTPException(status_code=404, detail="Shortened URL not found or expired")
 
-    return RedirectResponse(url.original_url, status_code=status.HTTP_302_FOUND)
+    cache_control = url.cache_control(settings.REDIRECT_MAX_AGE_SECONDS)
+    return RedirectResponse(url.original_url, status_code=url.redirect_status,
+                            headers={"cache-control": cache_control} if cache_control else None)
 
 
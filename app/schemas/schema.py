@@ -1,9 +1,14 @@
 from datetime import datetime, timedelta, timezone
 import uuid
-from typing import Optional
+from typing import Literal, Optional
 from urllib.parse import urlparse
 from pydantic import BaseModel, Field, ConfigDict, field_validator
 
+MAX_BATCH_ITEMS = 1000
+MAX_STATS_HOURS = 24 * 31
+
+RedirectStatus = Literal[301, 302, 307, 308]
+
 class UrlsBase(BaseModel):
     original_url: str = Field(..., description="The original full URL to be shortened")
     shortened_url: str = Field(..., description="The short code or shortened URL slug")
@@ -14,6 +19,11 @@ class UrlsCreateRequest(BaseModel):
         default_factory=lambda: datetime.now(timezone.utc) + timedelta(days=5),
         description="Expiration date. Defaults to 5 days from now."
     )
+    redirect_status: RedirectStatus = Field(
+        302,
+        description="301/308 redirects are permanent and may be cached by browsers and CDNs until "
+                    "`valid_until` (capped); 302/307 redirects are temporary and never cached."
+    )
 
     @field_validator("original_url")
     def validate_url(cls, v):
@@ -31,5 +41,43 @@ class UrlsResponse(BaseModel):
     updated: Optional[datetime] = None
     valid_until: Optional[datetime] = None
     clicks: int
+    redirect_status: int = 302
 
     model_config = ConfigDict(from_attributes=True)
+
+
+class UrlsBatchCreateRequest(BaseModel):
+    items: list[UrlsCreateRequest] = Field(
+        ..., min_length=1, max_length=MAX_BATCH_ITEMS,
+        description=f"URLs to shorten, at most {MAX_BATCH_ITEMS} per request"
+    )
+
+
+class UrlsBatchItemResult(BaseModel):
+    index: int = Field(..., description="Position of the item in the request")
+    original_url: str
+    status: Literal["created", "existing", "rejected", "conflict"]
+    url: Optional[UrlsResponse] = None
+    detail: Optional[str] = None
+
+
+class UrlsBatchResponse(BaseModel):
+    results: list[UrlsBatchItemResult]
+
+
+class HourlyClicks(BaseModel):
+    hour: datetime
+    clicks: int
+
+
+class ReferrerClicks(BaseModel):
+    referrer: Optional[str] = Field(None, description="Referring host; null for clicks without a Referer")
+    clicks: int
+
+
+class UrlStatsResponse(BaseModel):
+    shortened_url: str
+    total_clicks: int = Field(..., description="All rolled-up clicks since the link was created")
+    since: datetime = Field(..., description="Start of the first hour in `series`")
+    series: list[HourlyClicks] = Field(..., description="Clicks per hour, oldest first, including empty hours")
+    top_referrers: list[ReferrerClicks] = Field(..., description="Referring hosts since the start of `since`'s day")
@@ -0,0 +1,300 @@
+import importlib.util
+import math
+import os
+import re
+import signal
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import uvicorn
+
+from app.core import metrics
+from app.core.config import Settings, get_settings
+from app.core.logging_config import configure_logging, flush_logging, setup_logger
+
+"""
+Production server entrypoint.
+
+    python -m app.server
+
+A supervisor process binds the listening socket, imports the application once
+(`SERVER_PRELOAD`) and forks `SERVER_WORKERS` uvicorn workers that share the
+socket and, copy-on-write, the imported code and the memory-mapped blacklist
+index. Workers run on uvloop and httptools when installed. Workers that die are
+replaced; once one slot has failed to start `SERVER_MAX_FAILED_STARTS` times in a
+row (a lifespan startup error such as a missing secret or an unreachable
+database), the supervisor stops every worker and exits non-zero.
+
+On SIGTERM or SIGINT the supervisor forwards SIGTERM to every worker. A worker
+stops accepting connections, finishes in-flight requests for up to
+`SERVER_GRACEFUL_SHUTDOWN_SECONDS` and then runs the app's lifespan shutdown,
+which writes out buffered clicks and click events. Workers still running after
+that (plus a short margin) are killed.
+
+Each worker publishes metric snapshots to a directory shared with its siblings,
+so /v1/metrics reports every worker, labelled by its slot, whichever worker
+takes the scrape (app/core/metrics.py).
+
+Requires a POSIX platform (fork).
+"""
+
+logger = setup_logger(__name__)
+
+CGROUP_CPU_MAX = Path("/sys/fs/cgroup/cpu.max")
+# Extra time after the graceful shutdown window for the lifespan shutdown to flush
+_SHUTDOWN_MARGIN_SECONDS = 10
+# A worker that dies sooner than this after starting is restarted with a delay
+_MIN_WORKER_UPTIME_SECONDS = 1
+# Exit status of a worker whose lifespan startup failed, as with `uvicorn app.main:app`
+STARTUP_FAILURE = 3
+# The only files metrics_directory() removes: snapshots and their temp files (app/core/metrics.py)
+_SNAPSHOT_FILE = re.compile(r"\.?\d+\.json(\.\d+\.tmp)?")
+
+
+class WorkerStartupError(Exception):
+    pass
+
+
+def available_cpus(cpu_max: Path = CGROUP_CPU_MAX) -> int:
+    """CPUs this process may use: its affinity mask, capped by a cgroup v2 quota (e.g. `docker --cpus`)."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        quota, period = cpu_max.read_text().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, math.ceil(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def worker_count(configured: int) -> int:
+    return configured if configured > 0 else available_cpus()
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def build_config(app, settings: Settings) -> uvicorn.Config:
+    return uvicorn.Config(
+        app,
+        loop="uvloop" if _installed("uvloop") else "asyncio",
+        http="httptools" if _installed("httptools") else "h11",
+        lifespan="on",
+        # Keep our logging setup; uvicorn's loggers propagate to the root queue handler
+        log_config=None,
+        access_log=settings.SERVER_ACCESS_LOG,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_SECONDS,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        limit_concurrency=settings.SERVER_LIMIT_CONCURRENCY,
+        proxy_headers=settings.SERVER_PROXY_HEADERS,
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS,
+        server_header=False,
+    )
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _load_app():
+    from app.main import app
+    return app
+
+
+def _reset_after_fork() -> None:
+    """Drop state a forked worker must not share with the supervisor."""
+    settings = get_settings()
+    # The log listener thread does not survive fork
+    configure_logging(settings.LOG_LEVEL, settings.LOG_FORMAT, settings.LOG_RATE_LIMITS)
+    from app.db.async_sql_database import async_engine
+    from app.db.sql_database import engine
+    # Leave the parent's pooled connections (if any) alone, start with empty pools
+    async_engine.sync_engine.dispose(close=False)
+    engine.dispose(close=False)
+
+
+def run_worker(sock: socket.socket, app, settings: Settings) -> None:
+    server = uvicorn.Server(build_config(app if app is not None else _load_app(), settings))
+    try:
+        server.run(sockets=[sock])
+    finally:
+        flush_logging()
+    # uvicorn logs a failed lifespan startup and returns normally
+    if not server.started:
+        raise WorkerStartupError("application startup failed")
+
+
+def metrics_directory(configured: Optional[str]) -> Path:
+    """
+    A directory for this server's metric snapshots, without snapshots from a previous run (they would
+    show dead workers). Only snapshot files are removed from a configured directory.
+    """
+    if configured is None:
+        return Path(tempfile.mkdtemp(prefix="url-shortener-metrics-"))
+    directory = Path(configured)
+    directory.mkdir(parents=True, exist_ok=True)
+    for path in directory.iterdir():
+        if _SNAPSHOT_FILE.fullmatch(path.name) and path.is_file():
+            path.unlink(missing_ok=True)
+    return directory
+
+
+class Supervisor:
+    def __init__(self, sock: socket.socket, workers: int, settings: Settings, app=None,
+                 metrics_dir: Optional[Path] = None):
+        self.sock = sock
+        self.workers = workers
+        self.settings = settings
+        self.app = app
+        self.metrics_dir = metrics_dir
+        # pid -> (slot, start time); a replacement worker takes over its predecessor's slot
+        self.children: dict[int, tuple[int, float]] = {}
+        # slot -> consecutive failed starts
+        self.failed_starts: dict[int, int] = {}
+        self.stopping = False
+        self.exit_status = 0
+
+    def spawn(self, slot: int) -> int:
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                _reset_after_fork()
+                if self.metrics_dir is not None:
+                    metrics.enable_multiprocess(self.metrics_dir, str(slot))
+                run_worker(self.sock, self.app, self.settings)
+            except WorkerStartupError as e:
+                logger.error(f"Worker {slot} ({os.getpid()}) failed: {e}")
+                flush_logging()
+                status = STARTUP_FAILURE
+            except BaseException as e:
+                logger.error(f"Worker {slot} ({os.getpid()}) failed: {e}")
+                flush_logging()
+                status = 1
+            finally:
+                os._exit(status)
+        self.children[pid] = (slot, time.monotonic())
+        logger.info(f"Started worker {slot} as {pid}")
+        return pid
+
+    def _handle_stop(self, signum, frame) -> None:
+        if not self.stopping:
+            logger.info(f"Received {signal.Signals(signum).name}, draining {len(self.children)} workers")
+        self.stopping = True
+
+    def _reap(self) -> list[tuple[int, int, int, float]]:
+        """Collect exited workers; returns (pid, slot, exit code, uptime) tuples."""
+        exited = []
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            child = self.children.pop(pid, None)
+            if child is not None:
+                slot, started = child
+                exited.append((pid, slot, os.waitstatus_to_exitcode(status), time.monotonic() - started))
+        return exited
+
+    def _failed_start(self, slot: int, code: int, uptime: float) -> bool:
+        """Count a failed start of `slot`; returns whether the slot is out of attempts."""
+        if code != STARTUP_FAILURE and uptime >= _MIN_WORKER_UPTIME_SECONDS:
+            self.failed_starts[slot] = 0
+            return False
+        self.failed_starts[slot] = self.failed_starts.get(slot, 0) + 1
+        return self.failed_starts[slot] >= self.settings.SERVER_MAX_FAILED_STARTS
+
+    def run(self) -> int:
+        """Supervise workers until a stop signal, or until a slot keeps failing to start; returns the exit status."""
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        for slot in range(self.workers):
+            self.spawn(slot)
+
+        while not self.stopping:
+            for pid, slot, code, uptime in self._reap():
+                if self.stopping:
+                    break
+                if self._failed_start(slot, code, uptime):
+                    logger.error(f"Worker {slot} failed to start {self.failed_starts[slot]} times in a row, "
+                                 f"stopping the server")
+                    self.stopping = True
+                    self.exit_status = STARTUP_FAILURE
+                    break
+                logger.warning(f"Worker {slot} ({pid}) exited with status {code} after {uptime:.1f}s, replacing it")
+                if self.failed_starts[slot]:
+                    time.sleep(_MIN_WORKER_UPTIME_SECONDS)
+                self.spawn(slot)
+            time.sleep(0.2)
+        self.shutdown()
+        return self.exit_status
+
+    def shutdown(self) -> None:
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS + _SHUTDOWN_MARGIN_SECONDS
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in list(self.children):
+            logger.error(f"Worker {pid} did not stop in time, killing it")
+            try:
+                os.kill(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        self._reap()
+        logger.info("All workers stopped")
+
+
+def main() -> None:
+    settings = get_settings()
+    workers = worker_count(settings.SERVER_WORKERS)
+    sock = bind_socket(settings.SERVER_HOST, settings.SERVER_PORT, settings.SERVER_BACKLOG)
+    app = _load_app() if settings.SERVER_PRELOAD or workers == 1 else None
+    pool = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    logger.info(f"Serving on {settings.SERVER_HOST}:{settings.SERVER_PORT} with {workers} workers "
+                f"(up to {workers * pool} database connections)")
+
+    status = 0
+    if workers == 1:
+        try:
+            run_worker(sock, app, settings)
+        except WorkerStartupError as e:
+            logger.error(f"Worker failed: {e}")
+            status = STARTUP_FAILURE
+    else:
+        metrics_dir = metrics_directory(settings.SERVER_METRICS_DIR)
+        try:
+            status = Supervisor(sock, workers, settings, app, metrics_dir).run()
+        finally:
+            if settings.SERVER_METRICS_DIR is None:
+                shutil.rmtree(metrics_dir, ignore_errors=True)
+    flush_logging()
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
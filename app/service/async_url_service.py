@@ -0,0 +1,89 @@
+import time
+from datetime import datetime
+from typing import Iterable, Optional
+from app.core.cache import TwoTierCache
+from app.core.logging_config import setup_logger
+from app.models.models import DEFAULT_REDIRECT_STATUS, Urls
+from app.repositories.async_url_repository import AsyncUrlsRepository
+from app.service.click_aggregator import ClickAggregator, get_click_aggregator
+from app.service.click_events import ClickEventPipeline, Header, get_click_events
+from app.service.short_code_filter import ShortCodeFilter, get_short_code_filter
+from app.service.url_service import CachedUrl, get_redirect_cache
+
+logger = setup_logger(__name__)
+
+
+class AsyncUrlsService:
+    def __init__(self, repository: AsyncUrlsRepository, cache: Optional[TwoTierCache] = None,
+                 clicks: Optional[ClickAggregator] = None, known_codes: Optional[ShortCodeFilter] = None,
+                 events: Optional[ClickEventPipeline] = None):
+        self.repository = repository
+        self.cache = cache if cache is not None else get_redirect_cache()
+        self.clicks = clicks if clicks is not None else get_click_aggregator()
+        self.known_codes = known_codes if known_codes is not None else get_short_code_filter()
+        self.events = events if events is not None else get_click_events()
+
+    async def shorten_url(self, original_url: str, valid_until: Optional[datetime] = None,
+                          redirect_status: int = DEFAULT_REDIRECT_STATUS) -> Urls:
+        logger.info(f"Service: Shortening URL: {original_url}")
+        url_obj = await self.repository.create_url(original_url, valid_until, redirect_status)
+        self.known_codes.add(url_obj.shortened_url)
+        return url_obj
+
+    async def shorten_many(
+            self, items: Iterable[tuple[str, Optional[datetime], int]]) -> dict[str, tuple[Urls, bool]]:
+        results = await self.repository.create_many(items)
+        for url_obj, was_created in results.values():
+            if was_created:
+                self.known_codes.add(url_obj.shortened_url)
+        return results
+
+    async def resolve_url(self, shortened_url: str, referrer: Header = None,
+                          user_agent: Header = None) -> Optional[CachedUrl]:
+        cached = await self._lookup(shortened_url)
+        if cached is not None:
+            logger.info(f"Short URL found. Incrementing clicks for: {shortened_url}")
+            self.clicks.record(shortened_url)
+            self.events.record(shortened_url, referrer, user_agent)
+        return cached
+
+    async def find(self, shortened_url: str) -> Optional[CachedUrl]:
+        """Like `resolve_url`, but counts no click (e.g. for `HEAD` requests from link checkers)."""
+        return await self._lookup(shortened_url)
+
+    async def exists(self, shortened_url: str) -> bool:
+        """Whether the code is a live link, answered from the redirect cache when possible; counts no click."""
+        return await self._lookup(shortened_url) is not None
+
+    async def record_beacon(self, shortened_url: str, count: int = 1, referrer: Header = None,
+                            user_agent: Header = None) -> bool:
+        """
+        Count `count` clicks on a redirect that was served from a browser or edge
+        cache and never reached us. Returns False if the code is not live.
+        """
+        if await self._lookup(shortened_url) is None:
+            return False
+        self.clicks.record(shortened_url, count)
+        self.events.record(shortened_url, referrer, user_agent, count)
+        return True
+
+    async def _lookup(self, shortened_url: str) -> Optional[CachedUrl]:
+        logger.debug(f"Service: Resolving shortened URL: {shortened_url}")
+        cached = await self.cache.get(shortened_url)
+        if cached is None:
+            # The filter only guards the database; cached links never pay for it
+            if not await self.known_codes.might_exist(shortened_url):
+                logger.debug(f"Short code cannot exist, skipping lookup: {shortened_url}")
+                return None
+            url_obj = await self.repository.get_by_short(shortened_url)
+            if url_obj is None:
+                logger.warning(f"Shortened URL not found or expired: {shortened_url}")
+                self.known_codes.record_miss(shortened_url)
+                return None
+            # Codes from other workers' blocks then skip the decode on later misses
+            self.known_codes.add(shortened_url)
+            cached = CachedUrl.from_model(url_obj)
+            await self.cache.set(shortened_url, cached, expires_at=cached.valid_until)
+        elif cached.valid_until is not None and cached.valid_until <= time.time():
+            return None
+        return cached
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from functools import lru_cache
+from typing import Awaitable, Callable, Optional
+
+from app.core import metrics
+from app.core.cache import TwoTierCache
+from app.core.config import get_settings
+from app.core.logging_config import setup_logger
+from app.db.async_sql_database import AsyncSessionLocal
+from app.integration.blacklist import BlacklistService, get_blacklist_service
+from app.repositories.async_url_repository import AsyncUrlsRepository
+from app.service.url_service import CachedUrl, get_redirect_cache
+from app.utils.periodic_task import PeriodicTask
+
+logger = setup_logger(__name__)
+
+
+class CacheWarmer:
+    """
+    Fill a fresh worker's in-process caches before it takes traffic.
+
+    `warm` loads the blacklist and puts the `top_n` most-clicked live links into
+    the L1 tier of the redirect cache, for the cache's full (L2) TTL rather than
+    the short L1 one, which would expire them moments after the worker turns
+    ready. It writes nothing to Redis: the shared tier outlives deploys and is
+    warm already.
+
+    `start` is awaited in the app's lifespan, so a worker only accepts
+    connections once its own caches are warm, or warming has failed or run
+    past `timeout`. A failed warm-up leaves `state` at `failed`, which keeps
+    /v1/ready at 503, and is retried every `retry_seconds` until it succeeds.
+    """
+
+    def __init__(self, load_func: Callable[[int], Awaitable[list]], cache: TwoTierCache,
+                 blacklist: BlacklistService, top_n: int = 10_000, timeout: float = 30,
+                 retry_seconds: float = 30):
+        self.load_func = load_func
+        self.cache = cache
+        self.blacklist = blacklist
+        self.top_n = top_n
+        self.timeout = timeout
+        self.state = "warming"
+        self.error: Optional[str] = None
+        self.warmed = 0
+        self.failures = 0
+        self.seconds: Optional[float] = None
+        self._retry = PeriodicTask("cache-warm-retry", retry_seconds, self._retry_warm)
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    async def warm(self) -> bool:
+        """Run one warm-up, bounded by `timeout`; returns whether it succeeded."""
+        started = time.perf_counter()
+        self.warmed = 0
+        try:
+            await asyncio.wait_for(self._warm(), self.timeout)
+        except asyncio.TimeoutError:
+            self.error = f"timed out after {self.timeout}s with {self.warmed} links loaded"
+        except Exception as e:
+            self.error = str(e) or type(e).__name__
+        else:
+            self.error = None
+        self.seconds = time.perf_counter() - started
+        if self.error is None:
+            self.state = "ready"
+            logger.info(f"Warmed {self.warmed} links in {self.seconds:.2f}s")
+        else:
+            self.state = "failed"
+            self.failures += 1
+            logger.error(f"Cache warming failed: {self.error}")
+        return self.ready
+
+    async def _warm(self) -> None:
+        await self.blacklist.ensure_loaded()
+        if self.top_n <= 0:
+            return
+
+        now = time.time()
+        for row in await self.load_func(self.top_n):
+            cached = CachedUrl.from_model(row)
+            if cached.valid_until is not None and cached.valid_until <= now:
+                continue
+            self.cache.local.set(row.shortened_url, cached, ttl=self.cache.default_ttl, expires_at=cached.valid_until)
+            self.warmed += 1
+
+    async def start(self) -> None:
+        """Warm up before the worker takes traffic; after a failure keep retrying in the background."""
+        if not await self.warm():
+            self._retry.start()
+
+    async def _retry_warm(self) -> None:
+        if not self.ready:
+            await self.warm()
+
+    async def stop(self) -> None:
+        await self._retry.stop()
+
+    def stats(self) -> dict:
+        return {"state": self.state, "error": self.error, "warmed": self.warmed,
+                "failures": self.failures, "seconds": self.seconds}
+
+
+async def most_clicked_urls(limit: int) -> list:
+    async with AsyncSessionLocal() as db:
+        return await AsyncUrlsRepository(db).most_clicked(limit)
+
+
+@lru_cache()
+def get_cache_warmer() -> CacheWarmer:
+    settings = get_settings()
+    return CacheWarmer(
+        most_clicked_urls,
+        get_redirect_cache(),
+        get_blacklist_service(),
+        # More links than L1 holds would only evict each other
+        top_n=min(settings.CACHE_WARM_TOP_N, settings.REDIRECT_CACHE_MAX_ENTRIES),
+        timeout=settings.CACHE_WARM_TIMEOUT_SECONDS,
+        retry_seconds=settings.CACHE_WARM_RETRY_SECONDS,
+    )
+
+
+metrics.gauge("cache_warm_ready", "1 once startup cache warming has succeeded",
+              lambda: int(get_cache_warmer().ready))
+metrics.counter_func("cache_warm_failures_total", "Cache warm-ups that failed or timed out",
+                     lambda: get_cache_warmer().failures)
+metrics.gauge("cache_warm_links", "Links loaded into the redirect cache at startup",
+              lambda: get_cache_warmer().warmed)
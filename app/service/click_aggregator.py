@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from collections import Counter
+from functools import lru_cache
+from typing import Awaitable, Callable
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.core.logging_config import setup_logger
+from app.db.async_sql_database import AsyncSessionLocal
+from app.repositories.async_url_repository import AsyncUrlsRepository
+from app.utils.periodic_task import PeriodicTask
+
+logger = setup_logger(__name__)
+
+
+class ClickAggregator:
+    """
+    Buffers click increments per short code and writes them in batches.
+
+    Redirects only bump an in-memory counter; a periodic task swaps the buffer
+    out and hands it to `flush_func`, so each hot link costs one row update per
+    flush interval instead of one per click. If a flush fails the counts are
+    merged back and retried on the next run.
+    """
+
+    def __init__(self, flush_func: Callable[[dict[str, int]], Awaitable[int]], interval: float = 5):
+        self.flush_func = flush_func
+        self._pending: Counter = Counter()
+        self._lock = threading.Lock()
+        self._flush_lock = asyncio.Lock()
+        self._flusher = PeriodicTask("click-flush", interval, self.flush)
+        self.flushed_clicks = 0
+        self.failed_flushes = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of short codes with unflushed clicks."""
+        return len(self._pending)
+
+    def record(self, shortened_url: str, count: int = 1) -> None:
+        with self._lock:
+            self._pending[shortened_url] += count
+
+    def drain(self) -> dict[str, int]:
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+        return dict(pending)
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            counts = self.drain()
+            if not counts:
+                return 0
+            try:
+                await self.flush_func(counts)
+            except Exception as e:
+                self.failed_flushes += 1
+                with self._lock:
+                    self._pending.update(counts)
+                logger.error(f"Failed to flush clicks for {len(counts)} short codes: {e}")
+                return 0
+            total = sum(counts.values())
+            self.flushed_clicks += total
+            logger.debug(f"Flushed {total} clicks for {len(counts)} short codes")
+            return total
+
+    def start(self) -> None:
+        self._flusher.start()
+
+    async def stop(self) -> None:
+        """Stop the periodic flush and write out whatever is still buffered."""
+        await self._flusher.stop()
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending_codes": self.pending,
+            "pending_clicks": sum(self._pending.values()),
+            "flushed_clicks": self.flushed_clicks,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+async def write_clicks(counts: dict[str, int]) -> int:
+    async with AsyncSessionLocal() as db:
+        return await AsyncUrlsRepository(db).bulk_increment_clicks(counts)
+
+
+@lru_cache()
+def get_click_aggregator() -> ClickAggregator:
+    return ClickAggregator(write_clicks, interval=get_settings().CLICK_FLUSH_SECONDS)
+
+
+metrics.gauge("click_flush_pending_codes", "Short codes with clicks not yet written",
+              lambda: get_click_aggregator().stats()["pending_codes"])
+metrics.gauge("click_flush_pending_clicks", "Clicks buffered and not yet written",
+              lambda: get_click_aggregator().stats()["pending_clicks"])
+metrics.counter_func("clicks_flushed_total", "Clicks written to the database",
+                     lambda: get_click_aggregator().stats()["flushed_clicks"])
+metrics.counter_func("click_flush_failures_total", "Click flushes that failed and were retried",
+                     lambda: get_click_aggregator().stats()["failed_flushes"])
@@ -0,0 +1,210 @@
+import asyncio
+import datetime
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Awaitable, Callable, Iterable, Optional, Union
+from urllib.parse import urlsplit
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.core.logging_config import setup_logger
+from app.db.async_sql_database import AsyncSessionLocal
+from app.repositories.click_repository import AsyncClickRepository
+from app.utils.periodic_task import PeriodicTask
+
+logger = setup_logger(__name__)
+
+Header = Union[str, bytes, None]
+
+_MAX_REFERRER_LENGTH = 255
+_BOT_MARKERS = ("bot", "crawl", "spider", "slurp", "preview", "curl", "wget", "python", "http-client", "headless")
+_MOBILE_MARKERS = ("mobi", "android", "iphone", "ipad")
+
+
+def _text(value: Header) -> Optional[str]:
+    if isinstance(value, bytes):
+        return value.decode("latin-1")
+    return value
+
+
+def classify_user_agent(user_agent: Header) -> str:
+    """Reduce a User-Agent header to `bot`, `mobile`, `desktop`, `other` or `unknown`."""
+    user_agent = _text(user_agent)
+    if not user_agent:
+        return "unknown"
+    user_agent = user_agent.lower()
+    if any(marker in user_agent for marker in _BOT_MARKERS):
+        return "bot"
+    if any(marker in user_agent for marker in _MOBILE_MARKERS):
+        return "mobile"
+    if user_agent.startswith("mozilla/") or user_agent.startswith("opera/"):
+        return "desktop"
+    return "other"
+
+
+def referrer_host(referrer: Header) -> Optional[str]:
+    """Keep only the host of a Referer header; paths and queries are not stored."""
+    referrer = _text(referrer)
+    if not referrer:
+        return None
+    try:
+        host = urlsplit(referrer.strip()).hostname
+    except ValueError:
+        return None
+    return host[:_MAX_REFERRER_LENGTH] if host else None
+
+
+class ClickEventPipeline:
+    """
+    Click analytics without I/O on the redirect path.
+
+    `record` appends a tuple to a bounded in-memory buffer and returns; when the
+    buffer is full the event is dropped and counted. A sampled beacon is one
+    event whose `weight` is the number of clicks it stands for. A periodic writer drains
+    the buffer in batches through `write_func`, classifying user agents and
+    reducing referrers to their host on the way, and a periodic rollup folds
+    written events into per-code hourly counters through `rollup_func`.
+
+    Unlike `ClickAggregator`, a batch that fails to write is dropped and counted
+    rather than retried, so a database outage costs analytics but never memory.
+    """
+
+    def __init__(self, write_func: Callable[[list[dict]], Awaitable[int]],
+                 rollup_func: Callable[[int], Awaitable[int]],
+                 capacity: int = 100_000, batch_size: int = 1000, flush_interval: float = 1,
+                 rollup_interval: float = 60, rollup_batch_size: int = 10_000, max_rollup_batches: int = 100):
+        self.write_func = write_func
+        self.rollup_func = rollup_func
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.rollup_batch_size = rollup_batch_size
+        self.max_rollup_batches = max_rollup_batches
+        self._events: deque = deque()
+        self._flush_lock = asyncio.Lock()
+        self._writer = PeriodicTask("click-events-write", flush_interval, self.flush)
+        self._rollup = PeriodicTask("click-events-rollup", rollup_interval, self.roll_up)
+        self.dropped = 0
+        self.failed = 0
+        self.written = 0
+        self.rolled_up = 0
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def record(self, shortened_url: str, referrer: Header = None, user_agent: Header = None,
+               count: int = 1) -> bool:
+        """Buffer one event counting `count` clicks; returns False if the buffer was full and it was dropped."""
+        if len(self._events) >= self.capacity:
+            self.dropped += 1
+            return False
+        self._events.append((time.time(), shortened_url, referrer, user_agent, count))
+        return True
+
+    def drain(self, limit: int) -> list[tuple]:
+        events = self._events
+        return [events.popleft() for _ in range(min(limit, len(events)))]
+
+    @staticmethod
+    def to_rows(events: Iterable[tuple]) -> list[dict]:
+        return [
+            {
+                "shortened_url": shortened_url,
+                "occurred": datetime.datetime.fromtimestamp(occurred, datetime.timezone.utc).replace(tzinfo=None),
+                "referrer": referrer_host(referrer),
+                "agent_class": classify_user_agent(user_agent),
+                "weight": weight,
+            }
+            for occurred, shortened_url, referrer, user_agent, weight in events
+        ]
+
+    async def flush(self) -> int:
+        """Write everything buffered so far, one batch at a time."""
+        written = 0
+        async with self._flush_lock:
+            pending = len(self._events)
+            while pending > 0:
+                events = self.drain(min(self.batch_size, pending))
+                pending -= len(events)
+                try:
+                    await self.write_func(self.to_rows(events))
+                except Exception as e:
+                    self.failed += len(events)
+                    logger.error(f"Dropped {len(events)} click events after a failed write: {e}")
+                    continue
+                written += len(events)
+        self.written += written
+        return written
+
+    async def roll_up(self) -> int:
+        """Fold written events into hourly counters, in batches, until none are left."""
+        total = 0
+        for _ in range(self.max_rollup_batches):
+            moved = await self.rollup_func(self.rollup_batch_size)
+            total += moved
+            if moved < self.rollup_batch_size:
+                break
+            await asyncio.sleep(0)
+        self.rolled_up += total
+        if total:
+            logger.info(f"Rolled up {total} click events")
+        return total
+
+    def start(self) -> None:
+        self._writer.start()
+        self._rollup.start()
+
+    async def stop(self) -> None:
+        """Stop both tasks and write whatever is still buffered; rollups resume on the next start."""
+        await self._rollup.stop()
+        await self._writer.stop()
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._events),
+            "capacity": self.capacity,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "rolled_up": self.rolled_up,
+        }
+
+
+async def write_events(rows: list[dict]) -> int:
+    async with AsyncSessionLocal() as db:
+        return await AsyncClickRepository(db).insert_events(rows)
+
+
+async def roll_up_events(limit: int) -> int:
+    async with AsyncSessionLocal() as db:
+        return await AsyncClickRepository(db).roll_up(limit)
+
+
+@lru_cache()
+def get_click_events() -> ClickEventPipeline:
+    settings = get_settings()
+    return ClickEventPipeline(
+        write_events,
+        roll_up_events,
+        capacity=settings.CLICK_EVENTS_BUFFER_SIZE,
+        batch_size=settings.CLICK_EVENTS_BATCH_SIZE,
+        flush_interval=settings.CLICK_EVENTS_FLUSH_SECONDS,
+        rollup_interval=settings.CLICK_ROLLUP_SECONDS,
+        rollup_batch_size=settings.CLICK_ROLLUP_BATCH_SIZE,
+        max_rollup_batches=settings.CLICK_ROLLUP_MAX_BATCHES,
+    )
+
+
+metrics.gauge("click_events_buffered", "Click events waiting to be written",
+              lambda: get_click_events().stats()["buffered"])
+metrics.counter_func("click_events_written_total", "Click events written to click_events",
+                     lambda: get_click_events().stats()["written"])
+metrics.counter_func(
+    "click_events_dropped_total", "Click events lost before reaching the database",
+    lambda: {("overflow",): get_click_events().stats()["dropped"],
+             ("write_error",): get_click_events().stats()["failed"]},
+    ("reason",),
+)
+metrics.counter_func("click_events_rolled_up_total", "Click events folded into hourly rollups",
+                     lambda: get_click_events().stats()["rolled_up"])
@@ -0,0 +1,76 @@
+import datetime
+import json
+from functools import lru_cache
+from typing import Optional
+
+from app.core.cache import TTLCache, TwoTierCache
+from app.core.config import get_settings
+from app.core.logging_config import setup_logger
+from app.db.redis_database import get_redis
+from app.repositories.click_repository import AsyncClickRepository
+from app.service.async_url_service import AsyncUrlsService
+
+logger = setup_logger(__name__)
+
+
+class ClickStatsService:
+    """
+    Per-link click statistics read from the rollup tables.
+
+    Results are cached per (code, hours, top) for a short TTL in the shared
+    two-tier cache, so any number of dashboards polling a link cost at most one
+    set of queries per TTL. The rollups trail live traffic by up to one flush
+    plus one rollup interval (app/service/click_events.py). Codes that are not
+    a live link (never issued, expired or reaped) are answered with None; the
+    check goes through `urls`, so it is usually a redirect cache hit.
+    """
+
+    def __init__(self, repository: AsyncClickRepository, urls: AsyncUrlsService,
+                 cache: Optional[TwoTierCache] = None):
+        self.repository = repository
+        self.urls = urls
+        self.cache = cache if cache is not None else get_stats_cache()
+
+    async def get_stats(self, shortened_url: str, hours: int, top: int,
+                        now: Optional[datetime.datetime] = None) -> Optional[dict]:
+        if not await self.urls.exists(shortened_url):
+            return None
+        key = f"{shortened_url}:{hours}:{top}"
+        stats = await self.cache.get(key)
+        if stats is not None:
+            return stats
+
+        now = now or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        since = now.replace(minute=0, second=0, microsecond=0) - datetime.timedelta(hours=hours - 1)
+        total = await self.repository.total_clicks(shortened_url)
+        hourly = dict(await self.repository.hourly_clicks(shortened_url, since))
+        referrers = await self.repository.top_referrers(
+            shortened_url, since.replace(hour=0), top
+        )
+        stats = {
+            "shortened_url": shortened_url,
+            "total_clicks": total,
+            "since": since.isoformat(),
+            "series": [
+                {"hour": hour.isoformat(), "clicks": hourly.get(hour, 0)}
+                for hour in (since + datetime.timedelta(hours=offset) for offset in range(hours))
+            ],
+            "top_referrers": [{"referrer": referrer, "clicks": clicks} for referrer, clicks in referrers],
+        }
+        await self.cache.set(key, stats)
+        logger.debug(f"Computed stats for {shortened_url} over {hours}h")
+        return stats
+
+
+@lru_cache()
+def get_stats_cache() -> TwoTierCache:
+    settings = get_settings()
+    return TwoTierCache(
+        TTLCache(max_entries=settings.CLICK_STATS_CACHE_MAX_ENTRIES, default_ttl=settings.CLICK_STATS_CACHE_TTL_SECONDS),
+        get_redis(),
+        prefix="stats:",
+        default_ttl=settings.CLICK_STATS_CACHE_TTL_SECONDS,
+        encode=lambda value: json.dumps(value).encode(),
+        decode=json.loads,
+        retry_seconds=settings.REDIS_RETRY_SECONDS,
+    )
@@ -0,0 +1,195 @@
+import asyncio
+import re
+import time
+from functools import lru_cache
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+from app.core import metrics
+from app.core.cache import TTLCache
+from app.core.config import get_settings
+from app.core.logging_config import setup_logger
+from app.db.async_sql_database import AsyncSessionLocal
+from app.repositories.async_url_repository import AsyncUrlsRepository
+from app.repositories.url_repository import get_short_code_allocator
+from app.utils.bloom_filter import BloomFilter
+from app.utils.periodic_task import PeriodicTask
+from app.utils.short_codes import ShortCodeAllocator
+
+logger = setup_logger(__name__)
+
+SHORT_CODE_REJECTIONS = metrics.counter(
+    "short_code_filter_rejections_total",
+    "Redirect lookups answered 404 without a database query",
+    ("reason",),
+)
+
+# Ids this many blocks past the sequence high-water mark still pass, covering
+# blocks other workers reserve between two reads of the mark.
+_LIMIT_SLACK_BLOCKS = 16
+# Codes from the random generator used before sequence codes; `python -m app.cli import`
+# can add more of them at any time, and they carry no id to check against the sequence
+_LEGACY_CODE = re.compile(r"[0-9A-Za-z]{6}")
+
+
+class ShortCodeFilter:
+    """
+    Decides whether a short code can exist before the database is asked.
+
+    A code is sent to the database only if it might exist:
+
+    - it was not looked up and missed recently (negative cache), and
+    - it is in the Bloom filter of codes that were live when the filter was
+      built, or it decodes to an id from a block the sequence has handed out,
+      so codes created by any worker after the build still pass, or it has the
+      shape of a legacy code (six letters and digits), so legacy codes imported
+      after the build still pass.
+
+    Scanner paths (`wp-login.php`, `robots.txt`) fail to decode at all and random
+    alphanumeric probes decode to ids far beyond the sequence, so both are
+    rejected from memory. Until the first build finishes every code passes.
+    The sequence high-water mark is re-read at most once per `limit_refresh_seconds`.
+    """
+
+    def __init__(self, allocator: ShortCodeAllocator,
+                 count_func: Callable[[], Awaitable[int]],
+                 codes_func: Callable[[], AsyncIterator[str]],
+                 high_water_func: Callable[[], Awaitable[int]],
+                 negative_cache: TTLCache,
+                 error_rate: float = 0.01, min_capacity: int = 100_000,
+                 rebuild_seconds: float = 3600, limit_refresh_seconds: float = 1):
+        self.allocator = allocator
+        self.count_func = count_func
+        self.codes_func = codes_func
+        self.high_water_func = high_water_func
+        self.negative_cache = negative_cache
+        self.error_rate = error_rate
+        self.min_capacity = min_capacity
+        self.limit_refresh_seconds = limit_refresh_seconds
+        self._bloom: Optional[BloomFilter] = None
+        self._building: Optional[BloomFilter] = None
+        self._id_limit = 0
+        self._limit_checked = 0.0
+        self._initial_build: Optional[asyncio.Task] = None
+        self._rebuilder = PeriodicTask("short-code-filter", rebuild_seconds, self.build)
+
+    @property
+    def ready(self) -> bool:
+        return self._bloom is not None
+
+    async def build(self) -> None:
+        """Build a fresh filter from the live codes in the database and swap it in."""
+        started = time.perf_counter()
+        capacity = max(self.min_capacity, 2 * await self.count_func())
+        bloom = self._building = BloomFilter(capacity, self.error_rate)
+        try:
+            async for code in self.codes_func():
+                bloom.add(code)
+            await self._refresh_id_limit(force=True)
+        finally:
+            self._building = None
+        self._bloom = bloom
+        logger.info(f"Built short code filter with {len(bloom)} codes "
+                    f"({bloom.nbytes // 1024} KiB) in {time.perf_counter() - started:.2f}s")
+
+    def add(self, code: str) -> None:
+        """Register a newly created code."""
+        self.negative_cache.delete(code)
+        for bloom in (self._bloom, self._building):
+            if bloom is not None:
+                bloom.add(code)
+
+    def record_miss(self, code: str) -> None:
+        self.negative_cache.set(code, True)
+
+    async def might_exist(self, code: str) -> bool:
+        if code in self.negative_cache:
+            SHORT_CODE_REJECTIONS.inc(("negative_cache",))
+            return False
+        bloom = self._bloom
+        if bloom is None or code in bloom:
+            return True
+        if len(code) < self.allocator.codec.min_length and _LEGACY_CODE.fullmatch(code):
+            return True
+
+        value = self.allocator.codec.decode(code)
+        if value is not None and value >= self._id_limit:
+            await self._refresh_id_limit()
+        if value is None or value >= self._id_limit:
+            SHORT_CODE_REJECTIONS.inc(("filter",))
+            return False
+        return True
+
+    async def _refresh_id_limit(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._limit_checked < self.limit_refresh_seconds:
+            return
+        self._limit_checked = now
+        blocks = await self.high_water_func()
+        if self.allocator.highest_block is not None:
+            blocks = max(blocks, self.allocator.highest_block + 1)
+        self._id_limit = (blocks + _LIMIT_SLACK_BLOCKS) * self.allocator.block_size
+
+    def start(self) -> None:
+        async def initial_build():
+            try:
+                await self.build()
+            except Exception as e:
+                logger.error(f"Failed to build short code filter, all codes go to the database: {e}")
+
+        self._initial_build = asyncio.create_task(initial_build(), name="short-code-filter-build")
+        self._rebuilder.start()
+
+    async def stop(self) -> None:
+        await self._rebuilder.stop()
+        if self._initial_build is not None:
+            self._initial_build.cancel()
+            try:
+                await self._initial_build
+            except asyncio.CancelledError:
+                pass
+            self._initial_build = None
+
+    def stats(self) -> dict:
+        bloom = self._bloom
+        return {
+            "ready": bloom is not None,
+            "codes": len(bloom) if bloom is not None else 0,
+            "capacity": bloom.capacity if bloom is not None else 0,
+            "bytes": bloom.nbytes if bloom is not None else 0,
+            "negative_cache": self.negative_cache.stats(),
+        }
+
+
+async def count_live_codes() -> int:
+    async with AsyncSessionLocal() as db:
+        return await AsyncUrlsRepository(db).count_live()
+
+
+async def live_codes() -> AsyncIterator[str]:
+    async with AsyncSessionLocal() as db:
+        async for code in AsyncUrlsRepository(db).iter_live_codes():
+            yield code
+
+
+async def block_high_water() -> int:
+    async with AsyncSessionLocal() as db:
+        return await AsyncUrlsRepository(db).block_high_water()
+
+
+@lru_cache()
+def get_short_code_filter() -> ShortCodeFilter:
+    settings = get_settings()
+    return ShortCodeFilter(
+        get_short_code_allocator(),
+        count_live_codes,
+        live_codes,
+        block_high_water,
+        TTLCache(max_entries=settings.NEGATIVE_CACHE_MAX_ENTRIES, default_ttl=settings.NEGATIVE_CACHE_TTL_SECONDS),
+        error_rate=settings.SHORT_CODE_FILTER_ERROR_RATE,
+        min_capacity=settings.SHORT_CODE_FILTER_MIN_CAPACITY,
+        rebuild_seconds=settings.SHORT_CODE_FILTER_REBUILD_SECONDS,
+    )
+
+
+metrics.gauge("short_code_filter_codes", "Codes in the short code Bloom filter",
+              lambda: get_short_code_filter().stats()["codes"])
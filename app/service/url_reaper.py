@@ -0,0 +1,99 @@
+import asyncio
+import datetime
+import time
+from functools import lru_cache
+from typing import Awaitable, Callable, Optional
+
+from app.core import metrics
+from app.core.config import get_settings
+from app.core.logging_config import setup_logger
+from app.db.async_sql_database import AsyncSessionLocal
+from app.repositories.async_url_repository import AsyncUrlsRepository
+from app.repositories.url_repository import as_db_timestamp
+from app.utils.periodic_task import PeriodicTask
+
+logger = setup_logger(__name__)
+
+URLS_REAPED = metrics.counter("urls_reaped_total", "Expired URL rows deleted by the reaper")
+REAPER_RUN_SECONDS = metrics.histogram("url_reaper_run_seconds", "Duration of one reaper sweep")
+
+
+class UrlReaper:
+    """
+    Periodically deletes expired rows from `urls`.
+
+    Each sweep deletes in batches of `batch_size`, committing after each one, so
+    no transaction holds many row locks or runs for long; it stops when a batch
+    comes back short or after `max_batches`, leaving the rest to the next sweep.
+    After a sweep `lag_seconds` is how long the oldest expired row still in the
+    table has been expired (0 when the sweep caught up).
+    """
+
+    def __init__(self, purge_func: Callable[[datetime.datetime, int], Awaitable[int]],
+                 oldest_func: Callable[[datetime.datetime], Awaitable[Optional[datetime.datetime]]],
+                 interval: float = 60, batch_size: int = 500, max_batches: int = 100):
+        self.purge_func = purge_func
+        self.oldest_func = oldest_func
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self._sweeper = PeriodicTask("url-reaper", interval, self.sweep)
+        self.purged = 0
+        self.lag_seconds = 0.0
+
+    async def sweep(self) -> int:
+        start = time.perf_counter()
+        cutoff = as_db_timestamp(datetime.datetime.now(datetime.timezone.utc))
+        deleted = 0
+        try:
+            for _ in range(self.max_batches):
+                batch = await self.purge_func(cutoff, self.batch_size)
+                deleted += batch
+                URLS_REAPED.inc(amount=batch)
+                if batch < self.batch_size:
+                    break
+                # Give request handlers a turn between batches
+                await asyncio.sleep(0)
+
+            oldest = await self.oldest_func(cutoff)
+            self.lag_seconds = (cutoff - oldest).total_seconds() if oldest is not None else 0.0
+        finally:
+            self.purged += deleted
+            REAPER_RUN_SECONDS.observe(time.perf_counter() - start)
+        if deleted:
+            logger.info(f"Reaped {deleted} expired URLs, lag {self.lag_seconds:.0f}s")
+        return deleted
+
+    def start(self) -> None:
+        self._sweeper.start()
+
+    async def stop(self) -> None:
+        await self._sweeper.stop()
+
+    def stats(self) -> dict:
+        return {"purged": self.purged, "lag_seconds": self.lag_seconds}
+
+
+async def purge_expired(before: datetime.datetime, limit: int) -> int:
+    async with AsyncSessionLocal() as db:
+        return await AsyncUrlsRepository(db).purge_expired(before, limit)
+
+
+async def oldest_expired(before: datetime.datetime) -> Optional[datetime.datetime]:
+    async with AsyncSessionLocal() as db:
+        return await AsyncUrlsRepository(db).oldest_expired(before)
+
+
+@lru_cache()
+def get_url_reaper() -> UrlReaper:
+    settings = get_settings()
+    return UrlReaper(
+        purge_expired,
+        oldest_expired,
+        interval=settings.URL_REAPER_INTERVAL_SECONDS,
+        batch_size=settings.URL_REAPER_BATCH_SIZE,
+        max_batches=settings.URL_REAPER_MAX_BATCHES,
+    )
+
+
+metrics.gauge("url_reaper_lag_seconds", "Age of the oldest expired URL row not yet reaped",
+              lambda: get_url_reaper().lag_seconds)
@@ -1,24 +1,151 @@
-from typing import Optional
-from datetime import datetime
+import datetime
+import json
+import sys
+import time
+from functools import lru_cache
+from typing import Hashable, Optional
 from app.repositories.url_repository import UrlsRepository
-from app.models.models import Urls
+from app.models.models import DEFAULT_REDIRECT_STATUS, PERMANENT_REDIRECT_STATUSES, Urls
+from app.core import metrics
+from app.core.cache import TTLCache, TwoTierCache
+from app.core.config import get_settings
+from app.db.redis_database import get_redis
+from app.service.click_aggregator import ClickAggregator, get_click_aggregator
 from app.core.logging_config import setup_logger
 
-logger = setup_logger()
+logger = setup_logger(__name__)
+
+
+class CachedUrl:
+    """The subset of a `Urls` row needed to serve a redirect."""
+    __slots__ = ("original_url", "valid_until", "redirect_status")
+
+    def __init__(self, original_url: str, valid_until: Optional[float],
+                 redirect_status: int = DEFAULT_REDIRECT_STATUS):
+        self.original_url = original_url
+        self.valid_until = valid_until
+        self.redirect_status = redirect_status
+
+    @classmethod
+    def from_model(cls, url_obj: Urls) -> "CachedUrl":
+        return cls(url_obj.original_url, to_epoch(url_obj.valid_until),
+                   url_obj.redirect_status or DEFAULT_REDIRECT_STATUS)
+
+    def cache_control(self, max_age: float, now: Optional[float] = None) -> Optional[str]:
+        """
+        `Cache-Control` value for the redirect, or None to send no header.
+
+        Permanent redirects may be cached until the link expires, but never for
+        more than `max_age` seconds, which bounds how long a link that is removed
+        early (e.g. a newly blacklisted domain) keeps being served from caches.
+        Temporary redirects carry no header and are not cached.
+        """
+        if self.redirect_status not in PERMANENT_REDIRECT_STATUSES:
+            return None
+        lifetime = max_age
+        if self.valid_until is not None:
+            lifetime = min(lifetime, self.valid_until - (time.time() if now is None else now))
+        if lifetime < 1:
+            return "no-store"
+        return f"public, max-age={int(lifetime)}"
+
+
+def to_epoch(value: Optional[datetime.datetime]) -> Optional[float]:
+    """Convert a DB timestamp to epoch seconds; naive values are stored in UTC."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.timestamp()
+
+
+def _sizeof_cached_url(key: Hashable, value: CachedUrl) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(value) + sys.getsizeof(value.original_url)
+
+
+def encode_cached_url(value: CachedUrl) -> bytes:
+    return json.dumps([value.original_url, value.valid_until, value.redirect_status]).encode()
+
+
+def decode_cached_url(raw: bytes) -> CachedUrl:
+    # Entries written before redirect_status existed have two fields
+    return CachedUrl(*json.loads(raw))
+
+
+@lru_cache()
+def get_redirect_cache() -> TwoTierCache:
+    settings = get_settings()
+    client = get_redis()
+    local = TTLCache(
+        max_entries=settings.REDIRECT_CACHE_MAX_ENTRIES,
+        max_bytes=settings.REDIRECT_CACHE_MAX_BYTES,
+        default_ttl=settings.REDIRECT_CACHE_TTL_SECONDS if client is None else settings.REDIRECT_CACHE_L1_TTL_SECONDS,
+        sizeof=_sizeof_cached_url,
+    )
+    return TwoTierCache(
+        local,
+        client,
+        prefix="url:",
+        default_ttl=settings.REDIRECT_CACHE_TTL_SECONDS,
+        encode=encode_cached_url,
+        decode=decode_cached_url,
+        retry_seconds=settings.REDIS_RETRY_SECONDS,
+    )
+
+
+def _redirect_cache_metric(l1_field: str, l2_field: Optional[str] = None):
+    def collect():
+        stats = get_redirect_cache().stats()
+        values = {("l1",): stats[l1_field]}
+        if l2_field:
+            values[("l2",)] = stats[l2_field]
+        return values
+    return collect
+
+
+metrics.counter_func("redirect_cache_hits_total", "Redirect cache hits",
+                     _redirect_cache_metric("hits", "l2_hits"), ("tier",))
+metrics.counter_func("redirect_cache_misses_total", "Redirect cache misses",
+                     _redirect_cache_metric("misses", "l2_misses"), ("tier",))
+metrics.counter_func("redirect_cache_evictions_total", "Entries evicted from the in-process redirect cache",
+                     lambda: get_redirect_cache().stats()["evictions"])
+metrics.counter_func("redirect_cache_errors_total", "Failed Redis cache operations",
+                     lambda: get_redirect_cache().stats()["l2_errors"])
+metrics.gauge("redirect_cache_entries", "Entries in the in-process redirect cache",
+              lambda: get_redirect_cache().stats()["entries"])
+metrics.gauge("redirect_cache_bytes", "Estimated size of the in-process redirect cache",
+              lambda: get_redirect_cache().stats()["bytes"])
+
 
 class UrlsService:
-    def __init__(self, repository: UrlsRepository):
+    """
+    Synchronous service kept for scripts and tooling; the request path uses
+    `AsyncUrlsService`. It shares the in-process tier of the redirect cache.
+    """
+
+    def __init__(self, repository: UrlsRepository, cache: Optional[TTLCache] = None,
+                 clicks: Optional[ClickAggregator] = None):
         self.repository = repository
+        self.cache = cache if cache is not None else get_redirect_cache().local
+        self.clicks = clicks if clicks is not None else get_click_aggregator()
 
-    def shorten_url(self, original_url: str, valid_until: Optional[datetime] = None) -> Urls:
+    def shorten_url(self, original_url: str, valid_until: Optional[datetime.datetime] = None) -> Urls:
         logger.info(f"Service: Shortening URL: {original_url}")
         return self.repository.create_url(original_url, valid_until)
 
-    def resolve_url(self, shortened_url: str) -> Optional[Urls]:
+    def resolve_url(self, shortened_url: str) -> Optional[CachedUrl]:
         logger.debug(f"Service: Resolving shortened URL: {shortened_url}")
-        url_obj = self.repository.get_by_short(shortened_url)
-        if url_obj:
-            logger.info(f"Short URL found. Incrementing clicks for: {shortened_url}")
-            return self.repository.increment_clicks(url_obj)
-        logger.warning(f"Shortened URL not found or expired: {shortened_url}")
-        return None
+        cached = self.cache.get(shortened_url)
+        if cached is None:
+            url_obj = self.repository.get_by_short(shortened_url)
+            if url_obj is None:
+                logger.warning(f"Shortened URL not found or expired: {shortened_url}")
+                return None
+            cached = CachedUrl.from_model(url_obj)
+            self.cache.set(shortened_url, cached, expires_at=cached.valid_until)
+        elif cached.valid_until is not None and cached.valid_until <= time.time():
+            return None
+
+        logger.info(f"Short URL found. Incrementing clicks for: {shortened_url}")
+        self.clicks.record(shortened_url)
+        return cached
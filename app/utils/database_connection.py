@@ -1,38 +1,53 @@
-import psycopg2
-from psycopg2 import OperationalError
+from typing import Optional
+
+from sqlalchemy import Engine
 
 from app.core.logging_config import setup_logger
-from app.utils.singleton_meta import SingletonMeta
 
-logger = setup_logger()
+logger = setup_logger(__name__)
+
+
+class DatabaseConnection:
+    """
+    Raw DB-API connection borrowed from the shared SQLAlchemy pool.
 
-class DatabaseConnection(metaclass=SingletonMeta):
+    Each instance checks out its own connection, so concurrent callers never
+    share a socket, and `close()` returns it to the pool rather than tearing it
+    down. Use it for driver-level features such as `COPY`; prefer sessions for
+    everything else.
+    """
 
-    def __init__(self, user, password, host, port, dbname):
+    def __init__(self, engine: Optional[Engine] = None):
+        if engine is None:
+            from app.db.sql_database import engine
+        self.engine = engine
         self.connection = None
-        try:
-            self.connection = psycopg2.connect(
-                user=user,
-                password=password,
-                host=host,
-                port=port,
-                dbname=dbname
-            )
-            logger.info("Database connection established.")
-        except OperationalError as e:
-            logger.error("Failed to connect to the database.")
-            logger.error(f"Error: {e}")
-            self.connection = None
+
+    def __enter__(self) -> "DatabaseConnection":
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.connection is not None:
+            if exc_type is None:
+                self.connection.commit()
+            else:
+                self.connection.rollback()
+        self.close()
+
+    def connect(self):
+        if self.connection is None:
+            self.connection = self.engine.raw_connection()
+            logger.debug("Database connection checked out from pool.")
+        return self.connection
 
     def get_cursor(self):
-        if self.connection:
-            return self.connection.cursor()
-        else:
-            raise Exception("No database connection.")
+        return self.connect().cursor()
 
     def close(self):
         if self.connection:
             self.connection.close()
-            logger.info("Connection closed.")
+            self.connection = None
+            logger.debug("Database connection returned to pool.")
         else:
-            logger.info("No connection to close.")
\ No newline at end of file
+            logger.info("No connection to close.")
@@ -0,0 +1,52 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+from app.core.logging_config import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class PeriodicTask:
+    """
+    Runs an async callback every `interval` seconds on the running event loop.
+
+    Exceptions raised by the callback are logged and swallowed so a single
+    failed run never stops the schedule.
+    """
+
+    def __init__(self, name: str, interval: float, callback: Callable[[], Awaitable[None]]):
+        self.name = name
+        self.interval = interval
+        self.callback = callback
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.create_task(self._run(), name=self.name)
+        logger.info(f"Started periodic task '{self.name}' every {self.interval}s")
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info(f"Stopped periodic task '{self.name}'")
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.callback()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Periodic task '{self.name}' failed: {e}")
@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import threading
+from typing import Awaitable, Callable, Optional
+
+"""
+Short code allocation without per-code database round trips.
+
+Each worker reserves a block of ids at a time from a database sequence (hi/lo:
+block number `hi` covers ids `hi * block_size ... hi * block_size + block_size - 1`)
+and turns ids into codes locally. Ids map onto base62 codes of growing length:
+the first 62**min_length ids get `min_length` characters, the next 62**(min_length + 1)
+get one more, and so on. Within a length the id is passed through a keyed
+format-preserving permutation so consecutive ids do not produce guessable codes.
+"""
+
+ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(ALPHABET)
+_INDEX = {char: index for index, char in enumerate(ALPHABET)}
+_FEISTEL_ROUNDS = 4
+
+
+def encode_base62(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, remainder = divmod(value, BASE)
+        chars.append(ALPHABET[remainder])
+    if value:
+        raise ValueError("value does not fit in the requested length")
+    return "".join(reversed(chars))
+
+
+def decode_base62(code: str) -> Optional[int]:
+    value = 0
+    for char in code:
+        index = _INDEX.get(char)
+        if index is None:
+            return None
+        value = value * BASE + index
+    return value
+
+
+class ShortCodeCodec:
+    """
+    Bijective mapping between sequence ids and short codes.
+
+    With an empty `secret` codes are plain base62 and enumerable, which
+    `get_short_code_allocator` only permits for development; otherwise each
+    length's keyspace is shuffled with a cycle-walking Feistel network keyed on `secret`.
+    The secret and `min_length` must never change once codes have been issued,
+    or new codes may collide with existing ones.
+    """
+
+    def __init__(self, min_length: int = 7, secret: str = ""):
+        self.min_length = min_length
+        self._key = hashlib.blake2b(secret.encode(), digest_size=32).digest() if secret else None
+
+    def _span(self, value: int) -> tuple[int, int]:
+        """Return (code length, first id of that length) for id `value`."""
+        length, start = self.min_length, 0
+        while value >= start + BASE ** length:
+            start += BASE ** length
+            length += 1
+        return length, start
+
+    def encode(self, value: int) -> str:
+        length, start = self._span(value)
+        return encode_base62(self._permute(value - start, BASE ** length), length)
+
+    def decode(self, code: str) -> Optional[int]:
+        """Return the id a code was issued for, or None if it cannot be a code."""
+        if len(code) < self.min_length:
+            return None
+        offset = decode_base62(code)
+        if offset is None:
+            return None
+        start = sum(BASE ** length for length in range(self.min_length, len(code)))
+        return start + self._unpermute(offset, BASE ** len(code))
+
+    def _round(self, round_index: int, half: int, bits: int) -> int:
+        digest = hashlib.blake2b(
+            half.to_bytes(16, "big") + bytes([round_index]), digest_size=16, key=self._key
+        ).digest()
+        return int.from_bytes(digest, "big") & ((1 << bits) - 1)
+
+    def _feistel(self, value: int, bits: int, inverse: bool) -> int:
+        mask = (1 << bits) - 1
+        left, right = value >> bits, value & mask
+        rounds = range(_FEISTEL_ROUNDS - 1, -1, -1) if inverse else range(_FEISTEL_ROUNDS)
+        for round_index in rounds:
+            if inverse:
+                left, right = right ^ self._round(round_index, left, bits), left
+            else:
+                left, right = right, left ^ self._round(round_index, right, bits)
+        return (left << bits) | right
+
+    def _walk(self, value: int, size: int, inverse: bool) -> int:
+        if self._key is None:
+            return value
+        bits = ((size - 1).bit_length() + 1) // 2
+        # Cycle walking: re-apply until the result lands back inside [0, size)
+        value = self._feistel(value, bits, inverse)
+        while value >= size:
+            value = self._feistel(value, bits, inverse)
+        return value
+
+    def _permute(self, value: int, size: int) -> int:
+        return self._walk(value, size, inverse=False)
+
+    def _unpermute(self, value: int, size: int) -> int:
+        return self._walk(value, size, inverse=True)
+
+
+class ShortCodeAllocator:
+    """
+    Hands out codes from locally reserved id blocks.
+
+    Only reserving a new block touches the database; every other call is pure
+    computation. Ids left in a block when the process exits are simply skipped.
+    """
+
+    def __init__(self, codec: ShortCodeCodec, block_size: int = 100):
+        self.codec = codec
+        self.block_size = block_size
+        self._next = 0
+        self._end = 0
+        self._thread_lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+        self.reserved_blocks = 0
+        self.highest_block: Optional[int] = None
+
+    def add_block(self, block: int) -> None:
+        with self._thread_lock:
+            self._next = block * self.block_size
+            self._end = self._next + self.block_size
+            self.reserved_blocks += 1
+            self.highest_block = block if self.highest_block is None else max(self.highest_block, block)
+
+    def take(self) -> Optional[str]:
+        """Return the next code from the current block, or None if it is used up."""
+        with self._thread_lock:
+            if self._next >= self._end:
+                return None
+            value = self._next
+            self._next += 1
+        return self.codec.encode(value)
+
+    def allocate(self, reserve: Callable[[], int]) -> str:
+        code = self.take()
+        while code is None:
+            with self._thread_lock:
+                exhausted = self._next >= self._end
+            if exhausted:
+                self.add_block(reserve())
+            code = self.take()
+        return code
+
+    async def allocate_async(self, reserve: Callable[[], Awaitable[int]]) -> str:
+        code = self.take()
+        if code is not None:
+            return code
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        while code is None:
+            async with self._async_lock:
+                # Another coroutine may have refilled the block while we waited
+                code = self.take()
+                if code is None:
+                    self.add_block(await reserve())
+                    code = self.take()
+        return code
@@ -0,0 +1,47 @@
+import hashlib
+from urllib.parse import urlsplit, urlunsplit
+
+"""
+Fixed-width keys for deduplicating original URLs.
+
+The `urls` table enforces uniqueness on a 16-byte digest of the normalized URL
+instead of on the URL text, so the unique index stays small however long the
+URLs get. MD5 is a dedup key here, not a security boundary. Existing rows are
+backfilled with `python -m app.cli backfill-digests`, so that they get exactly
+this digest.
+"""
+
+DIGEST_SIZE = 16
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonicalize the parts of a URL that do not change what it points to.
+
+    Scheme and host are lowercased, a default port is dropped and an empty path
+    becomes `/`. Path, query and fragment are kept as given.
+    """
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    if not parts.hostname:
+        return url
+    scheme = parts.scheme.lower()
+    netloc = parts.hostname
+    if ":" in netloc:
+        netloc = f"[{netloc}]"
+    if port is not None and port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{port}"
+    userinfo = parts.netloc.rpartition("@")[0]
+    if userinfo:
+        netloc = f"{userinfo}@{netloc}"
+    return urlunsplit((scheme, netloc, parts.path or "/", parts.query, parts.fragment))
+
+
+def url_digest(url: str) -> bytes:
+    return hashlib.md5(normalize_url(url).encode(), usedforsecurity=False).digest()
@@ -0,0 +1,131 @@
+import asyncio
+import datetime
+import uuid
+from itertools import count
+from typing import Iterable, Optional
+
+from fastapi import FastAPI
+
+from app.core.cache import TTLCache, TwoTierCache
+from app.integration.blacklist import get_blacklist_service
+from app.integration.domain_index import DomainIndex
+from app.main import create_app
+from app.models.models import DEFAULT_REDIRECT_STATUS, Urls
+from app.repositories.url_repository import as_db_timestamp
+from app.routes.redirect_fast_path import RedirectFastPath
+from app.routes.urls_router import get_service
+from app.service.async_url_service import AsyncUrlsService
+from app.service.click_aggregator import ClickAggregator
+from app.service.url_service import _sizeof_cached_url
+from app.utils.short_codes import ShortCodeAllocator, ShortCodeCodec
+from app.utils.url_digest import url_digest
+
+"""
+In-memory stand-in for Postgres, for benchmarks that should run anywhere.
+
+`InMemoryUrlsRepository` implements the parts of `AsyncUrlsRepository` the
+request path uses (and `RedirectLookup.get_by_short`) on plain dicts, with an
+optional fixed delay per query to approximate a database round trip.
+`build_app` wires it into the real FastAPI app, fast path included.
+"""
+
+
+class InMemoryUrlsRepository:
+    def __init__(self, query_delay: float = 0.0, allocator: Optional[ShortCodeAllocator] = None):
+        self.query_delay = query_delay
+        self.allocator = allocator or ShortCodeAllocator(ShortCodeCodec(min_length=7), block_size=100)
+        self._blocks = count()
+        self._by_code: dict[str, Urls] = {}
+        self._by_digest: dict[bytes, Urls] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_code)
+
+    async def _round_trip(self) -> None:
+        if self.query_delay:
+            await asyncio.sleep(self.query_delay)
+
+    def _live(self, url_obj: Optional[Urls]) -> Optional[Urls]:
+        if url_obj is None or url_obj.valid_until is None:
+            return url_obj
+        now = as_db_timestamp(datetime.datetime.now(datetime.timezone.utc))
+        return url_obj if url_obj.valid_until > now else None
+
+    def _upsert(self, original_url: str, valid_until: Optional[datetime.datetime],
+                redirect_status: int) -> tuple[Urls, bool]:
+        digest = url_digest(original_url)
+        existing = self._live(self._by_digest.get(digest))
+        if existing is not None:
+            return existing, False
+        now = datetime.datetime.now(datetime.timezone.utc)
+        url_obj = Urls(
+            id=uuid.uuid4(), original_url=original_url, original_url_digest=digest,
+            shortened_url=self.allocator.allocate(lambda: next(self._blocks)),
+            clicks=0, created=now, updated=now, valid_until=as_db_timestamp(valid_until),
+            redirect_status=redirect_status,
+        )
+        self._by_digest[digest] = url_obj
+        self._by_code[url_obj.shortened_url] = url_obj
+        return url_obj, True
+
+    async def create_url(self, original_url: str, valid_until: Optional[datetime.datetime] = None,
+                         redirect_status: int = DEFAULT_REDIRECT_STATUS) -> Urls:
+        await self._round_trip()
+        return self._upsert(original_url, valid_until, redirect_status)[0]
+
+    async def create_many(
+            self, items: Iterable[tuple[str, Optional[datetime.datetime], int]]) -> dict[str, tuple[Urls, bool]]:
+        await self._round_trip()
+        results = {}
+        for original_url, valid_until, redirect_status in items:
+            if original_url not in results:
+                results[original_url] = self._upsert(original_url, valid_until, redirect_status)
+        return results
+
+    async def get_by_short(self, shortened_url: str) -> Optional[Urls]:
+        await self._round_trip()
+        return self._live(self._by_code.get(shortened_url))
+
+    async def bulk_increment_clicks(self, counts: dict[str, int]) -> int:
+        await self._round_trip()
+        updated = 0
+        for code, clicks in counts.items():
+            url_obj = self._by_code.get(code)
+            if url_obj is not None:
+                url_obj.clicks += clicks
+                updated += 1
+        return updated
+
+
+class _StaticBlacklist:
+    def __init__(self, domains: DomainIndex):
+        self.domains = domains
+
+    async def ensure_loaded(self) -> None:
+        pass
+
+    def match(self, value: str) -> Optional[str]:
+        return self.domains.match(value)
+
+
+def build_service(repository: InMemoryUrlsRepository, cache_entries: int = 100_000) -> AsyncUrlsService:
+    cache = TwoTierCache(
+        TTLCache(max_entries=cache_entries, default_ttl=300, sizeof=_sizeof_cached_url),
+        None, prefix="url:", default_ttl=300, encode=None, decode=None,
+    )
+    clicks = ClickAggregator(repository.bulk_increment_clicks)
+    return AsyncUrlsService(repository, cache=cache, clicks=clicks)
+
+
+def build_app(repository: InMemoryUrlsRepository, blacklist: Optional[DomainIndex] = None,
+              cache_entries: int = 100_000) -> FastAPI:
+    """The real app with its database, Redis and blacklist swapped for in-memory stand-ins."""
+    service = build_service(repository, cache_entries)
+    application = create_app()
+    application.dependency_overrides[get_service] = lambda: service
+    blacklist_stub = _StaticBlacklist(blacklist if blacklist is not None else DomainIndex.from_domains([]))
+    application.dependency_overrides[get_blacklist_service] = lambda: blacklist_stub
+    for middleware in application.user_middleware:
+        if middleware.cls is RedirectFastPath:
+            middleware.kwargs["service"] = service
+    return application
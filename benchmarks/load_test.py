@@ -0,0 +1,260 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from bisect import bisect_left
+from itertools import accumulate
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+"""
+End-to-end load test for redirect and create throughput.
+
+    # Against the app in this process, backed by the in-memory stand-in
+    python -m benchmarks.load_test run --in-process --output current.json
+
+    # Against a running server (e.g. `docker compose up` with a local Postgres)
+    python -m benchmarks.load_test run --url http://localhost:8000 --output current.json
+
+    # Flag regressions against a stored baseline; exits 1 if any are found
+    python -m benchmarks.load_test compare baseline.json current.json
+
+A run seeds `--urls` links through `POST /urls/batch`, then `--concurrency`
+clients issue requests for `--duration` seconds: creates with probability
+`--create-ratio`, otherwise redirects to a seeded code picked with Zipf(`--zipf`)
+popularity, so a few links take most of the traffic as in production. Runs
+with the same `--seed` issue the same request sequence.
+"""
+
+OPERATIONS = ("redirect", "create")
+SEED_BATCH_SIZE = 1000
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def zipf_cum_weights(n: int, exponent: float) -> list[float]:
+    return list(accumulate(1 / rank ** exponent for rank in range(1, n + 1)))
+
+
+def summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    to_ms = 1000
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "throughput_rps": round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * to_ms, 3) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 0.50) * to_ms, 3),
+        "p95_ms": round(percentile(ordered, 0.95) * to_ms, 3),
+        "p99_ms": round(percentile(ordered, 0.99) * to_ms, 3),
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+    }
+
+
+async def seed(client: httpx.AsyncClient, count: int, rng: random.Random) -> list[str]:
+    codes = []
+    for start in range(0, count, SEED_BATCH_SIZE):
+        items = [
+            {"original_url": f"https://bench-{rng.getrandbits(64):016x}.example.com/{index}"}
+            for index in range(start, min(count, start + SEED_BATCH_SIZE))
+        ]
+        response = await client.post("/urls/batch", json={"items": items})
+        response.raise_for_status()
+        codes.extend(result["url"]["shortened_url"] for result in response.json()["results"] if result["url"])
+    return codes
+
+
+async def drive(client: httpx.AsyncClient, codes: list[str], args: argparse.Namespace,
+                phase: str = "run") -> dict:
+    """Issue traffic for `args.duration` seconds; each `phase` draws its own requests and create URLs."""
+    cum_weights = zipf_cum_weights(len(codes), args.zipf)
+    total_weight = cum_weights[-1]
+    latencies = {operation: [] for operation in OPERATIONS}
+    errors = {operation: 0 for operation in OPERATIONS}
+    deadline = time.perf_counter() + args.duration
+
+    async def worker(worker_id: int) -> None:
+        rng = random.Random(f"{args.seed}-{phase}-{worker_id}")
+        sequence = 0
+        while time.perf_counter() < deadline:
+            sequence += 1
+            if rng.random() < args.create_ratio:
+                operation = "create"
+                original_url = f"https://new-{phase}-{worker_id}-{sequence}-{args.seed}.example.com/"
+                request = client.post("/urls", json={"original_url": original_url})
+                expected = 201
+            else:
+                operation = "redirect"
+                code = codes[bisect_left(cum_weights, rng.random() * total_weight)]
+                request = client.get(f"/{code}")
+                expected = 302
+            started = time.perf_counter()
+            try:
+                response = await request
+                ok = response.status_code == expected
+            except httpx.HTTPError:
+                ok = False
+            latencies[operation].append(time.perf_counter() - started)
+            if not ok:
+                errors[operation] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(worker_id) for worker_id in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+
+    results = {operation: summarize(latencies[operation], errors[operation], elapsed) for operation in OPERATIONS}
+    results["total"] = summarize(
+        [value for operation in OPERATIONS for value in latencies[operation]], sum(errors.values()), elapsed
+    )
+    return results
+
+
+def _client(args: argparse.Namespace) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.url:
+        return httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout)
+
+    from benchmarks.in_memory import InMemoryUrlsRepository, build_app
+
+    application = build_app(InMemoryUrlsRepository(query_delay=args.query_delay_ms / 1000))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=application), base_url="http://bench",
+                             limits=limits, timeout=args.timeout)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    async with _client(args) as client:
+        codes = await seed(client, args.urls, rng)
+        if not codes:
+            raise RuntimeError("Seeding created no URLs")
+        if args.warmup:
+            warmup = argparse.Namespace(**{**vars(args), "duration": args.warmup})
+            # A separate phase, so the measured creates are not repeats the warmup already made
+            await drive(client, codes, warmup, phase="warmup")
+        results = await drive(client, codes, args)
+    return {
+        "benchmark": "load_test",
+        "config": {
+            "target": args.url or "in-process",
+            "urls": args.urls,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "create_ratio": args.create_ratio,
+            "zipf": args.zipf,
+            "seed": args.seed,
+            "query_delay_ms": None if args.url else args.query_delay_ms,
+        },
+        "environment": environment(),
+        "results": results,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> dict:
+    """
+    Compare two runs operation by operation.
+
+    A regression is throughput that dropped, or p95/p99 latency that rose, by
+    more than `tolerance` (a fraction) relative to the baseline.
+    """
+    regressions = []
+    details = {}
+    for operation, before in baseline["results"].items():
+        after = current["results"].get(operation)
+        if after is None or not before.get("requests"):
+            continue
+        changes = {}
+        for metric, worse_when_higher in (("throughput_rps", False), ("p95_ms", True), ("p99_ms", True)):
+            if not before[metric]:
+                continue
+            change = (after[metric] - before[metric]) / before[metric]
+            changes[metric] = round(change, 4)
+            if (change > tolerance) if worse_when_higher else (change < -tolerance):
+                regressions.append({"operation": operation, "metric": metric,
+                                    "baseline": before[metric], "current": after[metric], "change": round(change, 4)})
+        details[operation] = changes
+    return {"tolerance": tolerance, "changes": details, "regressions": regressions, "ok": not regressions}
+
+
+def _write(result: dict, output: Optional[Path]) -> None:
+    text = json.dumps(result, indent=2)
+    if output:
+        output.write_text(text + "\n")
+    else:
+        print(text)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_test",
+                                     description="End-to-end load test for redirect and create throughput.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Seed links, drive traffic and report JSON results")
+    target = run_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="Base URL of a running server")
+    target.add_argument("--in-process", action="store_true", help="Run the app in this process on the in-memory stand-in")
+    run_parser.add_argument("--urls", type=int, default=10_000, help="Links to seed")
+    run_parser.add_argument("--concurrency", type=int, default=32)
+    run_parser.add_argument("--duration", type=float, default=30, help="Measured seconds")
+    run_parser.add_argument("--warmup", type=float, default=5, help="Unmeasured seconds before the run")
+    run_parser.add_argument("--create-ratio", type=float, default=0.05)
+    run_parser.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent of link popularity")
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--timeout", type=float, default=10)
+    run_parser.add_argument("--query-delay-ms", type=float, default=0.5,
+                            help="Simulated round trip per query for --in-process")
+    run_parser.add_argument("--log-level", default="WARNING")
+    run_parser.add_argument("--output", type=Path)
+
+    compare_parser = subparsers.add_parser("compare", help="Flag regressions against a baseline run")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--tolerance", type=float, default=0.10,
+                                help="Allowed relative change before flagging (default 0.10)")
+    compare_parser.add_argument("--output", type=Path)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        from app.core.logging_config import configure_logging
+
+        # App and client logs share stdout with the report and cost time on every request
+        configure_logging(args.log_level, "plain")
+        _write(asyncio.run(run(args)), args.output)
+        return 0
+
+    report = compare(json.loads(args.baseline.read_text()), json.loads(args.current.read_text()), args.tolerance)
+    _write(report, args.output)
+    for regression in report["regressions"]:
+        print(f"REGRESSION {regression['operation']} {regression['metric']}: "
+              f"{regression['baseline']} -> {regression['current']} ({regression['change']:+.1%})", file=sys.stderr)
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,326 @@
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from benchmarks.load_test import environment
+
+"""
+Microbenchmarks for the pieces on the request path.
+
+    python -m benchmarks.micro run                      # all benchmarks, appended to the history
+    python -m benchmarks.micro run -k cache -k schema   # names containing any of the filters
+    python -m benchmarks.micro history -k blacklist     # median cost per commit
+
+Each benchmark has a setup function returning the operation to time, either a
+plain callable or a coroutine function. Operations are timed in batches sized to run
+for at least `--min-time` seconds, `--repeat` times; the report keeps the
+fastest and the median batch as nanoseconds per operation. `run` appends one
+JSON line per invocation to `benchmarks/results/micro.jsonl`, tagged with the
+git commit, so a component's cost can be followed across commits.
+"""
+
+RESULTS_PATH = Path(__file__).parent / "results" / "micro.jsonl"
+
+Operation = Union[Callable[[], Any], Callable[[], Awaitable[Any]]]
+BENCHMARKS: dict[str, Callable[[], Operation]] = {}
+
+
+def benchmark(name: str):
+    def register(setup: Callable[[], Operation]) -> Callable[[], Operation]:
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+def _urls(count: int, seed: int = 1) -> list[str]:
+    rng = random.Random(seed)
+    return [f"https://host-{rng.getrandbits(32):08x}.example.com/path/{index}?q={index}" for index in range(count)]
+
+
+def _blacklist_text(count: int = 20_000) -> str:
+    rng = random.Random(2)
+    return "# CERT Polska list\n" + "\n".join(f"bad-{rng.getrandbits(40):010x}.pl" for _ in range(count)) + "\n"
+
+
+@benchmark("cache.get_hit")
+def _cache_get_hit():
+    from app.core.cache import TTLCache
+
+    cache = TTLCache(max_entries=10_000, default_ttl=300)
+    for index in range(10_000):
+        cache.set(f"code{index}", index)
+    return lambda: cache.get("code5000")
+
+
+@benchmark("cache.get_miss")
+def _cache_get_miss():
+    from app.core.cache import TTLCache
+
+    cache = TTLCache(max_entries=10_000, default_ttl=300)
+    return lambda: cache.get("absent")
+
+
+@benchmark("cache.set_evicting")
+def _cache_set_evicting():
+    from app.core.cache import TTLCache
+
+    cache = TTLCache(max_entries=1_000, default_ttl=300)
+    keys = iter(range(sys.maxsize))
+    return lambda: cache.set(next(keys), True)
+
+
+@benchmark("blacklist.parse_domains")
+def _blacklist_parse():
+    from app.integration.blacklist import parse_domains
+
+    text = _blacklist_text()
+    return lambda: parse_domains(text)
+
+
+@benchmark("blacklist.compile_index")
+def _blacklist_compile():
+    from app.integration.domain_index import DomainIndex
+
+    text = _blacklist_text()
+    return lambda: DomainIndex.from_text(text)
+
+
+@benchmark("blacklist.match_miss")
+def _blacklist_match_miss():
+    from app.integration.domain_index import DomainIndex
+
+    index = DomainIndex.from_text(_blacklist_text())
+    return lambda: index.match("https://www.shop.example.com/basket?item=1")
+
+
+@benchmark("blacklist.match_hit")
+def _blacklist_match_hit():
+    from app.integration.domain_index import DomainIndex
+
+    index = DomainIndex.from_text(_blacklist_text() + "phish.pl\n")
+    return lambda: index.match("login.phish.pl")
+
+
+@benchmark("short_code.allocate")
+def _short_code_allocate():
+    from app.utils.short_codes import ShortCodeAllocator, ShortCodeCodec
+
+    allocator = ShortCodeAllocator(ShortCodeCodec(min_length=7, secret="benchmark"), block_size=1_000_000)
+    blocks = iter(range(sys.maxsize))
+    return lambda: allocator.allocate(lambda: next(blocks))
+
+
+@benchmark("short_code.decode")
+def _short_code_decode():
+    from app.utils.short_codes import ShortCodeCodec
+
+    codec = ShortCodeCodec(min_length=7, secret="benchmark")
+    code = codec.encode(123_456)
+    return lambda: codec.decode(code)
+
+
+@benchmark("url_digest")
+def _url_digest():
+    from app.utils.url_digest import url_digest
+
+    url = _urls(1)[0]
+    return lambda: url_digest(url)
+
+
+@benchmark("schema.create_request_validate")
+def _create_request_validate():
+    from app.schemas.schema import UrlsCreateRequest
+
+    payload = {"original_url": _urls(1)[0], "valid_until": "2030-01-01T00:00:00Z"}
+    return lambda: UrlsCreateRequest.model_validate(payload)
+
+
+@benchmark("schema.response_model_validate")
+def _response_model_validate():
+    from app.schemas.schema import UrlsResponse
+
+    url_obj = _url_row()
+    return lambda: UrlsResponse.model_validate(url_obj)
+
+
+@benchmark("schema.response_dump_json")
+def _response_dump_json():
+    from app.schemas.schema import UrlsResponse
+
+    response = UrlsResponse.model_validate(_url_row())
+    return response.model_dump_json
+
+
+def _url_row():
+    import uuid
+
+    from app.models.models import Urls
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return Urls(id=uuid.uuid4(), original_url=_urls(1)[0], shortened_url="0000001",
+                clicks=3, created=now, updated=now, valid_until=now + datetime.timedelta(days=5), redirect_status=302)
+
+
+def _seeded_repository(count: int = 10_000):
+    from app.models.models import DEFAULT_REDIRECT_STATUS
+    from benchmarks.in_memory import InMemoryUrlsRepository
+
+    repository = InMemoryUrlsRepository()
+    items = [(url, None, DEFAULT_REDIRECT_STATUS) for url in _urls(count)]
+    created = asyncio.get_event_loop().run_until_complete(repository.create_many(items))
+    return repository, [url_obj.shortened_url for url_obj, _ in created.values()]
+
+
+@benchmark("repository.get_by_short")
+def _repository_get_by_short():
+    repository, codes = _seeded_repository()
+    code = codes[len(codes) // 2]
+
+    async def operation():
+        return await repository.get_by_short(code)
+    return operation
+
+
+@benchmark("repository.create_url")
+def _repository_create_url():
+    repository, _ = _seeded_repository()
+    rng = random.Random(3)
+
+    async def operation():
+        return await repository.create_url(f"https://new-{rng.getrandbits(64):016x}.example.com/")
+    return operation
+
+
+@benchmark("service.resolve_url_cached")
+def _service_resolve_cached():
+    from benchmarks.in_memory import build_service
+
+    repository, codes = _seeded_repository()
+    service = build_service(repository)
+    code = codes[0]
+
+    async def operation():
+        # The first call fills the cache; every timed call after it is a hit
+        return await service.resolve_url(code)
+    return operation
+
+
+def _batch_runner(operation: Operation, loop: asyncio.AbstractEventLoop) -> Callable[[int], float]:
+    """Return a function timing `number` calls of `operation`, in seconds."""
+    if asyncio.iscoroutinefunction(operation):
+        async def batch(number: int) -> float:
+            started = time.perf_counter()
+            for _ in range(number):
+                await operation()
+            return time.perf_counter() - started
+
+        return lambda number: loop.run_until_complete(batch(number))
+
+    def run(number: int) -> float:
+        started = time.perf_counter()
+        for _ in range(number):
+            operation()
+        return time.perf_counter() - started
+
+    return run
+
+
+def measure(operation: Operation, loop: asyncio.AbstractEventLoop, min_time: float = 0.2, repeat: int = 5) -> dict:
+    run = _batch_runner(operation, loop)
+    number = 1
+    while (elapsed := run(number)) < min_time:
+        number = max(number * 2, int(number * min_time / elapsed * 1.2)) if elapsed else number * 10
+    per_op = sorted(run(number) / number * 1e9 for _ in range(repeat))
+    return {
+        "ns_per_op_min": round(per_op[0], 1),
+        "ns_per_op_median": round(statistics.median(per_op), 1),
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def select(filters: Optional[list[str]]) -> list[str]:
+    return [name for name in BENCHMARKS if not filters or any(f in name for f in filters)]
+
+
+def run_benchmarks(names: list[str], min_time: float, repeat: int) -> dict:
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    results = {}
+    try:
+        for name in names:
+            results[name] = measure(BENCHMARKS[name](), loop, min_time, repeat)
+            print(f"{name:<36} {results[name]['ns_per_op_median']:>14,.1f} ns/op", file=sys.stderr)
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+    return {
+        "benchmark": "micro",
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "config": {"min_time": min_time, "repeat": repeat},
+        "results": results,
+    }
+
+
+def history(path: Path, filters: Optional[list[str]]) -> list[str]:
+    """Format the median cost of each benchmark per stored run, oldest first."""
+    runs = [json.loads(line) for line in path.read_text().splitlines() if line.strip()] if path.exists() else []
+    names = sorted({name for entry in runs for name in entry["results"]
+                    if not filters or any(f in name for f in filters)})
+    lines = []
+    for name in names:
+        lines.append(name)
+        for entry in runs:
+            result = entry["results"].get(name)
+            if result is not None:
+                lines.append(f"  {entry['environment'].get('commit') or '-':<10} {entry['timestamp']}  "
+                             f"{result['ns_per_op_median']:>14,.1f} ns/op")
+    return lines
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.micro", description="Microbenchmarks for core components.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run benchmarks and store the results")
+    run_parser.add_argument("-k", dest="filters", action="append", help="Only names containing this; repeatable")
+    run_parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per timed batch")
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--results", type=Path, default=RESULTS_PATH, help="JSONL history to append to")
+    run_parser.add_argument("--no-store", action="store_true", help="Print the report instead of storing it")
+
+    history_parser = subparsers.add_parser("history", help="Show stored results per commit")
+    history_parser.add_argument("-k", dest="filters", action="append")
+    history_parser.add_argument("--results", type=Path, default=RESULTS_PATH)
+
+    args = parser.parse_args(argv)
+    if args.command == "history":
+        print("\n".join(history(args.results, args.filters)))
+        return 0
+
+    from app.core.logging_config import configure_logging
+
+    configure_logging("WARNING", "plain")
+    names = select(args.filters)
+    if not names:
+        parser.error("no benchmark matches the filters")
+    report = run_benchmarks(names, args.min_time, args.repeat)
+    if args.no_store:
+        print(json.dumps(report, indent=2))
+    else:
+        args.results.parent.mkdir(parents=True, exist_ok=True)
+        with args.results.open("a") as f:
+            f.write(json.dumps(report) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+-- Raw click events. Rows are written in batches by the click event writer and
+-- deleted by the rollup as they are folded into the counter tables below, so the
+-- table only holds the last few minutes of clicks.
+create table IF not exists public.click_events (
+    id bigint generated by default as identity not null,
+    shortened_url character varying(50) not null,
+    occurred timestamp without time zone not null,
+    referrer text null,
+    agent_class character varying(16) not null,
+    -- Clicks the event stands for; a sampled beacon at rate r counts 1/r
+    weight integer not null default 1,
+
+    constraint click_events_pkey primary key (id)
+) TABLESPACE pg_default;
+
+create table IF not exists public.click_rollups_hourly (
+    shortened_url character varying(50) not null,
+    hour timestamp without time zone not null,
+    clicks bigint not null default 0,
+
+    -- INCLUDE: the stats endpoint reads these tables with index-only scans of the primary key
+    constraint click_rollups_hourly_pkey primary key (shortened_url, hour) include (clicks)
+) TABLESPACE pg_default;
+
+-- Referrer host per link per day; '' counts clicks without a Referer header
+create table IF not exists public.click_referrers_daily (
+    shortened_url character varying(50) not null,
+    day timestamp without time zone not null,
+    referrer text not null,
+    clicks bigint not null default 0,
+
+    constraint click_referrers_daily_pkey primary key (shortened_url, day, referrer) include (clicks)
+) TABLESPACE pg_default;
+
+create table IF not exists public.click_totals (
+    shortened_url character varying(50) not null,
+    clicks bigint not null default 0,
+
+    constraint click_totals_pkey primary key (shortened_url)
+) TABLESPACE pg_default;
+
+-- Migrating a click_events table created before weighted events existed:
+--
+-- alter table public.click_events add column weight integer not null default 1;
+
+-- Migrating rollup tables created with separate covering indexes:
+--
+-- drop index public.idx_click_rollups_hourly_covering;
+-- alter table public.click_rollups_hourly drop constraint click_rollups_hourly_pkey,
+--     add constraint click_rollups_hourly_pkey primary key (shortened_url, hour) include (clicks);
+-- drop index public.idx_click_referrers_daily_covering;
+-- alter table public.click_referrers_daily drop constraint click_referrers_daily_pkey,
+--     add constraint click_referrers_daily_pkey primary key (shortened_url, day, referrer) include (clicks);
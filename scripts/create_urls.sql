@@ -1,15 +1,40 @@
 create table public.urls (
     id uuid not null default gen_random_uuid (),
     original_url text not null,
+    original_url_digest bytea not null,
     shortened_url text not null,
     clicks integer null default 0,
     created timestamp without time zone null default CURRENT_TIMESTAMP,
     updated timestamp without time zone null default CURRENT_TIMESTAMP,
     valid_until timestamp without time zone null default (CURRENT_TIMESTAMP + '24:00:00'::interval),
+    redirect_status smallint not null default 302,
 
     constraint urls_pkey primary key (id),
-    constraint urls_original_url_key unique (original_url),
+    constraint urls_original_url_digest_key unique (original_url_digest),
     constraint urls_shortened_url_key unique (shortened_url)
 ) TABLESPACE pg_default;
 
-create index IF not exists idx_shortened on public.urls using btree (shortened_url) TABLESPACE pg_default;
\ No newline at end of file
+-- Each value reserves a block of SHORT_CODE_BLOCK_SIZE short code ids
+create sequence IF not exists public.urls_short_code_block_seq start 1;
+
+create index IF not exists idx_shortened on public.urls using btree (shortened_url) TABLESPACE pg_default;
+
+create index IF not exists idx_urls_valid_until on public.urls using btree (valid_until) TABLESPACE pg_default
+    where valid_until is not null;
+
+-- Migrating a table created before original_url_digest existed. The digest is
+-- of the normalized URL (app/utils/url_digest.py), so it is backfilled by the
+-- CLI rather than in SQL; it reports URLs that are now stored more than once and
+-- exits non-zero until they are merged. A table already backfilled in SQL from
+-- the raw text is fixed the same way with `backfill-digests --all`, after
+-- dropping urls_original_url_digest_key.
+--
+-- alter table public.urls add column original_url_digest bytea;
+-- python -m app.cli backfill-digests
+-- alter table public.urls alter column original_url_digest set not null;
+-- alter table public.urls add constraint urls_original_url_digest_key unique (original_url_digest);
+-- alter table public.urls drop constraint urls_original_url_key;
+
+-- Migrating a table created before per-link redirect statuses existed:
+--
+-- alter table public.urls add column redirect_status smallint not null default 302;
@@ -0,0 +1,142 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.core.cache import TTLCache, TwoTierCache
+from app.service.async_url_service import AsyncUrlsService
+from app.service.url_service import CachedUrl
+
+
+def _local_cache():
+    return TwoTierCache(TTLCache(), None, prefix="", default_ttl=300, encode=None, decode=None)
+
+
+def _known_codes():
+    known_codes = MagicMock()
+    known_codes.might_exist = AsyncMock(return_value=True)
+    return known_codes
+
+
+@pytest.mark.asyncio
+async def test_shorten_url_awaits_repository():
+    mock_repo = MagicMock()
+    created = MagicMock(shortened_url="abc1234")
+    mock_repo.create_url = AsyncMock(return_value=created)
+    service = AsyncUrlsService(mock_repo, cache=_local_cache(), clicks=MagicMock(), known_codes=_known_codes())
+
+    assert await service.shorten_url("https://example.com") == created
+    mock_repo.create_url.assert_awaited_once_with("https://example.com", None, 302)
+    service.known_codes.add.assert_called_once_with("abc1234")
+
+
+@pytest.mark.asyncio
+async def test_find_returns_the_link_without_counting_a_click():
+    mock_repo = MagicMock()
+    mock_repo.get_by_short = AsyncMock(return_value=MagicMock(original_url="https://example.com", valid_until=None))
+    service = AsyncUrlsService(mock_repo, cache=_local_cache(), clicks=MagicMock(), known_codes=_known_codes(),
+                               events=MagicMock())
+
+    assert (await service.find("abc123")).original_url == "https://example.com"
+    service.clicks.record.assert_not_called()
+    service.events.record.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_resolve_url_miss_then_hit():
+    mock_repo = MagicMock()
+    fake_url = MagicMock(original_url="https://example.com", valid_until=None)
+    mock_repo.get_by_short = AsyncMock(return_value=fake_url)
+    service = AsyncUrlsService(mock_repo, cache=_local_cache(), clicks=MagicMock(), known_codes=_known_codes())
+
+    first = await service.resolve_url("abc123")
+    second = await service.resolve_url("abc123")
+
+    assert first.original_url == second.original_url == "https://example.com"
+    mock_repo.get_by_short.assert_awaited_once_with("abc123")
+    assert service.clicks.record.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_resolve_url_expired_cache_entry_returns_none():
+    cache = _local_cache()
+    cache.local.set("abc123", CachedUrl("https://example.com", 1.0))
+    mock_repo = MagicMock()
+    service = AsyncUrlsService(mock_repo, cache=cache, clicks=MagicMock(), known_codes=_known_codes())
+
+    assert await service.resolve_url("abc123") is None
+    service.clicks.record.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_resolve_url_not_found():
+    mock_repo = MagicMock()
+    mock_repo.get_by_short = AsyncMock(return_value=None)
+    service = AsyncUrlsService(mock_repo, cache=_local_cache(), clicks=MagicMock(), known_codes=_known_codes())
+
+    assert await service.resolve_url("missing") is None
+    service.clicks.record.assert_not_called()
+    service.known_codes.record_miss.assert_called_once_with("missing")
+
+
+@pytest.mark.asyncio
+async def test_resolve_url_skips_codes_that_cannot_exist():
+    mock_repo = MagicMock()
+    mock_repo.get_by_short = AsyncMock()
+    known_codes = _known_codes()
+    known_codes.might_exist.return_value = False
+    service = AsyncUrlsService(mock_repo, cache=_local_cache(), clicks=MagicMock(), known_codes=known_codes)
+
+    assert await service.resolve_url("wp-login.php") is None
+    known_codes.might_exist.assert_awaited_once_with("wp-login.php")
+    mock_repo.get_by_short.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_resolve_url_cache_hit_skips_the_filter():
+    cache = _local_cache()
+    cache.local.set("abc123", CachedUrl("https://example.com", None))
+    known_codes = _known_codes()
+    service = AsyncUrlsService(MagicMock(), cache=cache, clicks=MagicMock(), known_codes=known_codes)
+
+    assert (await service.resolve_url("abc123")).original_url == "https://example.com"
+    known_codes.might_exist.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_resolve_url_database_hit_adds_code_to_filter():
+    mock_repo = MagicMock()
+    mock_repo.get_by_short = AsyncMock(return_value=MagicMock(original_url="https://example.com", valid_until=None,
+                                                              redirect_status=302))
+    known_codes = _known_codes()
+    service = AsyncUrlsService(mock_repo, cache=_local_cache(), clicks=MagicMock(), known_codes=known_codes)
+
+    await service.resolve_url("abc123")
+
+    known_codes.add.assert_called_once_with("abc123")
+
+
+@pytest.mark.asyncio
+async def test_resolve_url_records_click_event_with_request_headers():
+    mock_repo = MagicMock()
+    mock_repo.get_by_short = AsyncMock(return_value=MagicMock(original_url="https://example.com", valid_until=None))
+    service = AsyncUrlsService(mock_repo, cache=_local_cache(), clicks=MagicMock(), known_codes=_known_codes(),
+                               events=MagicMock())
+
+    await service.resolve_url("abc123", "https://ref.example.org/", "Mozilla/5.0")
+    mock_repo.get_by_short.return_value = None
+    await service.resolve_url("gone123")
+
+    service.events.record.assert_called_once_with("abc123", "https://ref.example.org/", "Mozilla/5.0")
+
+
+@pytest.mark.asyncio
+async def test_beacon_counts_sampled_clicks_for_live_codes():
+    mock_repo = MagicMock()
+    mock_repo.get_by_short = AsyncMock(return_value=MagicMock(original_url="https://example.com", valid_until=None))
+    service = AsyncUrlsService(mock_repo, cache=_local_cache(), clicks=MagicMock(), known_codes=_known_codes(),
+                               events=MagicMock())
+
+    assert await service.record_beacon("abc123", 10, None, "Mozilla/5.0") is True
+    mock_repo.get_by_short.return_value = None
+    assert await service.record_beacon("gone123", 10) is False
+
+    service.clicks.record.assert_called_once_with("abc123", 10)
+    service.events.record.assert_called_once_with("abc123", None, "Mozilla/5.0", 10)
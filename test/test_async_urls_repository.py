@@ -0,0 +1,162 @@
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.dialects import postgresql
+
+from app.models.models import Urls
+from app.repositories.async_url_repository import MOST_CLICKED, REDIRECT_LOOKUP, AsyncUrlsRepository, RedirectLookup
+from app.utils.short_codes import ShortCodeAllocator, ShortCodeCodec
+from app.utils.url_digest import url_digest
+
+
+@pytest.fixture
+def mock_db():
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=MagicMock())
+    db.commit = AsyncMock()
+    db.refresh = AsyncMock()
+    db.rollback = AsyncMock()
+    return db
+
+
+@pytest.fixture
+def repo(mock_db):
+    return AsyncUrlsRepository(mock_db)
+
+
+@pytest.mark.asyncio
+async def test_get_by_short(repo, mock_db):
+    fake_url = Urls(shortened_url="abc123", valid_until=None)
+    mock_db.execute.return_value.scalars.return_value.first.return_value = fake_url
+
+    result = await repo.get_by_short("abc123")
+
+    assert result == fake_url
+    mock_db.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_create_url_upserts_in_one_statement(repo, mock_db):
+    repo._next_short_code = AsyncMock(return_value="XYZ9999")
+    created = Urls(original_url="https://example.com", shortened_url="XYZ9999")
+    mock_db.scalars = AsyncMock(return_value=MagicMock(one=MagicMock(return_value=created)))
+
+    result = await repo.create_url("https://example.com")
+
+    assert result == created
+    mock_db.scalars.assert_awaited_once()
+    mock_db.commit.assert_awaited_once()
+    mock_db.add.assert_not_called()
+    sql = str(mock_db.scalars.call_args[0][0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (original_url_digest) DO UPDATE" in sql
+
+
+@pytest.mark.asyncio
+async def test_create_url_existing_returns_live_row(repo, mock_db):
+    repo._next_short_code = AsyncMock(return_value="XYZ9999")
+    existing = Urls(original_url="https://example.com", shortened_url="OLD1234")
+    mock_db.scalars = AsyncMock(return_value=MagicMock(one=MagicMock(return_value=existing)))
+
+    assert await repo.create_url("https://example.com") == existing
+    mock_db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_purge_expired_deletes_one_skip_locked_batch(repo, mock_db):
+    mock_db.execute.return_value.rowcount = 7
+
+    assert await repo.purge_expired(datetime(2030, 1, 1), 500) == 7
+
+    sql = str(mock_db.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+    assert sql.startswith("DELETE FROM urls WHERE urls.id IN (SELECT urls.id")
+    assert "ORDER BY urls.valid_until" in sql and "FOR UPDATE SKIP LOCKED" in sql
+    mock_db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_bulk_increment_clicks(repo, mock_db):
+    mock_db.execute.return_value.rowcount = 1
+
+    assert await repo.bulk_increment_clicks({"abc": 4}) == 1
+    mock_db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_next_short_code_reserves_block_once(mock_db):
+    allocator = ShortCodeAllocator(ShortCodeCodec(min_length=7), block_size=10)
+    repo = AsyncUrlsRepository(mock_db, allocator=allocator)
+    mock_db.execute.return_value.scalar_one.return_value = 4
+
+    codes = [await repo._next_short_code() for _ in range(5)]
+
+    assert len(set(codes)) == 5
+    mock_db.execute.assert_awaited_once()
+    assert allocator.highest_block == 4
+
+
+@pytest.mark.asyncio
+async def test_create_many_upserts_all_rows_in_one_statement(repo, mock_db):
+    existing = Urls(original_url="https://a.com", original_url_digest=url_digest("https://a.com"),
+                    shortened_url="AAAAAAA")
+    inserted = Urls(original_url="https://b.com", original_url_digest=url_digest("https://b.com"),
+                    shortened_url="BBBBBBB")
+    repo._next_short_code = AsyncMock(side_effect=["NEW0001", "BBBBBBB"])
+    mock_db.scalars = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=[existing, inserted])))
+
+    result = await repo.create_many([
+        ("https://a.com", None, 302), ("https://b.com", None, 308), ("https://b.com", None, 302),
+        ("HTTPS://B.com/", None, 302)
+    ])
+
+    assert result == {
+        "https://a.com": (existing, False),
+        "https://b.com": (inserted, True),
+        "HTTPS://B.com/": (inserted, True),
+    }
+    mock_db.scalars.assert_awaited_once()
+    mock_db.execute.assert_not_awaited()
+    sql = str(mock_db.scalars.call_args[0][0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (original_url_digest) DO UPDATE SET" in sql
+    assert "redirect_status = CASE" in sql
+    assert repo._next_short_code.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_create_many_empty(repo, mock_db):
+    mock_db.scalars = AsyncMock()
+
+    assert await repo.create_many([]) == {}
+    mock_db.scalars.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_redirect_lookup_runs_one_core_select():
+    conn = MagicMock()
+    conn.execute = AsyncMock(return_value=MagicMock(first=MagicMock(return_value=("https://a.com", None))))
+    engine = MagicMock()
+    engine.execution_options.return_value.connect.return_value.__aenter__ = AsyncMock(return_value=conn)
+    engine.execution_options.return_value.connect.return_value.__aexit__ = AsyncMock(return_value=False)
+
+    assert await RedirectLookup(engine).get_by_short("abc1234") == ("https://a.com", None)
+
+    engine.execution_options.assert_called_once_with(isolation_level="AUTOCOMMIT")
+    statement, params = conn.execute.call_args[0]
+    assert statement is REDIRECT_LOOKUP
+    assert params["code"] == "abc1234" and params["now"].tzinfo is None
+    sql = str(REDIRECT_LOOKUP.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("SELECT urls.original_url, urls.valid_until")
+
+
+
+@pytest.mark.asyncio
+async def test_most_clicked_returns_live_rows_by_clicks(repo, mock_db):
+    mock_db.execute.return_value = iter([("abc1234", "https://a.com", None, 302)])
+
+    assert await repo.most_clicked(50) == [("abc1234", "https://a.com", None, 302)]
+
+    statement, params = mock_db.execute.call_args[0]
+    assert statement is MOST_CLICKED
+    assert params["limit"] == 50 and params["now"].tzinfo is None
+    sql = str(MOST_CLICKED.compile(dialect=postgresql.dialect()))
+    assert "ORDER BY urls.clicks DESC" in sql
@@ -1,7 +1,9 @@
+import os
 import pytest
 import aiohttp
 from unittest.mock import patch, AsyncMock, MagicMock
-from app.integration.blacklist import fetch_blacklist, BlacklistUnavailableError
+from app.integration.blacklist import fetch_blacklist, BlacklistUnavailableError, BlacklistService
+from app.integration.domain_index import DomainIndex
 
 # Sample domain text
 MOCK_CERT_RESPONSE = "bad.com\nphishing.net\n# comment\n\n"
@@ -90,4 +92,170 @@ async def test_failure_no_fetch_no_backup(monkeypatch, tmp_path):
     monkeypatch.setattr("app.integration.blacklist.LOCAL_BACKUP", tmp_path / "missing.txt")
 
     with pytest.raises(BlacklistUnavailableError):
-        await fetch_blacklist()
\ No newline at end of file
+        await fetch_blacklist()
+
+
+def _mock_client_session(status, text="", headers=None):
+    mock_response = MagicMock()
+    mock_response.status = status
+    mock_response.headers = headers or {}
+    mock_response.text = AsyncMock(return_value=text)
+    mock_response.__aenter__ = AsyncMock(return_value=mock_response)
+    mock_response.__aexit__ = AsyncMock(return_value=None)
+
+    mock_session = MagicMock()
+    mock_session.get.return_value = mock_response
+    mock_session.__aenter__ = AsyncMock(return_value=mock_session)
+    mock_session.__aexit__ = AsyncMock(return_value=None)
+    return MagicMock(return_value=mock_session), mock_session
+
+
+def test_service_contains_raises_before_load(tmp_path):
+    service = BlacklistService(backup_path=tmp_path / "missing.txt")
+    with pytest.raises(BlacklistUnavailableError):
+        service.contains("bad.com")
+
+
+@pytest.mark.asyncio
+async def test_service_loads_backup_once(monkeypatch, fake_local_backup):
+    client_session, _ = _mock_client_session(304)
+    monkeypatch.setattr("aiohttp.ClientSession", client_session)
+
+    service = BlacklistService(backup_path=fake_local_backup)
+    await service.ensure_loaded()
+    await service.ensure_loaded()
+
+    assert service.contains("local.com")
+    assert not service.contains("example.com")
+    assert service.stats()["size"] == 2
+    assert service.stats()["source"] == str(fake_local_backup.with_suffix(".idx"))
+    assert fake_local_backup.with_suffix(".idx").exists()
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_service_remaps_newer_index_from_another_worker(monkeypatch, fake_local_backup):
+    client_session, _ = _mock_client_session(304)
+    monkeypatch.setattr("aiohttp.ClientSession", client_session)
+    service = BlacklistService(backup_path=fake_local_backup)
+    await service.ensure_loaded()
+    await service.stop()
+
+    other = DomainIndex.from_text("fresh.org\n")
+    other.write(service.index_path)
+    os.utime(service.index_path, (service.snapshot.loaded_at + 10, service.snapshot.loaded_at + 10))
+
+    await service.refresh()
+    assert service.contains("fresh.org")
+    assert not service.contains("local.com")
+
+
+@pytest.mark.asyncio
+async def test_service_refresh_swaps_snapshot_and_writes_backup(monkeypatch, tmp_path):
+    client_session, _ = _mock_client_session(200, "bad.com\nphishing.net\n", {"ETag": '"v1"'})
+    monkeypatch.setattr("aiohttp.ClientSession", client_session)
+    backup_path = tmp_path / "blacklist.txt"
+
+    service = BlacklistService(backup_path=backup_path)
+    assert await service.refresh() is True
+
+    assert service.contains("phishing.net")
+    assert backup_path.read_text() == "bad.com\nphishing.net\n"
+
+
+@pytest.mark.asyncio
+async def test_service_refresh_sends_conditional_headers(monkeypatch, tmp_path):
+    client_session, mock_session = _mock_client_session(200, "bad.com\n", {"ETag": '"v1"'})
+    monkeypatch.setattr("aiohttp.ClientSession", client_session)
+    service = BlacklistService(backup_path=tmp_path / "blacklist.txt")
+    await service.refresh()
+    snapshot = service.snapshot
+
+    client_session, mock_session = _mock_client_session(304)
+    monkeypatch.setattr("aiohttp.ClientSession", client_session)
+    assert await service.refresh() is True
+
+    _, kwargs = mock_session.get.call_args
+    assert kwargs["headers"]["If-None-Match"] == '"v1"'
+    assert service.snapshot is snapshot
+
+
+@pytest.mark.asyncio
+async def test_bundled_index_is_fetched_unconditionally(monkeypatch, fake_local_backup):
+    client_session, mock_session = _mock_client_session(304)
+    monkeypatch.setattr("aiohttp.ClientSession", client_session)
+    service = BlacklistService(backup_path=fake_local_backup)
+    await service.ensure_loaded()
+    await service.stop()
+
+    await service.refresh()
+
+    _, kwargs = mock_session.get.call_args
+    # Not the local file's mtime: an upstream change from before the build would be answered with 304
+    assert kwargs["headers"] == {}
+    assert service.stats()["age_seconds"] is None
+
+
+@pytest.mark.asyncio
+async def test_validators_survive_a_restart(monkeypatch, tmp_path):
+    headers = {"ETag": '"v1"', "Last-Modified": "Wed, 01 Oct 2025 10:00:00 GMT"}
+    client_session, _ = _mock_client_session(200, "bad.com\n", headers)
+    monkeypatch.setattr("aiohttp.ClientSession", client_session)
+    backup_path = tmp_path / "blacklist.txt"
+    await BlacklistService(backup_path=backup_path).refresh()
+    assert (tmp_path / "blacklist.idx.json").exists()
+
+    client_session, mock_session = _mock_client_session(304)
+    monkeypatch.setattr("aiohttp.ClientSession", client_session)
+    restarted = BlacklistService(backup_path=backup_path)
+    await restarted.ensure_loaded()
+    await restarted.stop()
+    await restarted.refresh()
+
+    _, kwargs = mock_session.get.call_args
+    assert kwargs["headers"] == {"If-None-Match": '"v1"', "If-Modified-Since": "Wed, 01 Oct 2025 10:00:00 GMT"}
+    assert restarted.contains("bad.com")
+    assert restarted.stats()["age_seconds"] < 5
+
+
+@pytest.mark.asyncio
+async def test_index_compiled_from_backup_drops_stale_validators(monkeypatch, fake_local_backup):
+    index_path = fake_local_backup.with_suffix(".idx")
+    (fake_local_backup.parent / "blacklist.idx.json").write_text('{"etag": "old"}')
+    client_session, mock_session = _mock_client_session(304)
+    monkeypatch.setattr("aiohttp.ClientSession", client_session)
+
+    service = BlacklistService(backup_path=fake_local_backup)
+    await service.ensure_loaded()
+    await service.stop()
+    await service.refresh()
+
+    assert index_path.exists()
+    assert not service.validators_path.exists()
+    _, kwargs = mock_session.get.call_args
+    assert kwargs["headers"] == {}
+
+
+@pytest.mark.asyncio
+async def test_service_unavailable_without_backup(monkeypatch, tmp_path):
+    client_session, _ = _mock_client_session(500)
+    monkeypatch.setattr("aiohttp.ClientSession", client_session)
+
+    service = BlacklistService(backup_path=tmp_path / "missing.txt")
+    with pytest.raises(BlacklistUnavailableError):
+        await service.ensure_loaded()
+
+
+def test_write_backup_uses_a_per_process_temp_file(tmp_path, monkeypatch):
+    backup_path = tmp_path / "blacklist.txt"
+    service = BlacklistService(backup_path=backup_path, index_path=tmp_path / "blacklist.idx")
+    replaced = []
+    real_replace = os.replace
+    monkeypatch.setattr("app.integration.blacklist.os.replace",
+                        lambda src, dst: (replaced.append(src), real_replace(src, dst)))
+
+    service._write_backup("bad.com\n")
+
+    assert backup_path.read_text() == "bad.com\n"
+    assert replaced[0].name == f".blacklist.txt.{os.getpid()}.tmp"
+    assert not replaced[0].exists()
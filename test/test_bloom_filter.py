@@ -0,0 +1,26 @@
+from app.utils.bloom_filter import BloomFilter
+
+
+def test_added_items_are_always_found():
+    bloom = BloomFilter(capacity=1000)
+    items = [f"code{i}" for i in range(1000)]
+    for item in items:
+        bloom.add(item)
+
+    assert all(item in bloom for item in items)
+    assert len(bloom) == 1000
+
+
+def test_false_positive_rate_stays_near_target():
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    for i in range(5000):
+        bloom.add(f"present{i}")
+
+    false_positives = sum(f"absent{i}" in bloom for i in range(20000))
+
+    assert false_positives / 20000 < 0.02
+    assert bloom.nbytes < 7000
+
+
+def test_empty_filter_contains_nothing():
+    assert "abc" not in BloomFilter(capacity=10)
@@ -1,6 +1,10 @@
+import time
 import pytest
 import asyncio
-from app.core.cache import timed_cache
+import fakeredis
+from unittest.mock import AsyncMock, MagicMock
+from redis import ConnectionError as RedisConnectionError
+from app.core.cache import timed_cache, TTLCache, TwoTierCache
 
 
 def test_sync_cache_within_expiry(monkeypatch):
@@ -65,3 +69,163 @@ async def test_async_cache_expiry():
     await delayed_response()
 
     assert call_count["count"] == 2
+
+
+def test_cache_key_ignores_unhashable_arguments():
+    call_count = {"count": 0}
+
+    @timed_cache(seconds=60)
+    def total(values):
+        call_count["count"] += 1
+        return sum(values)
+
+    assert total([1, 2]) == 3
+    assert total([1, 2]) == 3
+    assert call_count["count"] == 2
+
+
+def test_cache_explicit_key_function():
+    call_count = {"count": 0}
+
+    @timed_cache(seconds=60, key=lambda code, service: code)
+    def resolve(code, service):
+        call_count["count"] += 1
+        return code.upper()
+
+    assert resolve("abc", object()) == "ABC"
+    assert resolve("abc", object()) == "ABC"
+    assert call_count["count"] == 1
+
+
+def test_ttl_cache_lru_eviction_by_entries():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_eviction_by_bytes():
+    cache = TTLCache(max_bytes=100, sizeof=lambda key, value: 40)
+    for key in "abc":
+        cache.set(key, key)
+
+    assert len(cache) == 2
+    assert cache.stats()["bytes"] == 80
+
+
+def test_ttl_cache_expires_at_caps_ttl():
+    cache = TTLCache(default_ttl=300)
+    cache.set("gone", 1, expires_at=time.time() - 1)
+    cache.set("soon", 2, expires_at=time.time() + 0.05)
+
+    assert "gone" not in cache
+    assert cache.get("soon") == 2
+    time.sleep(0.1)
+    assert cache.get("soon") is None
+
+
+def test_ttl_cache_counters():
+    cache = TTLCache()
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("missing")
+    cache.delete("a")
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 0
+
+
+def _two_tier(client, local_ttl=30):
+    return TwoTierCache(
+        TTLCache(default_ttl=local_ttl),
+        client,
+        prefix="test:",
+        default_ttl=300,
+        encode=lambda value: value.encode(),
+        decode=lambda raw: raw.decode(),
+    )
+
+
+@pytest.mark.asyncio
+async def test_two_tier_cache_shares_entries_through_redis():
+    client = fakeredis.FakeAsyncRedis()
+    writer = _two_tier(client)
+    reader = _two_tier(client)
+
+    await writer.set("abc", "https://example.com")
+
+    assert await reader.get("abc") == "https://example.com"
+    assert reader.stats()["l2_hits"] == 1
+    # Second read is served from the reader's local tier
+    assert await reader.get("abc") == "https://example.com"
+    assert reader.stats()["l2_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_two_tier_cache_l2_ttl_capped_by_expiry():
+    client = fakeredis.FakeAsyncRedis()
+    cache = _two_tier(client)
+
+    await cache.set("abc", "https://example.com", expires_at=time.time() + 10)
+
+    assert 0 < await client.pttl("test:abc") <= 10_000
+
+
+@pytest.mark.asyncio
+async def test_two_tier_cache_get_many_pipelines_misses():
+    client = fakeredis.FakeAsyncRedis()
+    writer = _two_tier(client)
+    await writer.set("a", "1")
+    await writer.set("b", "2")
+
+    reader = _two_tier(client)
+    reader.local.set("c", "3")
+
+    assert await reader.get_many(["a", "b", "c", "d"]) == {"a": "1", "b": "2", "c": "3"}
+    assert reader.stats()["l2_misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_two_tier_cache_delete_invalidates_both_tiers():
+    client = fakeredis.FakeAsyncRedis()
+    cache = _two_tier(client)
+    await cache.set("abc", "https://example.com")
+
+    await cache.delete("abc")
+
+    assert await cache.get("abc") is None
+    assert await client.get("test:abc") is None
+
+
+@pytest.mark.asyncio
+async def test_two_tier_cache_falls_back_when_redis_is_down():
+    client = MagicMock()
+    client.pipeline.side_effect = RedisConnectionError("down")
+    client.set = AsyncMock(side_effect=RedisConnectionError("down"))
+    cache = _two_tier(client)
+
+    assert await cache.get("abc") is None
+    assert not cache.available
+
+    await cache.set("abc", "https://example.com")
+    assert await cache.get("abc") == "https://example.com"
+    client.set.assert_not_called()
+    assert cache.stats()["l2_errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_two_tier_cache_without_client_is_local_only():
+    cache = _two_tier(None)
+
+    await cache.set("abc", "https://example.com")
+
+    assert await cache.get("abc") == "https://example.com"
+    assert not cache.available
@@ -0,0 +1,145 @@
+import asyncio
+import datetime
+import time
+from collections import namedtuple
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.cache import TTLCache, TwoTierCache
+from app.integration.blacklist import BlacklistUnavailableError
+from app.service.cache_warmer import CacheWarmer
+from app.core.config import get_settings
+from app.service.url_service import decode_cached_url, encode_cached_url, get_redirect_cache
+
+Row = namedtuple("Row", "shortened_url original_url valid_until redirect_status")
+
+
+def _cache():
+    return TwoTierCache(TTLCache(default_ttl=60), None, prefix="url:", default_ttl=60,
+                        encode=encode_cached_url, decode=decode_cached_url)
+
+
+def _warmer(rows=(), top_n=100, timeout=5, blacklist=None, retry_seconds=30):
+    load_func = AsyncMock(return_value=list(rows))
+    blacklist = blacklist or MagicMock(ensure_loaded=AsyncMock())
+    return CacheWarmer(load_func, _cache(), blacklist, top_n=top_n, timeout=timeout, retry_seconds=retry_seconds)
+
+
+@pytest.mark.asyncio
+async def test_warm_loads_top_links_into_local_cache_and_blacklist():
+    rows = [Row("abc1234", "https://a.com", None, 302), Row("def5678", "https://b.com", None, 301)]
+    warmer = _warmer(rows)
+
+    assert not warmer.ready
+    assert await warmer.warm()
+
+    assert warmer.state == "ready"
+    assert warmer.warmed == 2
+    warmer.load_func.assert_awaited_once_with(100)
+    warmer.blacklist.ensure_loaded.assert_awaited_once()
+    cached = warmer.cache.local.get("def5678")
+    assert cached.original_url == "https://b.com"
+    assert cached.redirect_status == 301
+
+
+@pytest.mark.asyncio
+async def test_warm_skips_links_expired_since_the_query():
+    expired = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) - datetime.timedelta(seconds=10)
+    warmer = _warmer([Row("abc1234", "https://a.com", expired, 302)])
+
+    await warmer.warm()
+
+    assert warmer.warmed == 0
+    assert "abc1234" not in warmer.cache.local
+
+
+@pytest.mark.asyncio
+async def test_warmed_links_outlive_the_short_l1_ttl_of_a_redis_backed_cache(monkeypatch):
+    monkeypatch.setattr("app.service.url_service.get_redis", lambda: MagicMock())
+    settings = get_settings()
+    cache = get_redirect_cache.__wrapped__()
+    assert cache.local.default_ttl == settings.REDIRECT_CACHE_L1_TTL_SECONDS
+    valid_until = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=120)
+    rows = [Row("abc1234", "https://a.com", None, 302), Row("def5678", "https://b.com", valid_until, 302)]
+    warmer = CacheWarmer(AsyncMock(return_value=rows), cache, MagicMock(ensure_loaded=AsyncMock()))
+
+    assert await warmer.warm()
+
+    # Cached for the full TTL, capped by valid_until, not for the 30s L1 TTL
+    expires = {code: entry.expires_at for code, entry in cache.local._entries.items()}
+    assert expires["abc1234"] == pytest.approx(time.time() + settings.REDIRECT_CACHE_TTL_SECONDS, abs=5)
+    assert expires["def5678"] == pytest.approx(valid_until.timestamp(), abs=1)
+    cache.client.set.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_database_failure_is_reported_not_ready():
+    warmer = _warmer()
+    warmer.load_func.side_effect = ConnectionRefusedError("db down")
+
+    assert not await warmer.warm()
+
+    assert warmer.state == "failed"
+    assert warmer.error == "db down"
+    assert warmer.stats()["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_unavailable_blacklist_fails_the_warm_up():
+    blacklist = MagicMock(ensure_loaded=AsyncMock(side_effect=BlacklistUnavailableError("down")))
+    warmer = _warmer(blacklist=blacklist)
+
+    assert not await warmer.warm()
+    warmer.load_func.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_slow_warming_times_out_as_failed():
+    warmer = _warmer(timeout=0.01)
+
+    async def slow(limit):
+        await asyncio.sleep(1)
+        return []
+
+    warmer.load_func = slow
+    await warmer.warm()
+
+    assert warmer.state == "failed"
+    assert warmer.error.startswith("timed out")
+
+
+@pytest.mark.asyncio
+async def test_zero_top_n_only_loads_blacklist():
+    warmer = _warmer(top_n=0)
+
+    await warmer.warm()
+
+    assert warmer.ready
+    warmer.load_func.assert_not_awaited()
+    warmer.blacklist.ensure_loaded.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_start_finishes_warming_before_returning():
+    warmer = _warmer([Row("abc1234", "https://a.com", None, 302)])
+
+    await warmer.start()
+
+    assert warmer.ready
+    assert warmer.stats()["warmed"] == 1
+    assert not warmer._retry.running
+
+
+@pytest.mark.asyncio
+async def test_failed_start_retries_until_warm():
+    warmer = _warmer([Row("abc1234", "https://a.com", None, 302)], retry_seconds=0.01)
+    warmer.load_func.side_effect = [ConnectionRefusedError("db down"), [Row("abc1234", "https://a.com", None, 302)]]
+
+    await warmer.start()
+    assert warmer.state == "failed"
+    await asyncio.sleep(0.05)
+    await warmer.stop()
+
+    assert warmer.ready
+    assert warmer.load_func.await_count == 2
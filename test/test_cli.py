@@ -0,0 +1,178 @@
+import csv
+import hashlib
+import io
+import json
+import uuid
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from app.cli import ImportStats, backfill_digests, export_urls, import_urls, prepare_chunk, read_rows
+from app.integration.domain_index import DomainIndex
+from app.utils.short_codes import ShortCodeAllocator, ShortCodeCodec
+from app.utils.url_digest import url_digest
+
+
+def _allocator():
+    return ShortCodeAllocator(ShortCodeCodec(min_length=7), block_size=100)
+
+
+def test_read_rows_csv_and_jsonl():
+    csv_rows = list(read_rows(io.StringIO("original_url,valid_until\nhttps://a.com,\n"), "csv"))
+    jsonl_rows = list(read_rows(io.StringIO('{"original_url": "https://b.com"}\n\n'), "jsonl"))
+
+    assert csv_rows == [{"original_url": "https://a.com", "valid_until": ""}]
+    assert jsonl_rows == [{"original_url": "https://b.com"}]
+
+
+def test_prepare_chunk_filters_and_assigns_codes():
+    stats = ImportStats()
+    rows = [
+        {"original_url": "https://good.com", "valid_until": "2030-01-01T00:00:00+00:00"},
+        {"original_url": "https://sub.bad.com/x"},
+        {"original_url": "ftp://nope.com"},
+        {"original_url": "https://late.com", "valid_until": "not a date"},
+        {"original_url": "https://other.com"},
+    ]
+
+    buffer = prepare_chunk(rows, DomainIndex.from_text("bad.com\n"), _allocator(), lambda: 0, stats)
+    lines = buffer.getvalue().splitlines()
+
+    assert len(lines) == 2
+    assert "https://good.com" in lines[0] and "2030-01-01T00:00:00" in lines[0]
+    assert "\\x" + url_digest("https://good.com").hex() in lines[0]
+    assert lines[1].endswith(",,302")  # no valid_until, default redirect status
+    assert (stats.read, stats.invalid, stats.blacklisted) == (5, 2, 1)
+
+
+def test_import_urls_copies_each_chunk(monkeypatch):
+    monkeypatch.setattr("app.cli.load_blacklist", lambda: None)
+    monkeypatch.setattr("app.cli.get_short_code_allocator", _allocator)
+    db = MagicMock()
+    cursor = db.get_cursor.return_value
+    cursor.fetchone.return_value = (0,)
+    cursor.rowcount = 2
+    source = io.StringIO("original_url\nhttps://a.com\nhttps://b.com\nhttps://c.com\n")
+
+    stats = import_urls(source, "csv", chunk_size=2, db=db)
+
+    assert cursor.copy_expert.call_count == 2
+    assert db.connection.commit.call_count == 2
+    assert stats.read == 3
+    assert stats.inserted == 4
+
+
+def test_export_urls_streams_jsonl():
+    db = MagicMock()
+    cursor = db.connection.cursor.return_value
+    cursor.__iter__.return_value = iter([("abc1234", "https://a.com", 3, datetime(2030, 1, 1), None, None, 308)])
+    target = io.StringIO()
+
+    assert export_urls(target, "jsonl", chunk_size=10, db=db) == 1
+
+    db.connection.cursor.assert_called_once_with(name="urls_export")
+    row = json.loads(target.getvalue())
+    assert row["shortened_url"] == "abc1234"
+    assert row["created"] == "2030-01-01 00:00:00"
+    assert row["redirect_status"] == 308
+
+
+def test_export_then_import_keeps_codes_clicks_and_timestamps(monkeypatch):
+    codec = ShortCodeCodec(min_length=7, secret="secret")
+    exported_rows = [
+        (codec.encode(5), "https://a.com", 3, datetime(2024, 1, 1), datetime(2024, 2, 1), None, 301),
+        (codec.encode(250), "https://b.com", 0, datetime(2024, 3, 1), datetime(2024, 3, 1), datetime(2030, 1, 1),
+         302),
+    ]
+    export_db = MagicMock()
+    export_db.connection.cursor.return_value.__iter__.return_value = iter(exported_rows)
+    dump = io.StringIO()
+    export_urls(dump, "csv", chunk_size=10, db=export_db)
+
+    monkeypatch.setattr("app.cli.load_blacklist", lambda: None)
+    monkeypatch.setattr("app.cli.get_short_code_allocator",
+                        lambda: ShortCodeAllocator(codec, block_size=100))
+    import_db = MagicMock()
+    cursor = import_db.get_cursor.return_value
+    copied = []
+    cursor.copy_expert.side_effect = lambda sql, buffer: copied.append(buffer.getvalue())
+    cursor.rowcount = 2
+    dump.seek(0)
+
+    stats = import_urls(dump, "csv", chunk_size=10, db=import_db)
+
+    staged = list(csv.reader(io.StringIO(copied[0])))
+    assert [row[3] for row in staged] == [codec.encode(5), codec.encode(250)]
+    assert [row[4:8] for row in staged] == [
+        ["True", "3", "2024-01-01T00:00:00", "2024-02-01T00:00:00"],
+        ["True", "0", "2024-03-01T00:00:00", "2024-03-01T00:00:00"],
+    ]
+    assert [row[9] for row in staged] == ["301", "302"]
+    assert stats.inserted == 2
+    sql = [call.args[0] for call in cursor.execute.call_args_list]
+    assert not any("nextval" in statement for statement in sql)
+    # Id 250 is in block 2, so the sequence must hand out block 3 next
+    setval = next(call for call in cursor.execute.call_args_list if "setval" in call.args[0])
+    assert setval.args[1] == (3,)
+
+
+def test_import_reports_conflicting_codes(monkeypatch):
+    monkeypatch.setattr("app.cli.load_blacklist", lambda: None)
+    monkeypatch.setattr("app.cli.get_short_code_allocator", _allocator)
+    db = MagicMock()
+    cursor = db.get_cursor.return_value
+    cursor.fetchall.return_value = [("taken01", "https://a.com")]
+    cursor.rowcount = 1
+    source = io.StringIO("shortened_url,original_url\ntaken01,https://a.com\nfree001,https://b.com\n")
+
+    stats = import_urls(source, "csv", chunk_size=10, db=db)
+
+    assert (stats.conflicts, stats.inserted, stats.skipped) == (1, 1, 0)
+
+
+def test_prepare_chunk_rejects_malformed_codes_and_clicks():
+    stats = ImportStats()
+    rows = [
+        {"original_url": "https://a.com", "shortened_url": "has space"},
+        {"original_url": "https://b.com", "clicks": "-1"},
+        {"original_url": "https://c.com", "clicks": "many"},
+        {"original_url": "https://d.com", "redirect_status": "303"},
+        {"original_url": "https://e.com", "redirect_status": "soon"},
+    ]
+
+    buffer = prepare_chunk(rows, None, _allocator(), lambda: 0, stats)
+
+    assert buffer.getvalue() == ""
+    assert stats.invalid == 5
+
+
+def test_backfill_digests_uses_the_normalized_digest():
+    db = MagicMock()
+    cursor = db.get_cursor.return_value
+    row_id = uuid.uuid4()
+    cursor.fetchall.side_effect = [[(row_id, "https://Example.com")], [], []]
+    cursor.rowcount = 1
+    copied = []
+    cursor.copy_expert.side_effect = lambda sql, buffer: copied.append(buffer.getvalue())
+
+    stats = backfill_digests(chunk_size=100, db=db)
+
+    # The digest new links for the same URL get, not md5 of the stored text
+    assert copied == [f"{row_id},\\x{url_digest('https://example.com/').hex()}\r\n"]
+    assert url_digest("https://example.com/") != hashlib.md5(b"https://Example.com").digest()
+    assert (stats.updated, stats.duplicates) == (1, 0)
+
+
+def test_backfill_digests_reports_urls_stored_twice():
+    db = MagicMock()
+    cursor = db.get_cursor.return_value
+    cursor.fetchall.side_effect = [[], [(["https://Example.com", "https://example.com/"],)]]
+
+    assert backfill_digests(chunk_size=100, db=db).duplicates == 1
+
+
+def test_digest_migration_is_not_done_in_sql():
+    script = (Path(__file__).parent.parent / "scripts" / "create_urls.sql").read_text()
+
+    assert "md5(" not in script
+    assert "python -m app.cli backfill-digests" in script
@@ -0,0 +1,54 @@
+import pytest
+from unittest.mock import AsyncMock
+from app.service.click_aggregator import ClickAggregator
+
+
+@pytest.mark.asyncio
+async def test_flush_batches_buffered_clicks():
+    flush_func = AsyncMock(return_value=2)
+    aggregator = ClickAggregator(flush_func)
+
+    aggregator.record("abc")
+    aggregator.record("abc")
+    aggregator.record("xyz")
+
+    assert aggregator.pending == 2
+    assert await aggregator.flush() == 3
+    flush_func.assert_awaited_once_with({"abc": 2, "xyz": 1})
+    assert aggregator.pending == 0
+    assert aggregator.stats()["flushed_clicks"] == 3
+
+
+@pytest.mark.asyncio
+async def test_flush_with_nothing_pending_skips_write():
+    flush_func = AsyncMock()
+    aggregator = ClickAggregator(flush_func)
+
+    assert await aggregator.flush() == 0
+    flush_func.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_counts_for_retry():
+    flush_func = AsyncMock(side_effect=[RuntimeError("db down"), 1])
+    aggregator = ClickAggregator(flush_func)
+    aggregator.record("abc")
+
+    assert await aggregator.flush() == 0
+    aggregator.record("abc")
+    assert aggregator.stats()["failed_flushes"] == 1
+
+    assert await aggregator.flush() == 2
+    flush_func.assert_awaited_with({"abc": 2})
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_remaining_clicks():
+    flush_func = AsyncMock(return_value=1)
+    aggregator = ClickAggregator(flush_func, interval=60)
+    aggregator.start()
+    aggregator.record("abc")
+
+    await aggregator.stop()
+
+    flush_func.assert_awaited_once_with({"abc": 1})
@@ -0,0 +1,104 @@
+import datetime
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.service.click_events import ClickEventPipeline, classify_user_agent, referrer_host
+
+
+def _pipeline(**kwargs):
+    return ClickEventPipeline(AsyncMock(side_effect=lambda rows: len(rows)), AsyncMock(return_value=0), **kwargs)
+
+
+@pytest.mark.parametrize("user_agent, expected", [
+    (None, "unknown"),
+    ("", "unknown"),
+    ("Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)", "bot"),
+    ("curl/8.4.0", "bot"),
+    ("Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148", "mobile"),
+    (b"Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36", "desktop"),
+    ("SomeApp/1.0", "other"),
+])
+def test_classify_user_agent(user_agent, expected):
+    assert classify_user_agent(user_agent) == expected
+
+
+def test_referrer_keeps_host_only():
+    assert referrer_host(b"https://News.Example.org/item?id=1") == "news.example.org"
+    assert referrer_host("android-app://com.example") == "com.example"
+    assert referrer_host("not a url") is None
+    assert referrer_host(None) is None
+
+
+def test_full_buffer_drops_and_counts():
+    pipeline = _pipeline(capacity=2)
+
+    assert pipeline.record("a") is True
+    assert pipeline.record("b") is True
+    assert pipeline.record("c") is False
+
+    assert len(pipeline) == 2
+    assert pipeline.stats()["dropped"] == 1
+
+
+def test_weighted_record_is_one_event():
+    pipeline = _pipeline(capacity=2)
+
+    assert pipeline.record("a", count=100) is True
+
+    assert len(pipeline) == 1
+    assert pipeline.to_rows(pipeline.drain(1))[0]["weight"] == 100
+
+
+@pytest.mark.asyncio
+async def test_flush_writes_in_batches():
+    pipeline = _pipeline(batch_size=2)
+    for code in ("a", "b", "c"):
+        pipeline.record(code, b"https://ref.example.org/x", "curl/8.4.0")
+
+    assert await pipeline.flush() == 3
+
+    batches = [call.args[0] for call in pipeline.write_func.await_args_list]
+    assert [len(rows) for rows in batches] == [2, 1]
+    row = batches[0][0]
+    assert row["shortened_url"] == "a"
+    assert row["referrer"] == "ref.example.org"
+    assert row["agent_class"] == "bot"
+    assert row["weight"] == 1
+    assert isinstance(row["occurred"], datetime.datetime) and row["occurred"].tzinfo is None
+    assert len(pipeline) == 0
+    assert pipeline.stats()["written"] == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_dropped_and_counted():
+    pipeline = _pipeline(batch_size=1)
+    pipeline.write_func.side_effect = [RuntimeError("db down"), 1]
+    pipeline.record("a")
+    pipeline.record("b")
+
+    assert await pipeline.flush() == 1
+    assert pipeline.stats()["failed"] == 1
+    assert len(pipeline) == 0
+
+
+@pytest.mark.asyncio
+async def test_roll_up_repeats_full_batches():
+    pipeline = _pipeline(rollup_batch_size=10)
+    pipeline.rollup_func.side_effect = [10, 10, 3]
+
+    assert await pipeline.roll_up() == 23
+    assert pipeline.rollup_func.await_count == 3
+    assert pipeline.stats()["rolled_up"] == 23
+
+
+@pytest.mark.asyncio
+async def test_stop_flushes_remaining_events():
+    pipeline = _pipeline()
+    pipeline.start()
+    pipeline.record("a")
+
+    await pipeline.stop()
+
+    pipeline.write_func.assert_awaited_once()
+    assert len(pipeline) == 0
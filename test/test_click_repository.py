@@ -0,0 +1,72 @@
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.repositories.click_repository import AsyncClickRepository, build_rollup
+
+
+@pytest.fixture
+def mock_db():
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=MagicMock())
+    db.commit = AsyncMock()
+    return db
+
+
+def test_rollup_moves_events_and_counts_them_in_one_statement():
+    sql = str(build_rollup(500).compile(dialect=postgresql.dialect()))
+
+    assert sql.startswith("WITH moved AS")
+    assert "DELETE FROM click_events" in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "INSERT INTO click_rollups_hourly" in sql
+    assert "GROUP BY moved.shortened_url, date_trunc('hour', moved.occurred)" in sql
+    assert "click_rollups_hourly.clicks + excluded.clicks" in sql
+    # Weighted events: a sampled beacon is one row, not 1/rate copies
+    assert "sum(moved.weight)" in sql
+    assert "INSERT INTO click_referrers_daily" in sql
+    assert "coalesce(moved.referrer, '')" in sql
+    assert "INSERT INTO click_totals" in sql
+
+
+@pytest.mark.asyncio
+async def test_insert_events_commits_one_batch(mock_db):
+    repo = AsyncClickRepository(mock_db)
+    rows = [{"shortened_url": "abc1234", "occurred": None, "referrer": None, "agent_class": "bot"}]
+
+    assert await repo.insert_events(rows) == 1
+    mock_db.execute.assert_awaited_once()
+    mock_db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_insert_nothing_skips_the_database(mock_db):
+    assert await AsyncClickRepository(mock_db).insert_events([]) == 0
+    mock_db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_roll_up_returns_moved_count(mock_db):
+    mock_db.execute.return_value.scalar_one.return_value = 42
+
+    assert await AsyncClickRepository(mock_db).roll_up(500) == 42
+    mock_db.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_top_referrers_maps_direct_clicks_to_none(mock_db):
+    mock_db.execute.return_value = [("news.example.org", 4), ("", 2)]
+
+    result = await AsyncClickRepository(mock_db).top_referrers("abc1234", datetime(2026, 1, 1), 10)
+
+    assert result == [("news.example.org", 4), (None, 2)]
+    assert mock_db.execute.await_args.args[1] == {"code": "abc1234", "since": datetime(2026, 1, 1), "top": 10}
+
+
+@pytest.mark.asyncio
+async def test_total_clicks_defaults_to_zero(mock_db):
+    mock_db.execute.return_value.scalar.return_value = None
+
+    assert await AsyncClickRepository(mock_db).total_clicks("abc1234") == 0
@@ -0,0 +1,105 @@
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.core.cache import TTLCache, TwoTierCache
+from app.service.async_url_service import AsyncUrlsService
+from app.service.click_stats import ClickStatsService
+
+
+def _local_cache():
+    return TwoTierCache(TTLCache(), None, prefix="", default_ttl=30, encode=None, decode=None)
+
+
+def _service(urls=None):
+    repository = MagicMock()
+    repository.total_clicks = AsyncMock(return_value=12)
+    repository.hourly_clicks = AsyncMock(return_value=[(datetime(2026, 1, 1, 11), 5)])
+    repository.top_referrers = AsyncMock(return_value=[("news.example.org", 4), (None, 1)])
+    if urls is None:
+        urls = MagicMock()
+        urls.exists = AsyncMock(return_value=True)
+    return ClickStatsService(repository, urls, cache=_local_cache())
+
+
+def _urls(rows=None, might_exist=True):
+    """A real AsyncUrlsService over a fake repository returning `rows` by code."""
+    rows = rows or {}
+    url_repository = MagicMock()
+    url_repository.get_by_short = AsyncMock(side_effect=rows.get)
+    known_codes = MagicMock()
+    known_codes.might_exist = AsyncMock(return_value=might_exist)
+    return AsyncUrlsService(url_repository, cache=_local_cache(), clicks=MagicMock(), known_codes=known_codes,
+                            events=MagicMock())
+
+
+@pytest.mark.asyncio
+async def test_stats_fill_empty_hours():
+    service = _service()
+
+    stats = await service.get_stats("abc1234", hours=3, top=10, now=datetime(2026, 1, 1, 12, 34))
+
+    assert stats["total_clicks"] == 12
+    assert stats["since"] == "2026-01-01T10:00:00"
+    assert stats["series"] == [
+        {"hour": "2026-01-01T10:00:00", "clicks": 0},
+        {"hour": "2026-01-01T11:00:00", "clicks": 5},
+        {"hour": "2026-01-01T12:00:00", "clicks": 0},
+    ]
+    assert stats["top_referrers"] == [{"referrer": "news.example.org", "clicks": 4}, {"referrer": None, "clicks": 1}]
+    service.repository.hourly_clicks.assert_awaited_once_with("abc1234", datetime(2026, 1, 1, 10))
+    service.repository.top_referrers.assert_awaited_once_with("abc1234", datetime(2026, 1, 1), 10)
+
+
+@pytest.mark.asyncio
+async def test_stats_are_cached():
+    service = _service()
+
+    first = await service.get_stats("abc1234", hours=24, top=10)
+    second = await service.get_stats("abc1234", hours=24, top=10)
+
+    assert first == second
+    service.repository.total_clicks.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_codes_that_cannot_exist_skip_the_database():
+    urls = _urls(might_exist=False)
+    service = _service(urls)
+
+    assert await service.get_stats("wp-login.php", hours=24, top=10) is None
+    urls.repository.get_by_short.assert_not_awaited()
+    service.repository.total_clicks.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_reaped_code_is_not_found():
+    # Issued once, so the filter lets it through, but the row is gone
+    urls = _urls(rows={})
+    service = _service(urls)
+
+    assert await service.get_stats("abc1234", hours=24, top=10) is None
+    urls.repository.get_by_short.assert_awaited_once_with("abc1234")
+    service.repository.total_clicks.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_never_issued_code_in_allocated_range_is_not_found():
+    # Decodes to an id inside a reserved block, e.g. an unused id of another worker's block
+    urls = _urls(rows={"abc1234": MagicMock(original_url="https://a.com", valid_until=None, redirect_status=302)})
+    service = _service(urls)
+
+    assert await service.get_stats("abc1235", hours=24, top=10) is None
+    assert await service.get_stats("abc1234", hours=24, top=10) is not None
+    service.repository.total_clicks.assert_awaited_once_with("abc1234")
+
+
+@pytest.mark.asyncio
+async def test_existence_check_does_not_count_a_click():
+    urls = _urls(rows={"abc1234": MagicMock(original_url="https://a.com", valid_until=None, redirect_status=302)})
+
+    await _service(urls).get_stats("abc1234", hours=24, top=10)
+
+    urls.clicks.record.assert_not_called()
+    urls.events.record.assert_not_called()
@@ -1,47 +1,39 @@
 import pytest
-from unittest.mock import patch, MagicMock
-from psycopg2 import OperationalError
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
 
 from app.utils.database_connection import DatabaseConnection
 
 
 @pytest.fixture
-def db_config():
-    return {
-        "user": "user",
-        "password": "pass",
-        "host": "localhost",
-        "port": "5432",
-        "dbname": "testdb"
-    }
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}", poolclass=QueuePool, pool_size=2)
+    yield engine
+    engine.dispose()
 
 
-def test_successful_connection(db_config):
-    mock_connection = MagicMock()
-    mock_connection.close = MagicMock()
+def test_successful_connection(engine):
+    db = DatabaseConnection(engine)
 
-    with patch("app.utils.database_connection.psycopg2.connect", return_value=mock_connection):
-        db = DatabaseConnection(**db_config)
-        assert db.connection is mock_connection
+    cursor = db.get_cursor()
+    cursor.execute("select 1")
+    assert cursor.fetchone() == (1,)
+    assert engine.pool.checkedout() == 1
 
-        cursor = db.get_cursor()
-        mock_connection.cursor.assert_called_once()
-        assert cursor == mock_connection.cursor.return_value
+    db.close()
+    assert engine.pool.checkedout() == 0
 
 
-def test_close_without_connection_logs(db_config):
-    with patch("app.utils.database_connection.psycopg2.connect", side_effect=OperationalError("fail")):
-        db = DatabaseConnection(**db_config)
-        # Should not raise any exception when closing without a connection
-        db.close()
+def test_close_without_connection_logs(engine):
+    db = DatabaseConnection(engine)
+    # Should not raise any exception when closing without a connection
+    db.close()
 
 
-def test_singleton_behavior(db_config):
-    mock_connection = MagicMock()
-    mock_connection.close = MagicMock()
-
-    with patch("app.utils.database_connection.psycopg2.connect", return_value=mock_connection):
-        db1 = DatabaseConnection(**db_config)
-        db2 = DatabaseConnection(**db_config)
-        assert db1 is db2
+def test_instances_use_separate_pooled_connections(engine):
+    with DatabaseConnection(engine) as db1, DatabaseConnection(engine) as db2:
+        assert db1 is not db2
+        assert db1.connection.driver_connection is not db2.connection.driver_connection
+        assert engine.pool.checkedout() == 2
 
+    assert engine.pool.checkedout() == 0
@@ -1,4 +1,7 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from app.db.async_sql_database import get_async_db
 from app.db.sql_database import get_db
 
 def test_get_db_yields_session():
@@ -14,3 +17,14 @@ def test_get_db_yields_session():
         next(generator)
     except StopIteration:
         pass
+
+
+@pytest.mark.asyncio
+async def test_get_async_db_yields_session():
+    generator = get_async_db()
+    session = await generator.__anext__()
+
+    assert isinstance(session, AsyncSession)
+
+    with pytest.raises(StopAsyncIteration):
+        await generator.__anext__()
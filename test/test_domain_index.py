@@ -0,0 +1,68 @@
+import pytest
+from app.integration.domain_index import (
+    DomainIndex, InvalidIndexFileError, normalize_host, iter_suffixes, main
+)
+
+
+def test_normalize_host_strips_userinfo_port_and_case():
+    assert normalize_host("https://user:pw@Bad.COM:8443/path") == "bad.com"
+    assert normalize_host("Bad.com:80") == "bad.com"
+    assert normalize_host("bad.com.") == "bad.com"
+
+
+def test_normalize_host_encodes_idna():
+    assert normalize_host("http://bücher.example") == "xn--bcher-kva.example"
+
+
+def test_normalize_host_empty():
+    assert normalize_host("") is None
+    assert normalize_host("http://") is None
+
+
+def test_iter_suffixes():
+    assert list(iter_suffixes("a.b.com")) == ["a.b.com", "b.com", "com"]
+
+
+def test_index_matches_host_and_subdomains():
+    index = DomainIndex.from_text("bad.com\n# comment\n\nPhishing.NET\n")
+
+    assert len(index) == 2
+    assert index.match("bad.com") == "bad.com"
+    assert index.match("login.secure.bad.com") == "bad.com"
+    assert index.match("https://user@phishing.net:8080/x") == "phishing.net"
+    assert "notbad.com" not in index
+    assert "bad.com.evil.org" not in index
+
+
+def test_index_deduplicates_and_reports_size():
+    index = DomainIndex.from_domains(["bad.com", "BAD.com", "bad.com."])
+    assert len(index) == 1
+    assert index.nbytes == 8
+
+
+def test_compiled_index_round_trip(tmp_path):
+    path = tmp_path / "blacklist.idx"
+    DomainIndex.from_text("bad.com\nphishing.net\n").write(path)
+
+    mapped = DomainIndex.open(path)
+    assert len(mapped) == 2
+    assert mapped.match("www.bad.com") == "bad.com"
+    assert "example.com" not in mapped
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_open_rejects_invalid_file(tmp_path):
+    path = tmp_path / "broken.idx"
+    path.write_bytes(b"not an index file at all")
+    with pytest.raises(InvalidIndexFileError):
+        DomainIndex.open(path)
+
+
+def test_compile_cli(tmp_path):
+    source = tmp_path / "blacklist.txt"
+    source.write_text("bad.com\n")
+    target = tmp_path / "blacklist.idx"
+
+    main([str(source), str(target)])
+
+    assert "bad.com" in DomainIndex.open(target)
@@ -0,0 +1,94 @@
+import argparse
+import json
+import random
+
+import httpx
+import pytest
+
+from benchmarks.in_memory import InMemoryUrlsRepository, build_app
+from benchmarks.load_test import compare, drive, percentile, seed, summarize, zipf_cum_weights
+
+
+def _run(redirect_rps, redirect_p95, redirect_p99=10.0):
+    return {"results": {
+        "redirect": {"requests": 100, "throughput_rps": redirect_rps, "p95_ms": redirect_p95, "p99_ms": redirect_p99},
+        "create": {"requests": 0, "throughput_rps": 0.0, "p95_ms": 0.0, "p99_ms": 0.0},
+    }}
+
+
+def test_percentile_nearest_rank():
+    values = [float(value) for value in range(1, 101)]
+
+    assert percentile(values, 0.50) == 50.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile(values, 1.0) == 100.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_summarize_reports_milliseconds():
+    summary = summarize([0.001, 0.002, 0.003, 0.004], errors=1, elapsed=2.0)
+
+    assert summary["requests"] == 4
+    assert summary["errors"] == 1
+    assert summary["throughput_rps"] == 2.0
+    assert summary["mean_ms"] == 2.5
+    assert summary["p50_ms"] == 2.0
+
+
+def test_zipf_weights_favor_low_ranks():
+    weights = zipf_cum_weights(3, 1.0)
+
+    assert weights == pytest.approx([1.0, 1.5, 1.5 + 1 / 3])
+
+
+def test_compare_within_tolerance_is_ok():
+    report = compare(_run(1000, 5.0), _run(950, 5.4), tolerance=0.10)
+
+    assert report["ok"] is True
+    assert report["changes"]["redirect"]["throughput_rps"] == -0.05
+    # Operations without requests in the baseline are skipped
+    assert "create" not in report["changes"]
+
+
+def test_compare_flags_throughput_drop_and_latency_rise():
+    report = compare(_run(1000, 5.0), _run(800, 6.0), tolerance=0.10)
+
+    assert report["ok"] is False
+    assert {(r["operation"], r["metric"]) for r in report["regressions"]} == {
+        ("redirect", "throughput_rps"), ("redirect", "p95_ms")
+    }
+
+
+@pytest.mark.asyncio
+async def test_in_process_run_seeds_and_drives_traffic():
+    repository = InMemoryUrlsRepository()
+    args = argparse.Namespace(duration=0.2, concurrency=2, create_ratio=0.2, zipf=1.1, seed=7)
+    transport = httpx.ASGITransport(app=build_app(repository))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        codes = await seed(client, 20, random.Random(1))
+        results = await drive(client, codes, args)
+
+    assert len(codes) == 20
+    assert results["redirect"]["requests"] > 0
+    assert results["total"]["errors"] == 0
+    assert len(repository) >= 20
+
+
+@pytest.mark.asyncio
+async def test_warmup_and_measured_phases_create_different_urls():
+    created = {"warmup": set(), "run": set()}
+    phase = "warmup"
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        created[phase].add(json.loads(request.content)["original_url"])
+        return httpx.Response(201)
+
+    args = argparse.Namespace(duration=0.05, concurrency=2, create_ratio=1.0, zipf=1.1, seed=7)
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://bench") as client:
+        await drive(client, ["abc1234"], args, phase="warmup")
+        phase = "run"
+        await drive(client, ["abc1234"], args)
+
+    assert created["warmup"] and created["run"]
+    assert not created["warmup"] & created["run"]
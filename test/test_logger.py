@@ -1,5 +1,9 @@
+import json
 import logging
-from app.core.logging_config import setup_logger  # Adjust path to match your structure
+from logging.handlers import QueueHandler
+from app.core.logging_config import (  # Adjust path to match your structure
+    JsonFormatter, RateLimitFilter, flush_logging, setup_logger
+)
 
 def test_logger_output_to_stdout(capsys):
     # Clear existing handlers to avoid duplicates across test runs
@@ -8,7 +12,42 @@ def test_logger_output_to_stdout(capsys):
 
     logger = setup_logger()
     logger.info("Visible message")
+    flush_logging()
 
     captured = capsys.readouterr()
     assert "Visible message" in captured.out
 
+
+def test_repeated_setup_adds_one_handler(capsys):
+    for _ in range(5):
+        setup_logger("app.some.module")
+    setup_logger().info("Only once")
+    flush_logging()
+
+    assert sum(isinstance(handler, QueueHandler) for handler in logging.getLogger().handlers) == 1
+    assert capsys.readouterr().out.count("Only once") == 1
+
+
+def test_rate_limit_drops_info_but_not_warnings():
+    rate_limit = RateLimitFilter({"app.service": 2})
+
+    def record(name, level):
+        return logging.LogRecord(name, level, __file__, 1, "msg", None, None)
+
+    allowed = [rate_limit.filter(record("app.service.url_service", logging.INFO)) for _ in range(5)]
+
+    assert allowed.count(True) == 2
+    assert rate_limit.filter(record("app.service.url_service", logging.WARNING))
+    assert rate_limit.filter(record("app.routes.urls_router", logging.INFO))
+    assert rate_limit.filter(record("app.servicex", logging.INFO))
+    assert rate_limit.suppressed == {"app.service": 3}
+
+
+def test_json_formatter():
+    record = logging.LogRecord("app.main", logging.INFO, __file__, 1, "hello %s", ("world",), None)
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry["message"] == "hello world"
+    assert entry["logger"] == "app.main"
+    assert entry["level"] == "INFO"
@@ -1,5 +1,6 @@
 from fastapi.testclient import TestClient
 from app.main import app
+from app.service.cache_warmer import get_cache_warmer
 
 
 def test_health_check():
@@ -8,3 +9,42 @@ def test_health_check():
 
     assert response.status_code == 200
     assert response.json() == {"status": "ok"}
+
+
+def test_ready_reports_warming_until_caches_are_warm(monkeypatch):
+    client = TestClient(app)
+    warmer = get_cache_warmer()
+    monkeypatch.setattr(warmer, "state", "warming")
+
+    response = client.get("/v1/ready")
+    assert response.status_code == 503
+    assert response.json() == {"status": "warming"}
+    assert client.get("/v1/health").status_code == 200
+
+    monkeypatch.setattr(warmer, "state", "failed")
+    monkeypatch.setattr(warmer, "error", "db down")
+    response = client.get("/v1/ready")
+    assert response.status_code == 503
+    assert response.json() == {"status": "failed", "error": "db down"}
+
+    monkeypatch.setattr(warmer, "state", "ready")
+    monkeypatch.setattr(warmer, "warmed", 42)
+    response = client.get("/v1/ready")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ready", "warmed": 42}
+
+
+def test_metrics_endpoint_reports_route_latency():
+    client = TestClient(app)
+    client.get("/v1/health")
+
+    response = client.get("/v1/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_request_duration_seconds_count{method="GET",route="/v1/health",status="200"}' in response.text
+    assert "# TYPE redirect_cache_hits_total counter" in response.text
+    assert "blacklist_domains " in response.text
+    assert "click_flush_pending_clicks " in response.text
+    assert "db_pool_checked_out{" in response.text
+    assert "cache_warm_ready " in response.text
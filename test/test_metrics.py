@@ -0,0 +1,110 @@
+import json
+import threading
+from app.core.metrics import (
+    Counter, CounterFunc, Gauge, Histogram, Registry, enable_multiprocess, render, render_all, render_snapshots,
+    snapshot
+)
+
+
+def test_counter_aggregates_thread_shards():
+    counter = Counter("requests_total", "Requests", ("route",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc(("/a",))
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc(("/b",), 2)
+
+    assert counter.collect() == {("/a",): 4000, ("/b",): 2}
+
+
+def test_histogram_buckets_sum_and_count():
+    histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+
+    buckets_and_totals = histogram.collect()[()]
+    assert buckets_and_totals[:3] == [2, 1, 1]
+    assert buckets_and_totals[-2] == 3.65
+    assert buckets_and_totals[-1] == 4
+
+
+def test_gauge_reads_function_at_collect_time():
+    state = {"value": 1}
+    gauge = Gauge("size", "Size", lambda: state["value"])
+    state["value"] = 5
+
+    assert gauge.collect() == {(): 5}
+
+
+def test_registry_replaces_metric_by_name():
+    registry = Registry()
+    registry.register(Counter("a", "first"))
+    second = registry.register(Counter("a", "second"))
+
+    assert registry.metrics() == [second]
+
+
+def test_render_prometheus_text():
+    registry = Registry()
+    counter = registry.register(Counter("hits_total", "Hits", ("route",)))
+    counter.inc(('/a"b',), 2)
+    histogram = registry.register(Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)))
+    histogram.observe(0.05)
+    histogram.observe(3.0)
+    registry.register(CounterFunc("flushed_total", "Flushed", lambda: 7))
+    registry.register(Gauge("age_seconds", "Age", lambda: None))
+    registry.register(Gauge("broken", "Broken", lambda: 1 / 0))
+
+    text = render(registry)
+
+    assert '# TYPE hits_total counter\nhits_total{route="/a\\"b"} 2\n' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1\n' in text
+    assert 'latency_seconds_bucket{le="1"} 1\n' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2\n' in text
+    assert "latency_seconds_sum 3.05\nlatency_seconds_count 2\n" in text
+    assert "# TYPE flushed_total counter\nflushed_total 7\n" in text
+    assert "age_seconds NaN\n" in text
+    assert "# broken unavailable: division by zero\n" in text
+
+
+def test_render_snapshots_labels_each_worker():
+    registry = Registry()
+    counter = registry.register(Counter("hits_total", "Hits", ("route",)))
+    histogram = registry.register(Histogram("latency_seconds", "Latency", buckets=(0.1,)))
+    counter.inc(("/a",), 2)
+    histogram.observe(0.05)
+    first = snapshot(registry)
+    counter.inc(("/a",), 3)
+    second = snapshot(registry)
+
+    text = render_snapshots({"0": first, "1": second})
+
+    assert text.count("# TYPE hits_total counter") == 1
+    assert 'hits_total{route="/a",worker="0"} 2' in text
+    assert 'hits_total{route="/a",worker="1"} 5' in text
+    assert 'latency_seconds_bucket{worker="1",le="0.1"} 1' in text
+    assert 'latency_seconds_count{worker="0"} 1' in text
+
+
+def test_render_all_reads_every_worker_snapshot(tmp_path, monkeypatch):
+    registry = Registry()
+    registry.register(Counter("hits_total", "Hits")).inc()
+    (tmp_path / "1.json").write_text(json.dumps(snapshot(registry)))
+    (tmp_path / "2.json").write_text("{truncated")
+    # Restored after the test, so other tests render this process only
+    monkeypatch.setattr("app.core.metrics._snapshot_dir", None)
+    monkeypatch.setattr("app.core.metrics._worker", None)
+    assert "worker=" not in render_all(registry)
+
+    enable_multiprocess(tmp_path, "0")
+    text = render_all(registry)
+
+    assert 'hits_total{worker="0"} 1' in text
+    assert 'hits_total{worker="1"} 1' in text
+    assert (tmp_path / "0.json").exists()
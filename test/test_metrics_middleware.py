@@ -0,0 +1,39 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.metrics_middleware import REQUEST_LATENCY, MetricsMiddleware
+
+
+def _count(labels):
+    return REQUEST_LATENCY.collect().get(labels, [0])[-1]
+
+
+def test_records_route_template_and_status():
+    application = FastAPI()
+
+    @application.get("/items/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id}
+
+    application.add_middleware(MetricsMiddleware)
+    client = TestClient(application)
+    labels = ("GET", "/items/{item_id}", "200")
+    before = _count(labels)
+
+    client.get("/items/1")
+    client.get("/items/2")
+
+    assert _count(labels) - before == 2
+
+
+def test_unmatched_paths_share_one_label():
+    application = FastAPI()
+    application.add_middleware(MetricsMiddleware)
+    client = TestClient(application)
+    labels = ("GET", "unmatched", "404")
+    before = _count(labels)
+
+    client.get("/nope/1")
+    client.get("/nope/2")
+
+    assert _count(labels) - before == 2
@@ -0,0 +1,35 @@
+import json
+
+from benchmarks.micro import BENCHMARKS, history, main, run_benchmarks, select
+
+
+def test_select_filters_by_substring():
+    assert select(["cache."]) == ["cache.get_hit", "cache.get_miss", "cache.set_evicting"]
+    assert select(None) == list(BENCHMARKS)
+
+
+def test_every_benchmark_runs():
+    report = run_benchmarks(list(BENCHMARKS), min_time=0.001, repeat=1)
+
+    assert set(report["results"]) == set(BENCHMARKS)
+    for result in report["results"].values():
+        assert result["ns_per_op_median"] > 0
+        assert result["number"] >= 1
+
+
+def test_run_appends_to_history(tmp_path):
+    results = tmp_path / "micro.jsonl"
+
+    main(["run", "-k", "cache.get_miss", "--min-time", "0.001", "--repeat", "1", "--results", str(results)])
+    main(["run", "-k", "cache.get_miss", "--min-time", "0.001", "--repeat", "1", "--results", str(results)])
+
+    runs = [json.loads(line) for line in results.read_text().splitlines()]
+    assert len(runs) == 2
+    assert list(runs[0]["results"]) == ["cache.get_miss"]
+    lines = history(results, ["cache"])
+    assert lines[0] == "cache.get_miss"
+    assert len(lines) == 3
+
+
+def test_history_without_results(tmp_path):
+    assert history(tmp_path / "missing.jsonl", None) == []
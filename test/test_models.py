@@ -7,6 +7,7 @@ from sqlalchemy.orm import sessionmaker
 
 from app.db.sql_database import Base
 from app.models.models import Urls  # Adjust path to your Urls model
+from app.utils.url_digest import url_digest
 
 
 @pytest.fixture
@@ -38,5 +39,6 @@ def test_create_url_entry(test_session):
     assert result is not None
     assert result.id == test_uuid
     assert result.original_url == "https://example.com"
+    assert result.original_url_digest == url_digest("https://example.com")
     assert result.clicks == 0
     assert result.valid_until is not None
@@ -0,0 +1,21 @@
+import asyncio
+import pytest
+from app.utils.periodic_task import PeriodicTask
+
+
+@pytest.mark.asyncio
+async def test_periodic_task_runs_and_survives_errors():
+    calls = {"count": 0}
+
+    async def callback():
+        calls["count"] += 1
+        if calls["count"] == 1:
+            raise RuntimeError("boom")
+
+    task = PeriodicTask("test", 0.01, callback)
+    task.start()
+    await asyncio.sleep(0.05)
+    await task.stop()
+
+    assert calls["count"] >= 2
+    assert not task.running
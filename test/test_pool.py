@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.core.config import get_settings
+from app.db.pool import POOL_CHECKOUT_TIMEOUTS, POOL_CHECKOUT_WAIT, engine_options, pool_stats, timed_pool_class
+
+
+def test_engine_options_come_from_settings():
+    settings = get_settings()
+    options = engine_options(settings, "sync")
+
+    assert options["pool_size"] == settings.DB_POOL_SIZE
+    assert options["max_overflow"] == settings.DB_MAX_OVERFLOW
+    assert options["pool_pre_ping"] is settings.DB_POOL_PRE_PING
+    assert f"statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}" in options["connect_args"]["options"]
+
+    async_options = engine_options(settings, "async", is_async=True)
+    assert async_options["connect_args"]["server_settings"]["statement_timeout"] == str(settings.DB_STATEMENT_TIMEOUT_MS)
+
+
+def test_timed_pool_records_wait_and_saturation(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'test.db'}",
+        poolclass=timed_pool_class("test-pool"),
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.01,
+    )
+    connection = engine.connect()
+
+    assert pool_stats()["test-pool"]["saturation"] == 1.0
+    assert POOL_CHECKOUT_WAIT.collect()[("test-pool",)][-1] == 1
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    assert POOL_CHECKOUT_TIMEOUTS.collect()[("test-pool",)] == 1
+
+    connection.close()
+    engine.dispose()
@@ -0,0 +1,101 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.metrics_middleware import REQUEST_LATENCY, MetricsMiddleware
+from app.routes.redirect_fast_path import RedirectFastPath
+from app.service.url_service import CachedUrl
+
+
+@pytest.fixture
+def client():
+    service = MagicMock()
+    service.resolve_url = AsyncMock(return_value=None)
+    service.find = AsyncMock(return_value=None)
+    application = FastAPI()
+
+    @application.get("/v1/health")
+    def health():
+        return {"status": "ok"}
+
+    @application.get("/{short_code:str}")
+    def slow_path(short_code: str):
+        return {"slow": short_code}
+
+    application.add_middleware(RedirectFastPath, service=service)
+    return TestClient(application, follow_redirects=False), service
+
+
+def test_redirects_resolved_code(client):
+    test_client, service = client
+    service.resolve_url.return_value = CachedUrl("https://example.com/a b?q=1", None)
+
+    response = test_client.get("/abc1234", headers={"referer": "https://news.example.org/item"})
+
+    assert response.status_code == 302
+    assert response.headers["location"] == "https://example.com/a%20b?q=1"
+    assert response.content == b""
+    service.resolve_url.assert_awaited_once_with("abc1234", b"https://news.example.org/item", b"testclient")
+
+
+def test_unknown_code_is_a_json_404(client):
+    test_client, _ = client
+
+    response = test_client.get("/missing1")
+
+    assert response.status_code == 404
+    assert response.json() == {"detail": "Shortened URL not found or expired"}
+
+
+def test_head_sends_headers_only_and_counts_no_click(client):
+    test_client, service = client
+    service.find.return_value = CachedUrl("https://example.com", None)
+
+    response = test_client.head("/abc1234")
+
+    assert response.status_code == 302
+    assert response.content == b""
+    service.find.assert_awaited_once_with("abc1234")
+    service.resolve_url.assert_not_awaited()
+
+
+def test_app_routes_and_other_methods_pass_through(client):
+    test_client, service = client
+
+    assert test_client.get("/docs").status_code == 200
+    assert test_client.get("/v1/health").json() == {"status": "ok"}
+    assert test_client.post("/abc1234").status_code == 405
+    service.resolve_url.assert_not_awaited()
+
+
+def test_fast_path_requests_are_labelled_with_the_redirect_route(client):
+    test_client, _ = client
+    labels = ("GET", "/{short_code:str}", "404")
+    before = REQUEST_LATENCY.collect().get(labels, [0])[-1]
+    test_client.app.add_middleware(MetricsMiddleware)
+
+    test_client.get("/missing1")
+
+    assert REQUEST_LATENCY.collect()[labels][-1] - before == 1
+
+
+def test_permanent_redirect_is_cacheable(client):
+    test_client, service = client
+    service.resolve_url.return_value = CachedUrl("https://example.com", None, 308)
+
+    response = test_client.get("/abc1234")
+
+    assert response.status_code == 308
+    assert response.headers["cache-control"].startswith("public, max-age=")
+
+
+def test_temporary_redirect_has_no_cache_header(client):
+    test_client, service = client
+    service.resolve_url.return_value = CachedUrl("https://example.com", None)
+
+    response = test_client.get("/abc1234")
+
+    assert response.status_code == 302
+    assert "cache-control" not in response.headers
@@ -2,7 +2,7 @@ import pytest
 import uuid
 from datetime import datetime, timedelta, timezone
 from pydantic import ValidationError
-from app.schemas.schema import UrlsCreateRequest, UrlsResponse
+from app.schemas.schema import UrlsCreateRequest, UrlsResponse, UrlsBatchCreateRequest, MAX_BATCH_ITEMS
 
 
 def test_urls_create_request_valid_url():
@@ -54,3 +54,13 @@ def test_urls_response_from_attributes():
     assert response.updated == now
     assert response.valid_until == now + timedelta(days=1)
     assert response.clicks == 42
+
+
+def test_urls_batch_create_request_limits():
+    with pytest.raises(ValidationError):
+        UrlsBatchCreateRequest(items=[])
+    with pytest.raises(ValidationError):
+        UrlsBatchCreateRequest(items=[{"original_url": "https://a.com"}] * (MAX_BATCH_ITEMS + 1))
+
+    request = UrlsBatchCreateRequest(items=[{"original_url": "https://a.com"}])
+    assert request.items[0].original_url == "https://a.com"
@@ -0,0 +1,169 @@
+import json
+import signal
+from contextlib import asynccontextmanager
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from app.core.config import Settings
+from app.server import (
+    STARTUP_FAILURE, Supervisor, WorkerStartupError, available_cpus, bind_socket, build_config, metrics_directory,
+    run_worker, worker_count,
+)
+from app.service.click_aggregator import ClickAggregator
+
+
+@pytest.fixture
+def cpu_max(tmp_path):
+    return tmp_path / "cpu.max"
+
+
+def test_available_cpus_without_cgroup_uses_affinity(cpu_max):
+    assert available_cpus(cpu_max) >= 1
+
+
+def test_available_cpus_capped_by_cgroup_quota(cpu_max, monkeypatch):
+    monkeypatch.setattr("os.sched_getaffinity", lambda pid: set(range(16)))
+    cpu_max.write_text("150000 100000\n")
+    assert available_cpus(cpu_max) == 2
+    cpu_max.write_text("10000 100000\n")
+    assert available_cpus(cpu_max) == 1
+    cpu_max.write_text("max 100000\n")
+    assert available_cpus(cpu_max) == 16
+
+
+def test_available_cpus_ignores_unreadable_quota(cpu_max, monkeypatch):
+    monkeypatch.setattr("os.sched_getaffinity", lambda pid: {0, 1})
+    cpu_max.write_text("garbage")
+    assert available_cpus(cpu_max) == 2
+
+
+def test_worker_count(monkeypatch):
+    monkeypatch.setattr("app.server.available_cpus", lambda: 6)
+    assert worker_count(0) == 6
+    assert worker_count(3) == 3
+
+
+def test_build_config_uses_settings():
+    settings = Settings(SERVER_BACKLOG=512, SERVER_KEEPALIVE_SECONDS=90, SERVER_GRACEFUL_SHUTDOWN_SECONDS=12,
+                        SERVER_LIMIT_CONCURRENCY=200, SERVER_ACCESS_LOG=True)
+    config = build_config(object(), settings)
+    assert config.loop == "uvloop"
+    assert config.http == "httptools"
+    assert config.lifespan == "on"
+    assert config.backlog == 512
+    assert config.timeout_keep_alive == 90
+    assert config.timeout_graceful_shutdown == 12
+    assert config.limit_concurrency == 200
+    assert config.access_log is True
+    assert config.log_config is None
+
+
+def test_build_config_falls_back_without_uvloop(monkeypatch):
+    monkeypatch.setattr("app.server._installed", lambda module: False)
+    config = build_config(object(), Settings())
+    assert config.loop == "asyncio"
+    assert config.http == "h11"
+
+
+def test_bind_socket_listens_on_an_inheritable_socket():
+    sock = bind_socket("127.0.0.1", 0, 16)
+    try:
+        assert sock.getsockname()[1] > 0
+        assert sock.get_inheritable()
+    finally:
+        sock.close()
+
+
+def test_metrics_directory_starts_empty(tmp_path, monkeypatch):
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    configured = tmp_path / "metrics"
+    configured.mkdir()
+    (configured / "3.json").write_text("{}")
+    (configured / ".3.json.123.tmp").write_text("{}")
+    (configured / "settings.json").write_text("{}")
+    (configured / "data").mkdir()
+
+    assert sorted(p.name for p in metrics_directory(str(configured)).iterdir()) == ["data", "settings.json"]
+    assert metrics_directory(str(tmp_path / "new")).is_dir()
+    assert metrics_directory(None).is_dir()
+
+
+def _broken_app():
+    @asynccontextmanager
+    async def lifespan(application):
+        raise RuntimeError("SHORT_CODE_SECRET is not set")
+        yield
+
+    return FastAPI(lifespan=lifespan)
+
+
+def test_run_worker_raises_when_startup_fails():
+    sock = bind_socket("127.0.0.1", 0, 16)
+    try:
+        with pytest.raises(WorkerStartupError):
+            run_worker(sock, _broken_app(), Settings())
+    finally:
+        sock.close()
+
+
+def test_supervisor_gives_up_on_a_worker_that_keeps_failing_to_start(tmp_path, monkeypatch):
+    monkeypatch.setattr("app.server._MIN_WORKER_UPTIME_SECONDS", 0.01)
+    handlers = signal.getsignal(signal.SIGTERM), signal.getsignal(signal.SIGINT)
+    sock = bind_socket("127.0.0.1", 0, 16)
+    supervisor = Supervisor(sock, 2, Settings(SERVER_MAX_FAILED_STARTS=3), _broken_app(),
+                            metrics_directory(str(tmp_path / "metrics")))
+    try:
+        assert supervisor.run() == STARTUP_FAILURE
+    finally:
+        signal.signal(signal.SIGTERM, handlers[0])
+        signal.signal(signal.SIGINT, handlers[1])
+        sock.close()
+
+    assert supervisor.children == {}
+    assert max(supervisor.failed_starts.values()) == 3
+
+
+def _click_app(flushed):
+    """A worker app that buffers clicks in memory and writes them out only on shutdown."""
+    async def flush(counts):
+        flushed.write_text(json.dumps(counts))
+        return len(counts)
+
+    clicks = ClickAggregator(flush, interval=3600)
+
+    @asynccontextmanager
+    async def lifespan(application):
+        clicks.start()
+        yield
+        await clicks.stop()
+
+    application = FastAPI(lifespan=lifespan)
+
+    @application.get("/{code}")
+    async def click(code: str):
+        clicks.record(code)
+        return {"buffered": True}
+
+    return application
+
+
+def test_sigterm_drains_worker_and_flushes_buffered_clicks(tmp_path):
+    flushed = tmp_path / "flushed.json"
+    sock = bind_socket("127.0.0.1", 0, 16)
+    supervisor = Supervisor(sock, 1, Settings(SERVER_GRACEFUL_SHUTDOWN_SECONDS=5), _click_app(flushed),
+                            metrics_directory(str(tmp_path / "metrics")))
+    supervisor.spawn(0)
+    try:
+        url = f"http://127.0.0.1:{sock.getsockname()[1]}/abc1234"
+        # The socket listens already, so requests wait in the backlog until the worker accepts
+        assert httpx.get(url, timeout=10).status_code == 200
+        assert httpx.get(url, timeout=10).status_code == 200
+        assert not flushed.exists()
+    finally:
+        supervisor.shutdown()
+        sock.close()
+
+    assert supervisor.children == {}
+    assert json.loads(flushed.read_text()) == {"abc1234": 2}
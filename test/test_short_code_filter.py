@@ -0,0 +1,104 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from app.core.cache import TTLCache
+from app.service.short_code_filter import ShortCodeFilter
+from app.utils.short_codes import ShortCodeAllocator, ShortCodeCodec
+
+
+def _filter(codes=(), high_water=1, secret="s3cret"):
+    allocator = ShortCodeAllocator(ShortCodeCodec(min_length=7, secret=secret), block_size=100)
+
+    async def codes_func():
+        for code in codes:
+            yield code
+
+    return ShortCodeFilter(
+        allocator,
+        AsyncMock(return_value=len(codes)),
+        codes_func,
+        AsyncMock(return_value=high_water),
+        TTLCache(default_ttl=60),
+        min_capacity=1000,
+    )
+
+
+@pytest.mark.asyncio
+async def test_everything_passes_until_built():
+    known_codes = _filter()
+
+    assert not known_codes.ready
+    assert await known_codes.might_exist("robots.txt")
+
+
+@pytest.mark.asyncio
+async def test_rejects_paths_and_probes_that_cannot_be_codes():
+    known_codes = _filter(codes=["abc123"])
+    await known_codes.build()
+
+    assert await known_codes.might_exist("abc123")  # legacy code loaded from the table
+    assert not await known_codes.might_exist("robots.txt")
+    assert not await known_codes.might_exist("wp-login.php")
+    assert not await known_codes.might_exist("admin")
+    assert not await known_codes.might_exist("zzzzzzzzzz")
+
+
+@pytest.mark.asyncio
+async def test_legacy_codes_imported_after_the_build_pass():
+    known_codes = _filter(codes=["abc123"])
+    await known_codes.build()
+
+    # Kept by `python -m app.cli import` while the filter was already built
+    assert await known_codes.might_exist("XK4P9Q")
+    assert not await known_codes.might_exist("XK4P9")
+    assert not await known_codes.might_exist("XK.P9Q")
+
+
+@pytest.mark.asyncio
+async def test_codes_from_handed_out_blocks_pass_without_being_in_the_filter():
+    known_codes = _filter(high_water=3)
+    await known_codes.build()
+    codec = known_codes.allocator.codec
+
+    # Issued by another worker after the build, from a reserved block
+    assert await known_codes.might_exist(codec.encode(250))
+    assert not await known_codes.might_exist(codec.encode(10_000_000))
+
+
+@pytest.mark.asyncio
+async def test_high_water_mark_is_rechecked_at_most_once_per_interval():
+    known_codes = _filter(high_water=1)
+    await known_codes.build()
+    probe = known_codes.allocator.codec.encode(10_000_000)
+
+    await known_codes.might_exist(probe)
+    await known_codes.might_exist(probe)
+
+    assert known_codes.high_water_func.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_negative_cache_absorbs_repeated_misses_until_created():
+    known_codes = _filter(codes=["abc123"])
+    await known_codes.build()
+
+    known_codes.record_miss("abc123")
+    assert not await known_codes.might_exist("abc123")
+
+    known_codes.add("abc123")
+    assert await known_codes.might_exist("abc123")
+
+
+@pytest.mark.asyncio
+async def test_codes_added_during_a_rebuild_survive_the_swap():
+    known_codes = _filter()
+
+    async def codes_func():
+        known_codes.add("new1234")
+        yield "old1234"
+
+    known_codes.codes_func = codes_func
+    await known_codes.build()
+
+    assert known_codes.stats()["codes"] == 2
+    assert await known_codes.might_exist("new1234")
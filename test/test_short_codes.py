@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+from app.utils.short_codes import (
+    ShortCodeAllocator, ShortCodeCodec, decode_base62, encode_base62
+)
+
+
+def test_base62_round_trip():
+    assert encode_base62(0, 3) == "000"
+    assert encode_base62(61, 2) == "0z"
+    assert decode_base62("0z") == 61
+    assert decode_base62("ab-c") is None
+    with pytest.raises(ValueError):
+        encode_base62(62, 1)
+
+
+def test_codec_is_bijective_and_permuted():
+    codec = ShortCodeCodec(min_length=3, secret="secret")
+    codes = [codec.encode(value) for value in range(5000)]
+
+    assert len(set(codes)) == 5000
+    assert [codec.decode(code) for code in codes] == list(range(5000))
+    assert codes[:3] != ["000", "001", "002"]
+
+
+def test_codec_without_secret_is_sequential():
+    codec = ShortCodeCodec(min_length=3)
+    assert codec.encode(0) == "000"
+    assert codec.encode(1) == "001"
+
+
+def test_codec_grows_length_when_keyspace_fills():
+    codec = ShortCodeCodec(min_length=2, secret="secret")
+    first_long = 62 ** 2
+
+    assert len(codec.encode(first_long - 1)) == 2
+    assert len(codec.encode(first_long)) == 3
+    assert codec.decode(codec.encode(first_long + 7)) == first_long + 7
+
+
+def test_codec_decode_rejects_non_codes():
+    codec = ShortCodeCodec(min_length=7, secret="secret")
+    assert codec.decode("abc") is None
+    assert codec.decode("robots.txt") is None
+
+
+def test_allocator_reserves_a_block_only_when_exhausted():
+    reservations = iter([3, 9])
+    allocator = ShortCodeAllocator(ShortCodeCodec(min_length=3), block_size=2)
+
+    codes = [allocator.allocate(lambda: next(reservations)) for _ in range(3)]
+
+    assert [allocator.codec.decode(code) for code in codes] == [6, 7, 18]
+    assert allocator.reserved_blocks == 2
+
+
+@pytest.mark.asyncio
+async def test_allocator_concurrent_coroutines_share_one_reservation():
+    calls = {"count": 0}
+
+    async def reserve():
+        calls["count"] += 1
+        await asyncio.sleep(0)
+        return calls["count"]
+
+    allocator = ShortCodeAllocator(ShortCodeCodec(min_length=3), block_size=10)
+    codes = await asyncio.gather(*(allocator.allocate_async(reserve) for _ in range(5)))
+
+    assert len(set(codes)) == 5
+    assert calls["count"] == 1
@@ -0,0 +1,24 @@
+import hashlib
+
+from app.utils.url_digest import DIGEST_SIZE, normalize_url, url_digest
+
+
+def test_normalize_url_canonicalizes_scheme_host_and_port():
+    assert normalize_url("HTTPS://Example.COM") == "https://example.com/"
+    assert normalize_url("http://a.com:80/x?q=1#f") == "http://a.com/x?q=1#f"
+    assert normalize_url("https://a.com:8443/X") == "https://a.com:8443/X"
+    assert normalize_url("https://user@A.com/") == "https://user@a.com/"
+
+
+def test_normalize_url_leaves_unparsable_input_alone():
+    assert normalize_url("not a url") == "not a url"
+    assert normalize_url("http://a.com:99999/") == "http://a.com:99999/"
+
+
+def test_url_digest_is_fixed_width_and_matches_postgres_md5():
+    digest = url_digest("https://example.com/")
+
+    assert len(digest) == DIGEST_SIZE
+    assert digest == hashlib.md5(b"https://example.com/").digest()
+    assert url_digest("HTTPS://EXAMPLE.com:443") == digest
+    assert url_digest("https://example.com/other") != digest
@@ -0,0 +1,47 @@
+import datetime
+
+import pytest
+from unittest.mock import AsyncMock
+
+from app.core.metrics import REGISTRY
+from app.service.url_reaper import URLS_REAPED, UrlReaper
+
+
+@pytest.mark.asyncio
+async def test_sweep_deletes_in_batches_until_a_short_batch():
+    purge = AsyncMock(side_effect=[10, 10, 3])
+    oldest = AsyncMock(return_value=None)
+    reaper = UrlReaper(purge, oldest, batch_size=10)
+    reaped_before = URLS_REAPED.collect().get((), 0)
+
+    assert await reaper.sweep() == 23
+
+    assert purge.await_count == 3
+    cutoff, limit = purge.await_args.args
+    assert limit == 10 and cutoff.tzinfo is None
+    assert reaper.lag_seconds == 0.0
+    assert URLS_REAPED.collect()[()] - reaped_before == 23
+
+
+@pytest.mark.asyncio
+async def test_sweep_stops_after_max_batches_and_reports_lag():
+    purge = AsyncMock(return_value=10)
+    oldest = AsyncMock(side_effect=lambda cutoff: cutoff - datetime.timedelta(seconds=90))
+    reaper = UrlReaper(purge, oldest, batch_size=10, max_batches=2)
+
+    assert await reaper.sweep() == 20
+
+    assert purge.await_count == 2
+    assert reaper.lag_seconds == 90
+    assert REGISTRY.get("url_reaper_lag_seconds") is not None
+    assert reaper.stats() == {"purged": 20, "lag_seconds": 90}
+
+
+@pytest.mark.asyncio
+async def test_failed_sweep_still_counts_deleted_rows():
+    purge = AsyncMock(side_effect=[10, RuntimeError("db down")])
+    reaper = UrlReaper(purge, AsyncMock(), batch_size=10)
+
+    with pytest.raises(RuntimeError):
+        await reaper.sweep()
+    assert reaper.purged == 10
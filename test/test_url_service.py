@@ -1,11 +1,13 @@
+import time
 from unittest.mock import MagicMock
 from datetime import datetime, timedelta, timezone
-from app.service.url_service import UrlsService
+from app.core.cache import TTLCache
+from app.service.url_service import UrlsService, CachedUrl, decode_cached_url, encode_cached_url, to_epoch
 
 
 def test_shorten_url_calls_repository_create_url():
     mock_repo = MagicMock()
-    service = UrlsService(repository=mock_repo)
+    service = UrlsService(repository=mock_repo, cache=TTLCache(), clicks=MagicMock())
 
     original_url = "https://example.com"
     valid_until = datetime.now(timezone.utc) + timedelta(days=1)
@@ -15,29 +17,84 @@ def test_shorten_url_calls_repository_create_url():
     mock_repo.create_url.assert_called_once_with(original_url, valid_until)
 
 
-def test_resolve_url_found_calls_increment_clicks():
+def test_resolve_url_found_records_click():
     mock_repo = MagicMock()
-    service = UrlsService(repository=mock_repo)
+    service = UrlsService(repository=mock_repo, cache=TTLCache(), clicks=MagicMock())
 
     fake_url = MagicMock()
+    fake_url.original_url = "https://example.com"
+    fake_url.valid_until = None
     mock_repo.get_by_short.return_value = fake_url
-    mock_repo.increment_clicks.return_value = "clicked_url"
 
     result = service.resolve_url("abc123")
 
     mock_repo.get_by_short.assert_called_once_with("abc123")
-    mock_repo.increment_clicks.assert_called_once_with(fake_url)
-    assert result == "clicked_url"
+    service.clicks.record.assert_called_once_with("abc123")
+    assert result.original_url == "https://example.com"
+
+
+def test_resolve_url_cache_hit_skips_lookup():
+    mock_repo = MagicMock()
+    cache = TTLCache()
+    cache.set("abc123", CachedUrl("https://example.com", None))
+    service = UrlsService(repository=mock_repo, cache=cache, clicks=MagicMock())
+
+    result = service.resolve_url("abc123")
+
+    mock_repo.get_by_short.assert_not_called()
+    assert result.original_url == "https://example.com"
+
+
+def test_resolve_url_cache_ttl_capped_by_valid_until():
+    mock_repo = MagicMock()
+    cache = TTLCache(default_ttl=300)
+    service = UrlsService(repository=mock_repo, cache=cache, clicks=MagicMock())
+
+    fake_url = MagicMock()
+    fake_url.original_url = "https://example.com"
+    fake_url.valid_until = datetime.now(timezone.utc) + timedelta(seconds=30)
+    mock_repo.get_by_short.return_value = fake_url
+
+    service.resolve_url("abc123")
+
+    assert cache._entries["abc123"].expires_at <= time.time() + 30
+
+
+def test_to_epoch_treats_naive_as_utc():
+    aware = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    assert to_epoch(aware.replace(tzinfo=None)) == to_epoch(aware)
+    assert to_epoch(None) is None
 
 
 def test_resolve_url_not_found_returns_none():
     mock_repo = MagicMock()
-    service = UrlsService(repository=mock_repo)
+    service = UrlsService(repository=mock_repo, cache=TTLCache(), clicks=MagicMock())
 
     mock_repo.get_by_short.return_value = None
 
     result = service.resolve_url("notfound")
 
     mock_repo.get_by_short.assert_called_once_with("notfound")
-    mock_repo.increment_clicks.assert_not_called()
+    service.clicks.record.assert_not_called()
     assert result is None
+
+
+def test_temporary_redirects_are_not_cached():
+    assert CachedUrl("https://example.com", None, 302).cache_control(max_age=3600) is None
+    assert CachedUrl("https://example.com", None, 307).cache_control(max_age=3600) is None
+
+
+def test_permanent_redirect_max_age_capped_by_expiry():
+    now = 1_000_000.0
+
+    assert CachedUrl("https://example.com", None, 301).cache_control(3600, now) == "public, max-age=3600"
+    assert CachedUrl("https://example.com", now + 120.5, 308).cache_control(3600, now) == "public, max-age=120"
+    assert CachedUrl("https://example.com", now + 0.5, 308).cache_control(3600, now) == "no-store"
+
+
+def test_cached_url_round_trips_redirect_status():
+    decoded = decode_cached_url(encode_cached_url(CachedUrl("https://example.com", 5.0, 308)))
+
+    assert (decoded.original_url, decoded.valid_until, decoded.redirect_status) == ("https://example.com", 5.0, 308)
+    # Entries cached before redirect_status existed
+    assert decode_cached_url(b'["https://example.com", null]').redirect_status == 302
@@ -1,9 +1,16 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import MagicMock
 from datetime import datetime, timedelta, timezone
 
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import Settings
 from app.models.models import Urls
-from app.repositories.url_repository import UrlsRepository, is_url_expired
+from app.repositories.url_repository import (
+    UrlsRepository, build_upsert, get_short_code_allocator, is_url_expired, new_url_row
+)
+from app.utils.short_codes import ShortCodeAllocator, ShortCodeCodec, decode_base62
 
 
 @pytest.fixture
@@ -27,51 +34,82 @@ def test_get_by_short(repo, mock_db):
     mock_db.query.assert_called_once()
 
 
-def test_create_url_new(repo, mock_db):
-    # No existing URL, first call returns None
-    repo._get_by_original = MagicMock(return_value=None)
-    repo.get_by_short = MagicMock(return_value=None)
-    repo._generate_unique_short = MagicMock(return_value="XYZ999")
+def test_create_url_upserts_in_one_statement(repo, mock_db):
+    repo._next_short_code = MagicMock(return_value="XYZ9999")
+    created = Urls(original_url="https://example.com", shortened_url="XYZ9999")
+    mock_db.scalars.return_value.one.return_value = created
 
-    mock_obj = MagicMock(spec=Urls)
-    with patch("app.repositories.url_repository.Urls", return_value=mock_obj) as mock_model:
-        result = repo.create_url("https://example.com")
+    result = repo.create_url("https://example.com")
 
-    mock_db.add.assert_called_once_with(mock_obj)
+    assert result == created
+    mock_db.scalars.assert_called_once()
     mock_db.commit.assert_called_once()
-    mock_db.refresh.assert_called_once_with(mock_obj)
-    assert result == mock_obj
+    mock_db.add.assert_not_called()
+    mock_db.query.assert_not_called()
 
 
-def test_create_url_existing(repo):
-    mock_url = MagicMock(spec=Urls)
-    repo._get_by_original = MagicMock(return_value=mock_url)
+def test_create_url_existing_returns_live_row(repo, mock_db):
+    repo._next_short_code = MagicMock(return_value="XYZ9999")
+    existing = Urls(original_url="https://example.com", shortened_url="OLD1234")
+    mock_db.scalars.return_value.one.return_value = existing
 
-    result = repo.create_url("https://example.com")
-    assert result == mock_url
-    repo._get_by_original.assert_called_once()
+    assert repo.create_url("https://example.com") == existing
+    mock_db.scalars.assert_called_once()
+
+
+def test_create_url_rolls_back_on_integrity_error(repo, mock_db):
+    repo._next_short_code = MagicMock(return_value="XYZ9999")
+    mock_db.scalars.side_effect = IntegrityError("INSERT", {}, Exception("boom"))
+
+    with pytest.raises(IntegrityError):
+        repo.create_url("https://example.com")
+    mock_db.rollback.assert_called_once()
+
+
+def test_build_upsert_revives_only_expired_rows():
+    rows = [new_url_row("https://b.com", "BBBBBBB", None), new_url_row("https://a.com", "AAAAAAA", None)]
+
+    statement = build_upsert(rows)
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert sql.count("VALUES") == 1
+    assert "ON CONFLICT (original_url_digest) DO UPDATE SET" in sql
+    assert "shortened_url = CASE WHEN (urls.valid_until IS NOT NULL AND urls.valid_until <=" in sql
+    assert "THEN excluded.shortened_url ELSE urls.shortened_url END" in sql
+    assert "RETURNING urls.id" in sql
+    digests = [value for value in statement.compile().params.values() if isinstance(value, bytes)]
+    assert digests == sorted(digests)
 
 
-def test_increment_clicks(repo, mock_db):
-    url = MagicMock(spec=Urls)
-    url.clicks = 5
-    url.shortened_url = "abc"
+def test_bulk_increment_clicks_single_statement(repo, mock_db):
+    mock_db.execute.return_value.rowcount = 2
 
-    result = repo.increment_clicks(url)
+    assert repo.bulk_increment_clicks({"b": 3, "a": 1}) == 2
 
-    assert url.clicks == 6
-    assert isinstance(url.updated, datetime)
-    assert url.updated.tzinfo == timezone.utc
+    mock_db.execute.assert_called_once()
+    sql = str(mock_db.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+    assert "FROM (VALUES" in sql
+    assert "clicks=(urls.clicks + increments.clicks)" in sql
     mock_db.commit.assert_called_once()
-    mock_db.refresh.assert_called_once_with(url)
-    assert result == url
 
 
-def test_generate_unique_short(repo):
-    repo.get_by_short = MagicMock(side_effect=[True, True, False])
-    result = repo._generate_unique_short()
-    assert isinstance(result, str)
-    assert len(result) == 6
+def test_bulk_increment_clicks_empty(repo, mock_db):
+    assert repo.bulk_increment_clicks({}) == 0
+    mock_db.execute.assert_not_called()
+
+
+def test_next_short_code_reserves_blocks_without_lookups(mock_db):
+    allocator = ShortCodeAllocator(ShortCodeCodec(min_length=7), block_size=2)
+    repo = UrlsRepository(mock_db, allocator=allocator)
+    mock_db.execute.return_value.scalar_one.side_effect = [0, 1]
+    repo.get_by_short = MagicMock()
+
+    codes = [repo._next_short_code() for _ in range(3)]
+
+    assert len(set(codes)) == 3
+    assert all(len(code) == 7 for code in codes)
+    assert mock_db.execute.call_count == 2
+    repo.get_by_short.assert_not_called()
 
 
 def test_is_url_expired_true():
@@ -87,3 +125,21 @@ def test_is_url_expired_false():
 def test_is_url_expired_none():
     url = Urls(valid_until=None)
     assert is_url_expired(url) is False
+
+
+def test_default_allocator_does_not_issue_adjacent_codes():
+    codec = get_short_code_allocator().codec
+    offsets = [decode_base62(codec.encode(value)) for value in range(1000)]
+
+    assert offsets[:3] != [0, 1, 2]
+    assert not any(abs(a - b) == 1 for a, b in zip(offsets, offsets[1:]))
+
+
+def test_allocator_refuses_empty_secret(monkeypatch):
+    monkeypatch.setattr("app.repositories.url_repository.settings", Settings(SHORT_CODE_SECRET=""))
+    with pytest.raises(ValueError, match="SHORT_CODE_SECRET"):
+        get_short_code_allocator.__wrapped__()
+
+    monkeypatch.setattr("app.repositories.url_repository.settings",
+                        Settings(SHORT_CODE_SECRET="", SHORT_CODE_ALLOW_SEQUENTIAL=True))
+    assert get_short_code_allocator.__wrapped__().codec.encode(1) == "0000001"
@@ -0,0 +1,133 @@
+import uuid
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.integration.blacklist import get_blacklist_service
+from app.integration.domain_index import DomainIndex
+from app.main import app
+from app.routes.urls_router import get_service, get_stats_service, settings
+
+
+def _row(original_url, code):
+    now = datetime.now(timezone.utc)
+    return MagicMock(
+        id=uuid.uuid4(), original_url=original_url, shortened_url=code,
+        created=now, updated=now, valid_until=None, clicks=0, redirect_status=302,
+    )
+
+
+@pytest.fixture
+def client():
+    blacklist = MagicMock()
+    blacklist.ensure_loaded = AsyncMock()
+    index = DomainIndex.from_text("bad.com\n")
+    blacklist.match.side_effect = index.match
+    service = MagicMock()
+
+    app.dependency_overrides[get_blacklist_service] = lambda: blacklist
+    app.dependency_overrides[get_service] = lambda: service
+    yield TestClient(app), service
+    app.dependency_overrides.clear()
+
+
+def test_batch_reports_per_item_results(client):
+    test_client, service = client
+    service.shorten_many = AsyncMock(return_value={
+        "https://new.com": (_row("https://new.com", "NEW0001"), True),
+        "https://old.com": (_row("https://old.com", "OLD0001"), False),
+    })
+
+    response = test_client.post("/urls/batch", json={"items": [
+        {"original_url": "https://new.com"},
+        {"original_url": "https://login.bad.com/x"},
+        {"original_url": "https://old.com"},
+        {"original_url": "https://lost.com"},
+    ]})
+
+    assert response.status_code == 200
+    statuses = [item["status"] for item in response.json()["results"]]
+    assert statuses == ["created", "rejected", "existing", "conflict"]
+    accepted = [url for url, _, _ in service.shorten_many.call_args[0][0]]
+    assert accepted == ["https://new.com", "https://old.com", "https://lost.com"]
+
+
+def test_batch_rejects_invalid_items(client):
+    test_client, _ = client
+    response = test_client.post("/urls/batch", json={"items": [{"original_url": "ftp://a.com"}]})
+    assert response.status_code == 422
+
+
+@pytest.fixture
+def stats_client():
+    stats_service = MagicMock()
+    app.dependency_overrides[get_stats_service] = lambda: stats_service
+    yield TestClient(app), stats_service
+    app.dependency_overrides.clear()
+
+
+def test_stats_returns_rollups(stats_client):
+    test_client, stats_service = stats_client
+    stats_service.get_stats = AsyncMock(return_value={
+        "shortened_url": "abc1234",
+        "total_clicks": 7,
+        "since": "2026-01-01T10:00:00",
+        "series": [{"hour": "2026-01-01T10:00:00", "clicks": 0}, {"hour": "2026-01-01T11:00:00", "clicks": 5}],
+        "top_referrers": [{"referrer": "news.example.org", "clicks": 4}, {"referrer": None, "clicks": 1}],
+    })
+
+    response = test_client.get("/urls/abc1234/stats?hours=2&top=5")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total_clicks"] == 7
+    assert [point["clicks"] for point in body["series"]] == [0, 5]
+    assert body["top_referrers"][1] == {"referrer": None, "clicks": 1}
+    stats_service.get_stats.assert_awaited_once_with("abc1234", 2, 5)
+
+
+def test_stats_for_unknown_code_is_404(stats_client):
+    test_client, stats_service = stats_client
+    stats_service.get_stats = AsyncMock(return_value=None)
+
+    assert test_client.get("/urls/nope/stats").status_code == 404
+
+
+def test_stats_rejects_out_of_range_window(stats_client):
+    test_client, _ = stats_client
+
+    assert test_client.get("/urls/abc1234/stats?hours=0").status_code == 422
+
+
+def test_create_passes_redirect_status(client):
+    test_client, service = client
+    service.shorten_url = AsyncMock(return_value=_row("https://new.com", "NEW0001"))
+
+    response = test_client.post("/urls", json={"original_url": "https://new.com", "redirect_status": 308})
+
+    assert response.status_code == 201
+    assert service.shorten_url.await_args.kwargs["redirect_status"] == 308
+    assert test_client.post("/urls", json={"original_url": "https://new.com", "redirect_status": 200}).status_code == 422
+
+
+def test_beacon_disabled_by_default(client):
+    test_client, service = client
+    service.record_beacon = AsyncMock(return_value=True)
+
+    assert test_client.post("/urls/abc1234/beacon").status_code == 404
+    service.record_beacon.assert_not_awaited()
+
+
+def test_beacon_scales_sampled_clicks(client, monkeypatch):
+    test_client, service = client
+    monkeypatch.setattr(settings, "CLICK_BEACON_ENABLED", True)
+    service.record_beacon = AsyncMock(side_effect=[True, True, False])
+
+    assert test_client.post("/urls/abc1234/beacon?rate=0.25").status_code == 204
+    # Rates below CLICK_BEACON_MIN_SAMPLE_RATE are clamped
+    assert test_client.post("/urls/abc1234/beacon?rate=0.00001").status_code == 204
+    assert test_client.post("/urls/gone123/beacon").status_code == 404
+    counts = [call.args[1] for call in service.record_beacon.await_args_list]
+    assert counts == [4, round(1 / settings.CLICK_BEACON_MIN_SAMPLE_RATE), 1]